@@ -0,0 +1,104 @@
+import time
+import numpy as np
+from python_research.services import aqi_engine
+from python_research.services.spatial import haversine_np, pairwise_haversine
+from python_research.services.stations import station_registry
+
+
+def benchmark_inference(repeats=50, batch_size=4):
+    """Per-call latency of every inference backend on a station-sized batch."""
+    features = np.random.rand(batch_size, 24, 16).astype(np.float32)
+    station_ids = np.arange(batch_size, dtype=np.float32).reshape(-1, 1) % 4
+
+    from python_research.services.inference import BACKENDS
+
+    aqi_engine.load_model()
+    lstm_model = aqi_engine.lstm_model
+
+    reference = None
+    print("="*50)
+    print(f"   LSTM INFERENCE BACKENDS (batch={batch_size})   ")
+    print("="*50)
+    for name, backend_cls in BACKENDS.items():
+        try:
+            backend = backend_cls(lstm_model)
+        except Exception as e:
+            print(f"{name:<10} | unavailable: {e}")
+            continue
+
+        out = backend.predict(features, station_ids)  # warm-up / tracing
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            backend.predict(features, station_ids)
+        per_call = (time.perf_counter() - start_time) * 1000 / repeats
+
+        if reference is None:
+            reference = out
+        max_diff = float(np.max(np.abs(out - reference)))
+        print(f"{name:<10} | {per_call:8.2f} ms/call | max |diff| vs predict: {max_diff:.2e}")
+    print("="*50)
+
+
+def benchmark_batcher(callers=200, concurrency=32):
+    """Many concurrent 4-station forecast calls: micro-batched vs one pass per call."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    aqi_engine.load_model()
+    windows = list(np.random.rand(4, 24, 16))
+    indices = [0, 1, 2, 3]
+
+    def direct(_):
+        return aqi_engine._predict_batch(list(zip(windows, indices)))
+
+    def batched(_):
+        return aqi_engine.get_station_forecasts(windows, indices)
+
+    print("="*50)
+    print(f"   INFERENCE QUEUE ({callers} callers, {concurrency} threads)   ")
+    print("="*50)
+    for name, fn in (("per call", direct), ("batched", batched)):
+        fn(0)  # warm-up
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(fn, range(callers)))
+        elapsed = time.perf_counter() - start_time
+        print(f"{name:<10} | {elapsed * 1000:8.1f} ms total | {callers / elapsed:8.1f} calls/s")
+    print(f"batcher    | {aqi_engine.inference_batcher.stats()}")
+    print("="*50)
+
+
+def benchmark_haversine(n_points=10_000):
+    """Scalar math.haversine loop vs the NumPy kernels on a synthetic polyline."""
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(23.45, 23.65, n_points)
+    lons = rng.uniform(87.20, 87.40, n_points)
+    anchors = station_registry.coords
+
+    start_time = time.perf_counter()
+    scalar = [[aqi_engine.haversine(la, lo, a_lat, a_lon) for a_lat, a_lon in anchors]
+              for la, lo in zip(lats, lons)]
+    scalar_ms = (time.perf_counter() - start_time) * 1000
+
+    start_time = time.perf_counter()
+    vector = pairwise_haversine(np.column_stack([lats, lons]), anchors)
+    vector_ms = (time.perf_counter() - start_time) * 1000
+
+    start_time = time.perf_counter()
+    haversine_np(lats[:-1], lons[:-1], lats[1:], lons[1:])  # segment lengths
+    segments_ms = (time.perf_counter() - start_time) * 1000
+
+    pairs = n_points * len(anchors)
+    print("="*50)
+    print(f"   HAVERSINE ({n_points} points x {len(anchors)} stations)   ")
+    print("="*50)
+    print(f"scalar loop      | {scalar_ms:8.2f} ms | {pairs / scalar_ms * 1000:,.0f} pairs/s")
+    print(f"pairwise (NumPy) | {vector_ms:8.2f} ms | {pairs / vector_ms * 1000:,.0f} pairs/s")
+    print(f"segments (NumPy) | {segments_ms:8.2f} ms | {n_points - 1} segments")
+    print(f"max |diff|       | {float(np.max(np.abs(np.array(scalar) - vector))):.2e} km")
+    print("="*50)
+
+
+if __name__ == "__main__":
+    benchmark_haversine()
+    benchmark_inference()
+    benchmark_batcher()
@@ -1,9 +1,59 @@
-from time import time
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from python_research.routes.aqi_route import router
+from python_research.services.aqi_engine import load_model, model_status
+from python_research.services.executor import cpu_pool, kriging_pool
+from python_research.services.serialization import FastJSONResponse
+from python_research.services.upstream import upstream
+from python_research.services.shared_state import is_producer, load_published_snapshot, try_become_producer, wait_for_producer_role
+from python_research.services.station_feed import PREFETCH_ENABLED, run_station_prefetcher
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="Stealth AQI API", description="API for AQI route analysis and forecasting", version="1.0.0")
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+    tasks = []
+    # One pooled keep-alive client for every Google call, closed on shutdown
+    await upstream.start()
+
+    def start_producer():
+        # Load TensorFlow + the LSTM in the background; /ready flips once it is done
+        if MODEL_WARMUP:
+            loop.run_in_executor(None, load_model)
+        # Keep the four station histories warm in memory, refreshed just after every hour
+        if PREFETCH_ENABLED:
+            tasks.append(asyncio.create_task(run_station_prefetcher()))
+
+    # Spawned kriging workers take a moment to import NumPy; do it before traffic arrives
+    kriging_pool.warm_up()
+
+    # With AQI_SHARED_STATE_DIR only one worker produces; the rest read and stand by
+    if try_become_producer():
+        start_producer()
+    else:
+        print(f"Worker {os.getpid()} running as reader", flush=True)
+        tasks.append(asyncio.create_task(wait_for_producer_role(start_producer)))
+    yield
+    for task in tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    cpu_pool.shutdown()
+    kriging_pool.shutdown()
+    await upstream.aclose()
+
+
+app = FastAPI(title="Stealth AQI API", description="API for AQI route analysis and forecasting", version="1.0.0",
+              lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +77,26 @@ async def health_check():
         "uptime_check": True
     }
 
+# --- READINESS (model loaded, safe to route forecast traffic here) ---
+@app.get("/ready")
+async def readiness_check():
+    if not is_producer():
+        # Readers have no model of their own; they are ready once forecasts are published
+        published = load_published_snapshot()
+        ready = published is not None and published["station_forecasts"] is not None
+        return JSONResponse(
+            status_code=200 if ready else 503,
+            content={"status": "ready" if ready else "not_ready", "role": "reader",
+                     "snapshot_version": published["version"] if published else None},
+        )
+
+    status = model_status()
+    ready = status["state"] == "ready"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "role": "producer", "model": status},
+    )
+
 app.include_router(router)
 
 
@@ -0,0 +1,106 @@
+"""
+Model definitions shared by the training scripts and the sweep runner.
+Defaults are the hyperparameters model_lstm.py / model_ttm.py train with;
+tensorflow / torch are imported inside so each path only needs its own.
+"""
+
+
+def build_lstm(look_back, n_features, look_ahead, num_stations,
+               units=128, lstm_layers=3, dense_units=256, dropout=0.3,
+               embedding_dim=4, learning_rate=0.001, huber_delta=20):
+    """Station-embedding LSTM encoder -> dense decoder, compiled (Huber loss, RMSE metric)."""
+    from tensorflow import keras
+    from tensorflow.keras import layers
+
+    # Inputs
+    feature_input = layers.Input(shape=(look_back, n_features))
+    station_input = layers.Input(shape=(1,))
+
+    # Embedding
+    embedding = layers.Embedding(
+        input_dim=num_stations,
+        output_dim=embedding_dim
+    )(station_input)
+
+    embedding = layers.Flatten()(embedding)
+    embedding = layers.RepeatVector(look_back)(embedding)
+
+    # Concatenate
+    x = layers.Concatenate()([feature_input, embedding])
+
+    # ---- Encoder ----
+    for _ in range(lstm_layers - 1):
+        x = layers.LSTM(units, return_sequences=True)(x)
+    x = layers.LSTM(units, dropout=0.0, return_sequences=False)(x)
+
+    # ---- Bottleneck ----
+    # bottleneck = layers.Dense(64, activation="relu")(encoder)
+    # bottleneck = layers.BatchNormalization()(bottleneck)
+
+    # ---- Decoder ----
+    x = layers.Dense(dense_units, activation="relu")(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dropout(dropout)(x)
+
+    # ---- TimeDistributed Output ----
+    output = layers.Dense(look_ahead)(x)
+    # # Extract last observed AQI value from input sequence
+    # last_value = layers.Lambda(lambda x: x[:, -1, 0:1])(feature_input)
+
+    # # Repeat it for 24 future hours
+    # last_value = layers.RepeatVector(look_ahead)(last_value)
+
+    # # Add residual connection
+    # output = layers.Add()([output, last_value])
+    # output = layers.TimeDistributed(layers.Dense(1))(decoder)
+
+    model = keras.Model(
+        inputs=[feature_input, station_input],
+        outputs=output
+    )
+
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+        loss=keras.losses.Huber(delta=huber_delta),
+        # loss="mse",
+        metrics=[keras.metrics.RootMeanSquaredError()]
+    )
+    return model
+
+
+def build_ttm(look_back, look_ahead, n_channels, device="cpu",
+              d_model=48, patch_size=4, learning_rate=1e-5,
+              pretrained="ibm-granite/granite-timeseries-ttm-r1"):
+    """
+    Pretrained TinyTimeMixer resized to our channels, backbone frozen
+    (decoder + head train). Returns (model, optimizer).
+    """
+    import torch
+    from tsfm_public.models.tinytimemixer import TinyTimeMixerForPrediction, TinyTimeMixerConfig
+
+    config = TinyTimeMixerConfig(
+        context_length=look_back,
+        prediction_length=look_ahead,
+        num_input_channels=n_channels,
+        d_model=d_model,
+        num_time_features=0,
+        num_static_categorical_features=0,
+        patch_size=patch_size,
+        num_static_real_features=0,
+        cardinality=None,
+    )
+
+    model = TinyTimeMixerForPrediction.from_pretrained(
+        pretrained,
+        config=config,
+        ignore_mismatched_sizes=True
+    ).to(device)
+
+    for param in model.backbone.parameters():
+        param.requires_grad = False
+
+    optimizer = torch.optim.AdamW(
+        filter(lambda p: p.requires_grad, model.parameters()),
+        lr=learning_rate
+    )
+    return model, optimizer
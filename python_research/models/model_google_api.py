@@ -4,8 +4,9 @@ root_path = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(root_path))
 
 from python_research.schemas.schema import ForecastRequest
+from python_research.services.upstream import upstream
 from dotenv import load_dotenv
-import os, requests
+import os, httpx
 from datetime import datetime, timezone, timedelta
 
 
@@ -44,8 +45,8 @@ def forecast_with_google_api(request: ForecastRequest):
 
     try:
         headers = {"Content-Type": "application/json"}
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
+        # Shared pooled client: 10 s timeout, retries and circuit breaker included
+        response = upstream.request_sync("aqi_forecast", "POST", url, json=payload, headers=headers)
         data = response.json()
 
         raw_hours = data.get("hourlyForecasts", [])
@@ -73,10 +74,10 @@ def forecast_with_google_api(request: ForecastRequest):
 
         return processed_hours
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"AQI API Request failed: {e}")
-        if response is not None:
-            print(f"Error Details: {response.text}")
+        if getattr(e, "response", None) is not None:
+            print(f"Error Details: {e.response.text}")
         raise
 
 
@@ -1,3 +1,8 @@
+import sys
+from pathlib import Path
+root_path = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_path))
+
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
@@ -7,9 +12,16 @@ from tensorflow.keras import layers
 import matplotlib.pyplot as plt
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 import joblib
+from python_research.models.architectures import build_lstm
+from python_research.models.streaming import ShardPlan, StreamingWindows, fit_scalers
+
+look_back  = 24
+look_ahead = 12
 
 # 1. Load and Clean
-data = pd.read_csv("../data/durgapur_final.csv")
+# Streamed from the memory-mapped columnar store (built from the station CSVs
+# on first use). Only the datetime index is read up front; rows are read one
+# shard at a time while training, so RAM does not bound the dataset.
 
 continuous_cols = [
     "pm2_5", "pm10", "no2", "co", "so2", "o3",
@@ -31,20 +43,11 @@ target_col = "AQI"
 # ===============================
 
 train_ratio = 0.8
-train_parts = []
-test_parts = []
 
-for station in data["station_id"].unique():
-    
-    df_s = data[data["station_id"] == station]
-    
-    split_index = int(len(df_s) * train_ratio)
-    
-    train_parts.append(df_s.iloc[:split_index])
-    test_parts.append(df_s.iloc[split_index:])
-
-train_df = pd.concat(train_parts).reset_index(drop=True)
-test_df  = pd.concat(test_parts).reset_index(drop=True)
+# First 80% of each station's rows -> train, rest -> test
+plan = ShardPlan.from_store(
+    {"train": train_ratio, "test": 1 - train_ratio}, look_back, look_ahead
+)
 
 
 # ===============================
@@ -53,136 +56,45 @@ test_df  = pd.concat(test_parts).reset_index(drop=True)
 
 scaler_X = StandardScaler()
 
-# Fit feature scaler ONLY on training features
-scaler_X.fit(train_df[feature_cols])
-
-# Transform training data
-train_df[feature_cols] = scaler_X.transform(train_df[feature_cols])
+# Fit feature scaler ONLY on training features (partial_fit, shard by shard)
+fit_scalers(plan, "train", [(scaler_X, feature_cols)])
 
-# Transform test data
-test_df[feature_cols] = scaler_X.transform(test_df[feature_cols])
+# Train and test windows are scaled with it as they are streamed
 
 
 # ===============================
 # Sequence Creation
 # ===============================
 
-def create_sequences(df, feature_cols, target_col,
-                     look_back=24, look_ahead=24):
-    
-    X = []
-    X_station = []
-    y = []
-    
-    for station in df["station_id"].unique():
-        
-        df_s = df[df["station_id"] == station]
-        
-        features = df_s[feature_cols].values
-        targets  = df_s[target_col].values
-        
-        for i in range(len(df_s) - look_back - look_ahead + 1):
-            
-            X.append(features[i:i+look_back])
-            X_station.append(station)
-            y.append(targets[i+look_back:i+look_back+look_ahead])
-    
-    X = np.array(X, dtype=np.float32)
-    X_station = np.array(X_station, dtype=np.int32)
-    y = np.array(y, dtype=np.float32)
-    
-    # reshape target for Seq2Seq models
-    y = y[..., np.newaxis]   # (samples, 24, 1)
-    
-    return X, X_station, y
+def create_sequences(split, feature_cols, target_col):
+    # Windows of one split, read shard by shard from the store (see streaming.py)
+    return StreamingWindows(plan, split, feature_cols, target_col, [(scaler_X, feature_cols)])
 
 # ===============================
-#  Create Final Train/Test Arrays
+#  Create Final Train/Test Pipelines
 # ===============================
 
-look_back  = 24
-look_ahead = 12
+train_windows = create_sequences("train", feature_cols, target_col)
 
-X_train, station_train, y_train = create_sequences(
-    train_df, feature_cols, target_col, look_back, look_ahead
-)
+test_windows = create_sequences("test", feature_cols, target_col)
 
-X_test, station_test, y_test = create_sequences(
-    test_df, feature_cols, target_col, look_back, look_ahead
-)
+# tf.data: parallel shard reads + windowing, prefetched; target gets the (samples, 12, 1) Seq2Seq axis
+train_data = train_windows.as_tf_dataset(batch_size=32, shuffle=True)  # shard order + window shuffle buffer
+test_data = test_windows.as_tf_dataset(batch_size=32)
 
 
 # 5. Build and Train Model
-num_stations = data["station_id"].nunique()
-
-# Inputs
-feature_input = layers.Input(shape=(look_back, len(feature_cols)))
-station_input = layers.Input(shape=(1,))
-
-# Embedding
-embedding = layers.Embedding(
-    input_dim=num_stations,
-    output_dim=4
-)(station_input)
+num_stations = len(plan.station_ids)
 
-embedding = layers.Flatten()(embedding)
-embedding = layers.RepeatVector(look_back)(embedding)
-
-# Concatenate
-x = layers.Concatenate()([feature_input, embedding])
-
-# ---- Encoder ----
-x = layers.LSTM(
-    128,
-    return_sequences=True
-)(x)
-
-x = layers.LSTM(
-    128,
-    return_sequences=True
-)(x)
-x = layers.LSTM(128, dropout=0.0, return_sequences=False)(x)
-
-# ---- Bottleneck ----
-# bottleneck = layers.Dense(64, activation="relu")(encoder)
-# bottleneck = layers.BatchNormalization()(bottleneck)
-
-# ---- Decoder ----
-x = layers.Dense(256, activation="relu")(x)
-x = layers.BatchNormalization()(x)
-x = layers.Dropout(0.3)(x)
-
-# ---- TimeDistributed Output ----
-output = layers.Dense(look_ahead)(x)
-# # Extract last observed AQI value from input sequence
-# last_value = layers.Lambda(lambda x: x[:, -1, 0:1])(feature_input)
-
-# # Repeat it for 24 future hours
-# last_value = layers.RepeatVector(look_ahead)(last_value)
-
-# # Add residual connection
-# output = layers.Add()([output, last_value])
-# output = layers.TimeDistributed(layers.Dense(1))(decoder)
-
-
-model = keras.Model(
-    inputs=[feature_input, station_input],
-    outputs=output
-)
-
-model.compile(
-    optimizer=keras.optimizers.Adam(learning_rate=0.001),
-    loss=keras.losses.Huber(delta=20),
-    # loss="mse",
-    metrics=[keras.metrics.RootMeanSquaredError()]
+# 3x128 LSTM encoder + station embedding, dense decoder (see architectures.py)
+model = build_lstm(
+    look_back, len(feature_cols), look_ahead, num_stations,
+    units=128, dense_units=256, dropout=0.3, learning_rate=0.001, huber_delta=20
 )
 
 model.summary()
 
 
-station_train = station_train.reshape(-1, 1)
-station_test  = station_test.reshape(-1, 1)
-
 early_stop = keras.callbacks.EarlyStopping(
     monitor="val_loss",
     patience=5,
@@ -207,18 +119,17 @@ checkpoint = keras.callbacks.ModelCheckpoint(
 
 
 model.fit(
-    [X_train, station_train],
-    y_train,
+    train_data,
     epochs=20,
-    batch_size=32,
-    validation_data=([X_test, station_test], y_test),
+    validation_data=test_data,
     callbacks=[early_stop, reduce_lr, checkpoint] 
 )
 
 
 # 6. Evaluation
-pred = model.predict([X_test, station_test])
+pred = model.predict(test_data)
 pred = np.clip(pred, 0, 500)
+y_test = test_windows.targets()
 actual = y_test
 
 # Reshape for inverse scaling
@@ -232,7 +143,7 @@ mae = mean_absolute_error(y_test.flatten(), pred.flatten())
 print("MAE:", mae)
 
 baseline_pred = np.repeat(
-    X_test[:, -1, 0:1],  # last AQI
+    test_windows.last_step(slice(0, 1)),  # last AQI
     look_ahead,
     axis=1
 )
@@ -1,13 +1,19 @@
+import sys
+from pathlib import Path
+root_path = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_path))
+
 import numpy as np
 import pandas as pd
 import torch
 import torch.nn as nn
-from torch.utils.data import DataLoader, TensorDataset
-from tsfm_public.models.tinytimemixer import TinyTimeMixerForPrediction, TinyTimeMixerConfig
+from torch.utils.data import DataLoader
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import matplotlib.pyplot as plt
 import joblib, os
+from python_research.models.architectures import build_ttm
+from python_research.models.streaming import ShardPlan, StreamingWindows, fit_scalers
 
 if torch.cuda.is_available():
     DEVICE = "cuda"
@@ -24,11 +30,20 @@ if torch.backends.mps.is_available():
 os.environ["PYTHONHASHSEED"] = str(SEED)
 torch.use_deterministic_algorithms(True)
 
+# Loader processes reading store shards in parallel. Linux forks them; spawn
+# (macOS/Windows) would re-run this top-level script in every worker.
+LOADER_WORKERS = int(os.getenv("TTM_LOADER_WORKERS", "4" if sys.platform.startswith("linux") else "0"))
+PIN_MEMORY = DEVICE == "cuda"
+
+look_back = 24
+look_ahead = 12
+
 # =====================================
 # 1. Load Data
 # =====================================
 
-data = pd.read_csv("../data/durgapur_final.csv")
+# Streamed from the memory-mapped columnar store (built from the station CSVs
+# on first use); only the datetime index is read up front
 
 continuous_cols = [
     "pm2_5", "pm10", "no2", "co", "so2", "o3",
@@ -54,22 +69,10 @@ train_ratio = 0.7
 val_ratio = 0.1
 test_ratio = 0.2
 
-train_parts, val_parts, test_parts = [], [], []
-
-for station in data["station_id"].unique():
-    df_s = data[data["station_id"] == station]
-
-    n = len(df_s)
-    train_end = int(n * train_ratio)
-    val_end = int(n * (train_ratio + val_ratio))
-
-    train_parts.append(df_s.iloc[:train_end])
-    val_parts.append(df_s.iloc[train_end:val_end])
-    test_parts.append(df_s.iloc[val_end:])
-
-train_df = pd.concat(train_parts).reset_index(drop=True)
-val_df = pd.concat(val_parts).reset_index(drop=True)
-test_df = pd.concat(test_parts).reset_index(drop=True)
+# Per station: [0, 70%) train, [70%, 80%) val, rest test
+plan = ShardPlan.from_store(
+    {"train": train_ratio, "val": val_ratio, "test": test_ratio}, look_back, look_ahead
+)
 
 # =====================================
 # 3. Scaling
@@ -78,74 +81,36 @@ test_df = pd.concat(test_parts).reset_index(drop=True)
 scaler_X = StandardScaler()
 scaler_y = StandardScaler()
 
-scaler_X.fit(train_df[base_feature_cols])
-scaler_y.fit(train_df[[target_col]])
-
-for df in [train_df, val_df, test_df]:
-    df[base_feature_cols] = scaler_X.transform(df[base_feature_cols])
-    df[[target_col]] = scaler_y.transform(df[[target_col]])
+# partial_fit over the train shards; every split is scaled as it streams
+scalers = [(scaler_X, base_feature_cols), (scaler_y, [target_col])]
+fit_scalers(plan, "train", scalers)
 
 # =====================================
 # 4. Sequence Creation
 # =====================================
 
-def create_sequences(df, look_back=24, look_ahead=12):
-    X, y = [], []
-
-    for station in df["station_id"].unique():
-        df_s = df[df["station_id"] == station]
+def create_sequences(split):
+    # Now includes scaled AQI; windows are built per shard as it is read
+    return StreamingWindows(plan, split, feature_cols, target_col, scalers)
 
-        # Now includes scaled AQI
-        features = df_s[feature_cols].values
-        targets = df_s[target_col].values
-
-        for i in range(len(df_s) - look_back - look_ahead + 1):
-            X.append(features[i:i+look_back])
-            y.append(targets[i+look_back:i+look_back+look_ahead])
-
-    return (
-        torch.tensor(np.array(X), dtype=torch.float32),
-        torch.tensor(np.array(y), dtype=torch.float32),
-    )
 
+train_windows = create_sequences("train")
+val_windows = create_sequences("val")
+test_windows = create_sequences("test")
 
-
-look_back = 24
-look_ahead = 12
-
-X_train, y_train = create_sequences(train_df, look_back, look_ahead)
-X_val, y_val = create_sequences(val_df, look_back, look_ahead)
-X_test, y_test = create_sequences(test_df, look_back, look_ahead)
-
-print("Train:", X_train.shape)
-print("Val:", X_val.shape)
-print("Test:", X_test.shape)
+print("Train:", len(train_windows))
+print("Val:", len(val_windows))
+print("Test:", len(test_windows))
 
 # =====================================
 # 5. Model
 # =====================================
 
-config = TinyTimeMixerConfig(
-    context_length=look_back,
-    prediction_length=look_ahead,
-    num_input_channels=len(feature_cols),
-    d_model=48,
-    num_time_features=0,
-    num_static_categorical_features=0,
-    patch_size=4,
-    num_static_real_features=0,
-    cardinality=None,
+model, optimizer = build_ttm(
+    look_back, look_ahead, len(feature_cols), DEVICE,
+    d_model=48, patch_size=4, learning_rate=1e-5
 )
 
-model = TinyTimeMixerForPrediction.from_pretrained(
-    "ibm-granite/granite-timeseries-ttm-r1",
-    config=config,
-    ignore_mismatched_sizes=True
-).to(DEVICE)
-
-for param in model.backbone.parameters():
-    param.requires_grad = False
-
 print("Backbone frozen. Decoder + Head trainable.")
 # print("\nTrainable Parameters:")
 # for name, param in model.named_parameters():
@@ -153,24 +118,22 @@ print("Backbone frozen. Decoder + Head trainable.")
 #         print(name)
 
 
-optimizer = torch.optim.AdamW(
-    filter(lambda p: p.requires_grad, model.parameters()),
-    lr=1e-5
-)
-
 loss_fn = nn.L1Loss()
 
-train_loader = DataLoader(
-    TensorDataset(X_train, y_train),
-    batch_size=32,
-    shuffle=False
-)
+def make_loader(windows, batch_size):
+    # The IterableDataset yields whole batches (workers split the shards), so batch_size=None here
+    return DataLoader(
+        windows.as_torch(batch_size=batch_size),
+        batch_size=None,
+        num_workers=LOADER_WORKERS,
+        pin_memory=PIN_MEMORY,
+        persistent_workers=LOADER_WORKERS > 0
+    )
 
-val_loader = DataLoader(
-    TensorDataset(X_val, y_val),
-    batch_size=32,
-    shuffle=False
-)
+train_loader = make_loader(train_windows, 32)
+val_loader = make_loader(val_windows, 32)
+# In order with one worker, so predictions line up with test_windows.targets()
+test_loader = DataLoader(test_windows.as_torch(batch_size=256), batch_size=None, pin_memory=PIN_MEMORY)
 
 # =====================================
 # 6. Training with Validation
@@ -193,9 +156,10 @@ print("="*50)
 for epoch in range(epochs):
     model.train()
     total_train_loss = 0
+    train_batches = 0
 
     for xb, yb in train_loader:
-        xb, yb = xb.to(DEVICE), yb.to(DEVICE)
+        xb, yb = xb.to(DEVICE, non_blocking=PIN_MEMORY), yb.to(DEVICE, non_blocking=PIN_MEMORY)
 
         optimizer.zero_grad()
 
@@ -208,17 +172,19 @@ for epoch in range(epochs):
         optimizer.step()
 
         total_train_loss += loss.item()
+        train_batches += 1
 
-    avg_train_loss = total_train_loss / len(train_loader)
+    avg_train_loss = total_train_loss / train_batches
     train_losses.append(avg_train_loss)
 
     # Validation
     model.eval()
     total_val_loss = 0
+    val_batches = 0
 
     with torch.no_grad():
         for xb, yb in val_loader:
-            xb, yb = xb.to(DEVICE), yb.to(DEVICE)
+            xb, yb = xb.to(DEVICE, non_blocking=PIN_MEMORY), yb.to(DEVICE, non_blocking=PIN_MEMORY)
 
             output = model(
                 past_values=xb
@@ -226,8 +192,9 @@ for epoch in range(epochs):
 
             loss = loss_fn(output[:, :, 0], yb)
             total_val_loss += loss.item()
+            val_batches += 1
 
-    avg_val_loss = total_val_loss / len(val_loader)
+    avg_val_loss = total_val_loss / val_batches
     val_losses.append(avg_val_loss)
 
     print(f"Epoch {epoch+1:2d}/{epochs} | "
@@ -260,17 +227,19 @@ model.eval()
 
 
 with torch.no_grad():
-    # 1. Move test data to device
-    X_test_device = X_test.to(DEVICE)
-    
-    # 3. Correct forward call and attribute name
-    output_obj = model(past_values=X_test_device)
-    pred_tensor = output_obj.prediction_outputs
-    
-    # 4. Slice Channel 0 (AQI) and move to CPU
-    # Shape: [N, 12, 22] -> [N, 12]
-    pred = pred_tensor[:, :, 0]
-    pred = pred.cpu().numpy()
+    pred_batches = []
+    for xb, _ in test_loader:
+        # 1. Move test batch to device
+        xb = xb.to(DEVICE)
+
+        # 2. Correct forward call and attribute name
+        output_obj = model(past_values=xb)
+        pred_tensor = output_obj.prediction_outputs
+
+        # 3. Slice Channel 0 (AQI) and move to CPU
+        # Shape: [N, 12, 22] -> [N, 12]
+        pred_batches.append(pred_tensor[:, :, 0].cpu().numpy())
+    pred = np.concatenate(pred_batches)
 
 # list of all model modules and their names (for debugging)
 # for name, module in model.named_modules():
@@ -283,7 +252,7 @@ with torch.no_grad():
 # print("Configured output channels:", config.num_output_channels)
 # print("Model head:", model.projection)
 
-actual = y_test.numpy()
+actual = test_windows.targets()
 
 # Inverse scale AQI
 # Reshape to 2D for scaler compatibility, then back to original shape
@@ -0,0 +1,280 @@
+"""
+Out-of-core training input for the LSTM and TTM scripts.
+
+Nothing is loaded up front: a ShardPlan reads only the (station_id, datetime)
+columns of the store to cut each station's chronological train/val/test split
+into shards of consecutive windows. Each shard is read back from the
+memory-mapped store on its own (its rows plus the look_back + look_ahead - 1
+rows that finish its last window), so only a few shards live in memory at a
+time whatever the store size. Windows and their order are identical to
+WindowSet.from_frame over the same split.
+
+    plan = ShardPlan.from_store({"train": 0.8, "test": 0.2}, look_back=24, look_ahead=12)
+    fit_scalers(plan, "train", [(scaler_X, feature_cols)])
+    train = StreamingWindows(plan, "train", feature_cols, "AQI", [(scaler_X, feature_cols)])
+    model.fit(train.as_tf_dataset(batch_size=32, shuffle=True), ...)
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from python_research.models.windowing import StationWindows
+from python_research.services.dataset_store import DATASET_DIR, load_table
+
+SHARD_WINDOWS = int(os.getenv("AQI_SHARD_WINDOWS", "2048"))
+
+# Windows [0, n_windows) of a shard start at its first row; rows are read from
+# `start` (inclusive) to `end` (exclusive, None = end of station). The first
+# `own_rows` rows belong to this shard alone (used to fit scalers once per row).
+Shard = namedtuple("Shard", "station_id start end n_rows n_windows own_rows")
+
+
+class ShardPlan:
+    """Per-split list of shards, built from the datetime column only."""
+
+    def __init__(self, splits, look_back, look_ahead, store_dir=DATASET_DIR):
+        self.splits = splits
+        self.look_back = look_back
+        self.look_ahead = look_ahead
+        self.store_dir = store_dir
+
+    @classmethod
+    def from_store(cls, fractions, look_back=24, look_ahead=12, shard_windows=SHARD_WINDOWS,
+                   stations=None, store_dir=DATASET_DIR):
+        """
+        fractions: ordered {split_name: share}, applied per station like the
+        scripts do (int(n * cumulative share) row boundaries, last split to the end).
+        """
+        index = load_table(stations=stations, columns=["station_id", "datetime"], store_dir=store_dir)
+        station_ids = index.column("station_id").to_numpy()
+        times = index.column("datetime").to_numpy()
+
+        window = look_back + look_ahead
+        splits = {name: [] for name in fractions}
+        for station in _unique_in_order(station_ids):
+            rows = np.flatnonzero(station_ids == station)
+            ts = times[rows[0]:rows[-1] + 1]
+            n = len(ts)
+
+            bounds, share = [0], 0.0
+            for name in list(fractions)[:-1]:
+                share += fractions[name]
+                bounds.append(int(n * share))
+            bounds.append(n)
+
+            for name, lo, hi in zip(fractions, bounds, bounds[1:]):
+                if hi <= lo:
+                    continue
+                n_windows = max(hi - lo - window + 1, 0)
+                if n_windows == 0:
+                    # too short for a window, but its rows still count when fitting scalers
+                    splits[name].append(Shard(int(station), ts[lo], ts[hi] if hi < n else None, hi - lo, 0, hi - lo))
+                    continue
+                for a in range(lo, lo + n_windows, shard_windows):
+                    b = min(a + shard_windows, lo + n_windows)
+                    last = b + window - 1  # the final shard ends exactly at hi
+                    own = (hi if last == hi else b) - a
+                    splits[name].append(Shard(int(station), ts[a], ts[last] if last < n else None,
+                                              last - a, b - a, own))
+        return cls(splits, look_back, look_ahead, store_dir)
+
+    @property
+    def station_ids(self):
+        return sorted({s.station_id for shards in self.splits.values() for s in shards})
+
+    def shards(self, split):
+        return self.splits[split]
+
+    def num_windows(self, split):
+        return sum(s.n_windows for s in self.splits[split])
+
+    def read(self, shard, columns):
+        """Rows of one shard as a float32 (n_rows, len(columns)) array."""
+        table = load_table(stations=[shard.station_id], start=shard.start, end=shard.end,
+                           columns=["station_id", "datetime"] + list(columns), store_dir=self.store_dir)
+        values = np.column_stack([table.column(c).to_numpy() for c in columns]).astype(np.float32)
+        return values[:shard.n_rows]
+
+
+def _unique_in_order(values):
+    _, first = np.unique(values, return_index=True)
+    return values[np.sort(first)]
+
+
+def fit_scalers(plan, split, scalers):
+    """partial_fit each (scaler, columns) pair shard by shard; same result as one fit on the whole split."""
+    columns = sorted({c for _, cols in scalers for c in cols})
+    for shard in plan.shards(split):
+        values = plan.read(shard, columns)[:shard.own_rows].astype(np.float64)
+        for scaler, cols in scalers:
+            scaler.partial_fit(values[:, [columns.index(c) for c in cols]])
+    return scalers
+
+
+def worker_shards(shards, worker_id, num_workers, seed=None, epoch_key=0):
+    """
+    Shards one loader worker reads. With a seed, all workers apply the same
+    per-epoch permutation before striding, so together they cover every
+    shard exactly once.
+    """
+    shards = list(shards)
+    if seed is not None:
+        np.random.default_rng([seed, epoch_key % 2**63]).shuffle(shards)
+    return shards[worker_id::num_workers]
+
+
+class StreamingWindows:
+    """
+    One split of a ShardPlan as (X, station_id, y) windows, with the fitted
+    scalers applied on the fly. Mirrors the WindowSet API used by the
+    scripts: len(), targets(), last_step(), plus tf.data and torch adapters.
+    """
+
+    def __init__(self, plan, split, feature_cols, target_col, scalers=()):
+        self.plan = plan
+        self.split = split
+        self.feature_cols = list(feature_cols)
+        self.target_col = target_col
+        self.shards = [s for s in plan.shards(split) if s.n_windows]
+        self.columns = self.feature_cols + [target_col]
+
+        # (x - mean) / scale per column; identity where no scaler applies
+        self.mean = np.zeros(len(self.columns), dtype=np.float32)
+        self.scale = np.ones(len(self.columns), dtype=np.float32)
+        for scaler, cols in scalers:
+            for j, col in enumerate(cols):
+                for k, name in enumerate(self.columns):
+                    if name == col:
+                        self.mean[k], self.scale[k] = scaler.mean_[j], scaler.scale_[j]
+
+    def __len__(self):
+        return sum(s.n_windows for s in self.shards)
+
+    def read_shard(self, shard):
+        """Scaled (features, targets) rows of one shard."""
+        values = (self.plan.read(shard, self.columns) - self.mean) / self.scale
+        return values[:, :-1], values[:, -1]
+
+    def shard_windows(self, shard):
+        features, targets = self.read_shard(shard)
+        return StationWindows(features, targets, shard.station_id, self.plan.look_back, self.plan.look_ahead)
+
+    def iter_batches(self, batch_size=32, shards=None):
+        """(X, station_ids, y) batches of batch_size across shard boundaries."""
+        pending, filled = [], 0
+        for shard in (self.shards if shards is None else shards):
+            windows = self.shard_windows(shard)
+            ids = np.full(len(windows), windows.station_id, dtype=np.int32)
+            start = 0
+            while start < len(windows):
+                take = min(batch_size - filled, len(windows) - start)
+                pending.append((windows.X[start:start + take], ids[start:start + take], windows.y[start:start + take]))
+                filled += take
+                start += take
+                if filled == batch_size:
+                    yield tuple(np.concatenate(part) for part in zip(*pending))
+                    pending, filled = [], 0
+        if pending:
+            yield tuple(np.concatenate(part) for part in zip(*pending))
+
+    def targets(self):
+        """All target windows as one (samples, look_ahead) array; small next to X."""
+        return np.concatenate([self.shard_windows(s).y for s in self.shards])
+
+    def last_step(self, columns):
+        """X[:, -1, columns] without materialising X."""
+        return np.concatenate([self.shard_windows(s).X[:, -1, columns] for s in self.shards])
+
+    # --- framework adapters (imported lazily so neither path needs the other) ---
+    def as_tf_dataset(self, batch_size=32, shuffle=False, seed=None, shuffle_buffer=8192, target_axis=True):
+        """
+        tf.data pipeline yielding ((X, station_ids), y) batches: shard reads
+        and window framing run as parallel maps, batches are prefetched.
+        Shuffling is shard order + a window shuffle buffer (the data never
+        sits in memory as a whole, so there is no global permutation).
+        """
+        import tensorflow as tf
+
+        shards = self.shards
+        look_back, look_ahead = self.plan.look_back, self.plan.look_ahead
+        n_features = len(self.feature_cols)
+        columns, plan = self.columns, self.plan
+        mean, scale = tf.constant(self.mean), tf.constant(self.scale)
+
+        def load(i):
+            shard = shards[int(i)]
+            return plan.read(shard, columns), np.int32(shard.station_id)
+
+        def read(i):
+            values, station = tf.numpy_function(load, [i], [tf.float32, tf.int32])
+            values.set_shape([None, n_features + 1])
+            station.set_shape([])
+            return values, station
+
+        def to_windows(values, station):
+            values = (values - mean) / scale
+            features, targets = values[:, :-1], values[:, -1]
+            X = tf.signal.frame(features[:-look_ahead], look_back, 1, axis=0)
+            y = tf.signal.frame(targets[look_back:], look_ahead, 1, axis=0)
+            if target_axis:
+                y = y[..., tf.newaxis]
+            station_ids = tf.fill([tf.shape(X)[0], 1], station)
+            return (X, station_ids), y
+
+        ds = tf.data.Dataset.range(len(shards))
+        if shuffle:
+            ds = ds.shuffle(len(shards), seed=seed, reshuffle_each_iteration=True)
+        ds = ds.map(read, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+        ds = ds.map(to_windows, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+        ds = ds.unbatch()
+        if shuffle:
+            ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size)
+        # Known length, so keras shows progress and does not warn at the end of each epoch
+        ds = ds.apply(tf.data.experimental.assert_cardinality(int(np.ceil(len(self) / batch_size))))
+        return ds.prefetch(tf.data.AUTOTUNE)
+
+    def as_torch(self, batch_size=32, shuffle=False, seed=None, with_station=False):
+        """
+        torch IterableDataset yielding ready-made (X, y) (or (X, station_id, y))
+        batches. DataLoader workers split the shards between them, so use it
+        with batch_size=None, e.g.
+            DataLoader(ds, batch_size=None, num_workers=4, pin_memory=True, persistent_workers=True)
+        """
+        import torch
+        from torch.utils.data import IterableDataset, get_worker_info
+
+        stream = self
+
+        class TorchShardStream(IterableDataset):
+            def __init__(self):
+                # Drawn once here, so every worker's copy permutes the shards the same way
+                self.seed = seed if seed is not None else int(np.random.SeedSequence().entropy % 2**63)
+                self.epoch = 0
+
+            def __len__(self):
+                # Exact for one process; with N loader workers each may end on its own
+                # partial batch, so an epoch can yield up to N - 1 more batches
+                return int(np.ceil(len(stream) / batch_size))
+
+            def __iter__(self):
+                info = get_worker_info()
+                if info is None:
+                    self.epoch += 1
+                    epoch_key, worker_id, num_workers = self.epoch, 0, 1
+                else:
+                    # DataLoader's base seed: the same in every worker, new each epoch
+                    # (worker copies of self.epoch would not advance without persistent_workers)
+                    epoch_key, worker_id, num_workers = info.seed - info.id, info.id, info.num_workers
+                shards = worker_shards(stream.shards, worker_id, num_workers,
+                                       seed=self.seed if shuffle else None, epoch_key=epoch_key)
+
+                for X, station_ids, y in stream.iter_batches(batch_size, shards):
+                    X, y = torch.from_numpy(X), torch.from_numpy(y)
+                    if with_station:
+                        yield X, torch.from_numpy(station_ids), y
+                    else:
+                        yield X, y
+
+        return TorchShardStream()
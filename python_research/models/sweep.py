@@ -0,0 +1,470 @@
+"""
+Hyperparameter sweep runner for the LSTM and TTM models.
+
+Every configuration of a grid runs as its own trial in a process pool. Each
+worker is pinned to its own cores with a fixed thread budget, so N trials
+share a CPU box without oversubscribing it. Trials train headless (no
+plots), stream their data from the station store, and save their model and
+scalers under <out>/trials/<trial_id>/. Results go to <out>/sweep.db, and
+<out>/results.csv is refreshed after every trial.
+
+A trial whose validation loss is worse than the median of finished trials at
+the same epoch is stopped early ("pruned"). Re-running the same command
+resumes: finished and pruned trials are skipped, and interrupted ones run
+again.
+
+    python -m python_research.models.sweep lstm --param units=64,128 --param learning_rate=1e-3,5e-4
+    python -m python_research.models.sweep ttm --grid ttm_grid.json --workers 4 --threads 2
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+from python_research.services.dataset_store import CONTINUOUS_COLS, CYCLICAL_COLS, TARGET_COL, open_store
+
+# Script hyperparameters (model_lstm.py / model_ttm.py); grids override them
+DEFAULTS = {
+    "lstm": {
+        "look_back": 24, "look_ahead": 12, "units": 128, "lstm_layers": 3, "dense_units": 256,
+        "dropout": 0.3, "learning_rate": 0.001, "huber_delta": 20, "batch_size": 32,
+        "epochs": 20, "patience": 5, "seed": 42,
+    },
+    "ttm": {
+        "look_back": 24, "look_ahead": 12, "d_model": 48, "patch_size": 4, "learning_rate": 1e-5,
+        "batch_size": 32, "epochs": 20, "patience": 5, "seed": 42,
+    },
+}
+
+# Used when neither --grid nor --param is given
+DEFAULT_GRIDS = {
+    "lstm": {"units": [64, 128], "learning_rate": [1e-3, 5e-4], "look_back": [24, 48]},
+    "ttm": {"d_model": [32, 48, 64], "learning_rate": [1e-5, 1e-4]},
+}
+
+PRUNE_GRACE_EPOCHS = 3  # never prune before this many epochs
+PRUNE_MIN_TRIALS = 3    # finished curves needed before the median means anything
+
+FEATURE_COLS = CONTINUOUS_COLS + CYCLICAL_COLS
+
+
+# ===============================
+# Grid + results table
+# ===============================
+
+def check_config(config):
+    """Reject configurations no trial could train, before any worker starts."""
+    for name in ("epochs", "patience", "batch_size", "look_back", "look_ahead"):
+        if not isinstance(config[name], int) or config[name] < 1:
+            raise ValueError(f"{name} must be an integer >= 1, got {config[name]!r}")
+    return config
+
+
+def expand_grid(model, grid):
+    """Cartesian product of the grid over the model defaults, in a stable order."""
+    names = sorted(grid)
+    return [check_config({**DEFAULTS[model], **dict(zip(names, values))})
+            for values in itertools.product(*(grid[n] for n in names))]
+
+
+def trial_id(model, config):
+    blob = json.dumps({"model": model, **config}, sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:12]
+
+
+def open_results(out_dir):
+    db = sqlite3.connect(Path(out_dir) / "sweep.db")
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS trials (
+            trial_id TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            config TEXT NOT NULL,
+            status TEXT NOT NULL,
+            epochs INTEGER,
+            best_val_loss REAL,
+            val_curve TEXT,
+            metrics TEXT,
+            artifact_dir TEXT,
+            error TEXT,
+            started_at TEXT,
+            finished_at TEXT,
+            duration_s REAL
+        )
+    """)
+    db.commit()
+    return db
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def finished_curves(db, model):
+    """Validation curves of completed (not pruned) trials, the pruning reference."""
+    rows = db.execute("SELECT val_curve FROM trials WHERE model = ? AND status = 'done'", (model,))
+    return [json.loads(r[0]) for r in rows if r[0]]
+
+
+def export_csv(db, out_dir):
+    import pandas as pd
+
+    rows = []
+    for tid, model, config, status, epochs, best, metrics, artifacts, error, duration in db.execute(
+            "SELECT trial_id, model, config, status, epochs, best_val_loss, metrics, artifact_dir, error, "
+            "duration_s FROM trials ORDER BY best_val_loss IS NULL, best_val_loss"):
+        row = {"trial_id": tid, "model": model, "status": status, "epochs": epochs,
+               "best_val_loss": best, "duration_s": duration, "artifact_dir": artifacts, "error": error}
+        row.update({f"cfg.{k}": v for k, v in json.loads(config).items()})
+        row.update({k: v for k, v in json.loads(metrics or "{}").items() if not isinstance(v, list)})
+        rows.append(row)
+    pd.DataFrame(rows).to_csv(Path(out_dir) / "results.csv", index=False)
+
+
+# ===============================
+# Early abort
+# ===============================
+
+def should_prune(curve, reference, grace_epochs=PRUNE_GRACE_EPOCHS, min_trials=PRUNE_MIN_TRIALS):
+    """
+    Median stopping rule: prune once this trial's best loss so far is worse
+    than the median of finished trials' best loss by the same epoch.
+    """
+    if not np.isfinite(curve[-1]):
+        return True
+    epoch = len(curve)
+    if epoch < grace_epochs or len(reference) < min_trials:
+        return False
+    best_by_epoch = [min(ref[:epoch]) for ref in reference if ref]
+    return min(curve) > float(np.median(best_by_epoch))
+
+
+# ===============================
+# Trials (run inside the worker processes)
+# ===============================
+
+def _pin_worker(slot, threads):
+    """Bind this worker to its own `threads` cores (Linux); BLAS/OMP counts are inherited from the parent."""
+    if hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpus[(slot * threads + i) % len(cpus)] for i in range(threads)})
+
+
+def forecast_metrics(actual, pred):
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    hourly_rmse = [float(np.sqrt(mean_squared_error(actual[:, i], pred[:, i]))) for i in range(actual.shape[1])]
+    return {
+        "rmse": float(np.sqrt(mean_squared_error(actual.flatten(), pred.flatten()))),
+        "mae": float(mean_absolute_error(actual.flatten(), pred.flatten())),
+        "rmse_t1": hourly_rmse[0],
+        "r2_t1": float(r2_score(actual[:, 0], pred[:, 0])),
+        "hourly_rmse": hourly_rmse,
+    }
+
+
+def lstm_trial(config, trial_dir, threads, reference):
+    import joblib
+    import tensorflow as tf
+    from sklearn.preprocessing import StandardScaler
+    from tensorflow import keras
+
+    from python_research.models.architectures import build_lstm
+    from python_research.models.streaming import ShardPlan, StreamingWindows, fit_scalers
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    keras.utils.set_random_seed(config["seed"])
+
+    look_back, look_ahead = config["look_back"], config["look_ahead"]
+    plan = ShardPlan.from_store({"train": 0.8, "test": 0.2}, look_back, look_ahead)
+    scaler_X = StandardScaler()
+    fit_scalers(plan, "train", [(scaler_X, FEATURE_COLS)])
+    train_windows = StreamingWindows(plan, "train", FEATURE_COLS, TARGET_COL, [(scaler_X, FEATURE_COLS)])
+    test_windows = StreamingWindows(plan, "test", FEATURE_COLS, TARGET_COL, [(scaler_X, FEATURE_COLS)])
+
+    model = build_lstm(
+        look_back, len(FEATURE_COLS), look_ahead, len(plan.station_ids),
+        units=config["units"], lstm_layers=config["lstm_layers"], dense_units=config["dense_units"],
+        dropout=config["dropout"], learning_rate=config["learning_rate"], huber_delta=config["huber_delta"],
+    )
+
+    curve, pruned = [], []
+
+    class Pruner(keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            curve.append(float(logs["val_loss"]))
+            if should_prune(curve, reference):
+                pruned.append(epoch)
+                self.model.stop_training = True
+
+    test_data = test_windows.as_tf_dataset(batch_size=config["batch_size"])
+    early_stopping = keras.callbacks.EarlyStopping(monitor="val_loss", patience=config["patience"],
+                                                   restore_best_weights=True)
+    model.fit(
+        train_windows.as_tf_dataset(batch_size=config["batch_size"], shuffle=True, seed=config["seed"]),
+        epochs=config["epochs"],
+        validation_data=test_data,
+        verbose=0,
+        callbacks=[
+            Pruner(),
+            early_stopping,
+            keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=0.5, patience=3, min_lr=1e-5),
+        ],
+    )
+    if pruned:
+        return curve, None, True
+    if early_stopping.best_weights is None:
+        # nothing to restore: the weights are untrained, not the best epoch's
+        raise RuntimeError(f"no epoch finished with a validation loss ({len(curve)} epochs)")
+
+    pred = np.clip(model.predict(test_data, verbose=0), 0, 500)
+    actual = test_windows.targets()
+    metrics = forecast_metrics(actual, pred)
+    baseline = np.repeat(test_windows.last_step(slice(0, 1)), look_ahead, axis=1)
+    metrics["baseline_rmse"] = forecast_metrics(actual, baseline)["rmse"]
+
+    model.save(trial_dir / "model.keras")
+    joblib.dump(scaler_X, trial_dir / "scaler_x.pkl")
+    return curve, metrics, False
+
+
+def ttm_trial(config, trial_dir, threads, reference):
+    import joblib
+    import torch
+    import torch.nn as nn
+    from sklearn.preprocessing import StandardScaler
+
+    from python_research.models.architectures import build_ttm
+    from python_research.models.streaming import ShardPlan, StreamingWindows, fit_scalers
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    torch.manual_seed(config["seed"])
+
+    look_back, look_ahead = config["look_back"], config["look_ahead"]
+    feature_cols = FEATURE_COLS + [TARGET_COL]
+    plan = ShardPlan.from_store({"train": 0.7, "val": 0.1, "test": 0.2}, look_back, look_ahead)
+    scaler_X, scaler_y = StandardScaler(), StandardScaler()
+    scalers = [(scaler_X, FEATURE_COLS), (scaler_y, [TARGET_COL])]
+    fit_scalers(plan, "train", scalers)
+    windows = {split: StreamingWindows(plan, split, feature_cols, TARGET_COL, scalers)
+               for split in ("train", "val", "test")}
+
+    model, optimizer = build_ttm(look_back, look_ahead, len(feature_cols), "cpu",
+                                 d_model=config["d_model"], patch_size=config["patch_size"],
+                                 learning_rate=config["learning_rate"])
+    loss_fn = nn.L1Loss()
+
+    def batches(split, shuffle=False):
+        # loader workers would fight the trial's thread budget; the trial process reads shards itself
+        return windows[split].as_torch(batch_size=config["batch_size"], shuffle=shuffle, seed=config["seed"])
+
+    train_batches = batches("train", shuffle=True)
+    curve, best_state, stale = [], None, 0
+    for _ in range(config["epochs"]):
+        model.train()
+        for xb, yb in train_batches:
+            optimizer.zero_grad()
+            loss = loss_fn(model(past_values=xb).prediction_outputs[:, :, 0], yb)
+            loss.backward()
+            optimizer.step()
+
+        model.eval()
+        total, count = 0.0, 0
+        with torch.no_grad():
+            for xb, yb in batches("val"):
+                total += loss_fn(model(past_values=xb).prediction_outputs[:, :, 0], yb).item()
+                count += 1
+        curve.append(total / max(count, 1))
+
+        if should_prune(curve, reference):
+            return curve, None, True
+        if curve[-1] <= min(curve):
+            best_state, stale = {k: v.clone() for k, v in model.state_dict().items()}, 0
+        else:
+            stale += 1
+            if stale >= config["patience"]:
+                break
+
+    if best_state is None:
+        raise RuntimeError(f"no epoch finished with a validation loss ({len(curve)} epochs)")
+    model.load_state_dict(best_state)
+    model.eval()
+    with torch.no_grad():
+        pred = np.concatenate([model(past_values=xb).prediction_outputs[:, :, 0].numpy()
+                               for xb, _ in batches("test")])
+    actual = windows["test"].targets()
+    pred_inv = np.clip(scaler_y.inverse_transform(pred.reshape(-1, 1)).reshape(pred.shape), 0, 500)
+    actual_inv = scaler_y.inverse_transform(actual.reshape(-1, 1)).reshape(actual.shape)
+    metrics = forecast_metrics(actual_inv, pred_inv)
+
+    torch.save(model.state_dict(), trial_dir / "model.pt")
+    joblib.dump(scaler_X, trial_dir / "scaler_x.pkl")
+    joblib.dump(scaler_y, trial_dir / "scaler_y.pkl")
+    return curve, metrics, False
+
+
+TRIALS = {"lstm": lstm_trial, "ttm": ttm_trial}
+
+
+def run_trial(model, tid, config, trial_dir, slot, threads, reference):
+    """Worker entry point. Never raises; failures come back as status "failed"."""
+    _pin_worker(slot, threads)
+    started = time.perf_counter()
+    trial_dir = Path(trial_dir)
+    trial_dir.mkdir(parents=True, exist_ok=True)
+    (trial_dir / "config.json").write_text(json.dumps(config, indent=2))
+
+    result = {"trial_id": tid, "curve": None, "metrics": None, "error": None}
+    try:
+        curve, metrics, pruned = TRIALS[model](config, trial_dir, threads, reference)
+        result.update(curve=curve, metrics=metrics, status="pruned" if pruned else "done")
+    except Exception as e:
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+        (trial_dir / "error.txt").write_text(traceback.format_exc())
+    result["duration_s"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+# ===============================
+# Driver
+# ===============================
+
+def run_sweep(model, grid, out_dir, workers, threads, retry_failed=False):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    db = open_results(out_dir)
+
+    # Build the store once here rather than racing to build it in every worker
+    open_store()
+
+    # A trial still "running" was interrupted last time; it starts over
+    db.execute("UPDATE trials SET status = 'interrupted' WHERE status = 'running'")
+    db.commit()
+
+    skip = ("done", "pruned") if retry_failed else ("done", "pruned", "failed")
+    statuses = dict(db.execute("SELECT trial_id, status FROM trials"))
+    pending, skipped = [], 0
+    for config in expand_grid(model, grid):
+        tid = trial_id(model, config)
+        if statuses.get(tid) in skip:
+            skipped += 1
+            continue
+        pending.append((tid, config))
+        db.execute("INSERT OR IGNORE INTO trials (trial_id, model, config, status) VALUES (?, ?, ?, 'queued')",
+                   (tid, model, json.dumps(config, sort_keys=True)))
+    db.commit()
+    print(f"{model} sweep: {len(pending)} trials to run, {skipped} already finished; "
+          f"{workers} workers x {threads} threads", flush=True)
+
+    # Thread counts are read when numpy/TF/torch load, so they go in the env the workers spawn with
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+    # spawn: TF / torch are not fork-safe; one trial per process frees its memory when it ends
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), max_tasks_per_child=1)
+    running, free_slots = {}, list(range(workers))
+    queue = list(pending)
+    try:
+        while queue or running:
+            while queue and free_slots:
+                tid, config = queue.pop(0)
+                slot = free_slots.pop(0)
+                trial_dir = out_dir / "trials" / tid
+                future = pool.submit(run_trial, model, tid, config, str(trial_dir), slot, threads,
+                                     finished_curves(db, model))
+                running[future] = (tid, slot)
+                db.execute("UPDATE trials SET status = 'running', started_at = ?, artifact_dir = ?, error = NULL "
+                           "WHERE trial_id = ?", (_now(), str(trial_dir), tid))
+                db.commit()
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                tid, slot = running.pop(future)
+                free_slots.append(slot)
+                try:
+                    result = future.result()
+                except Exception as e:  # the worker process itself died
+                    result = {"trial_id": tid, "status": "failed", "curve": None, "metrics": None,
+                              "error": f"{type(e).__name__}: {e}", "duration_s": None}
+                _record(db, result)
+                best = min(result["curve"]) if result["curve"] else None
+                print(f"[{tid}] {result['status']} best_val_loss={best} "
+                      f"{result['error'] or ''}", flush=True)
+            export_csv(db, out_dir)
+    except KeyboardInterrupt:
+        print("Interrupted; re-run the same command to resume", flush=True)
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    export_csv(db, out_dir)
+    db.close()
+
+
+def _record(db, result):
+    curve = result["curve"]
+    db.execute(
+        "UPDATE trials SET status = ?, epochs = ?, best_val_loss = ?, val_curve = ?, metrics = ?, error = ?, "
+        "finished_at = ?, duration_s = ? WHERE trial_id = ?",
+        (result["status"], len(curve) if curve else None, min(curve) if curve else None,
+         json.dumps(curve) if curve else None, json.dumps(result["metrics"]) if result["metrics"] else None,
+         result["error"], _now(), result["duration_s"], result["trial_id"]),
+    )
+    db.commit()
+
+
+def _parse_param(text):
+    """'units=64,128' -> ("units", [64, 128]); values are JSON where possible."""
+    name, _, values = text.partition("=")
+
+    def value(v):
+        try:
+            return json.loads(v)
+        except ValueError:
+            return v
+
+    return name, [value(v) for v in values.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel LSTM / TTM hyperparameter sweep")
+    parser.add_argument("model", choices=sorted(TRIALS))
+    parser.add_argument("--grid", help="JSON file: {param: [values, ...]}")
+    parser.add_argument("--param", action="append", default=[], help="name=v1,v2,... (repeatable)")
+    parser.add_argument("--threads", type=int, default=1, help="threads per trial")
+    parser.add_argument("--workers", type=int, help="parallel trials (default: cores // threads)")
+    parser.add_argument("--out", help="results directory (default: sweeps/<model>)")
+    parser.add_argument("--retry-failed", action="store_true")
+    args = parser.parse_args()
+
+    grid = json.loads(Path(args.grid).read_text()) if args.grid else {}
+    grid.update(_parse_param(p) for p in args.param)
+    unknown = set(grid) - set(DEFAULTS[args.model])
+    if unknown:
+        parser.error(f"unknown {args.model} params: {', '.join(sorted(unknown))}")
+    try:
+        expand_grid(args.model, grid or DEFAULT_GRIDS[args.model])
+    except ValueError as e:
+        parser.error(str(e))
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    run_sweep(
+        args.model,
+        grid or DEFAULT_GRIDS[args.model],
+        args.out or Path("sweeps") / args.model,
+        workers=args.workers or max(1, cores // args.threads),
+        threads=args.threads,
+        retry_failed=args.retry_failed,
+    )
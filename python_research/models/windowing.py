@@ -0,0 +1,149 @@
+"""
+Zero-copy training windows for the LSTM and TTM scripts.
+
+Each station's rows are stored once; every (look_back, features) input window
+and (look_ahead,) target window is a strided view into them built with
+sliding_window_view. Arrays are only materialised one batch at a time, so
+memory stays ~1x the raw rows instead of ~look_back x.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class StationWindows:
+    """
+    Windows over one station's chronologically ordered rows:
+        X[i] = features[i : i + look_back]
+        y[i] = targets[i + look_back : i + look_back + look_ahead]
+    Both are read-only views, no rows are copied.
+    """
+
+    def __init__(self, features, targets, station_id, look_back=24, look_ahead=12):
+        self.features = np.ascontiguousarray(features, dtype=np.float32)
+        self.targets = np.ascontiguousarray(targets, dtype=np.float32)
+        self.station_id = station_id
+
+        n = max(len(self.features) - look_back - look_ahead + 1, 0)
+        if n == 0:
+            self.X = np.empty((0, look_back, self.features.shape[1]), dtype=np.float32)
+            self.y = np.empty((0, look_ahead), dtype=np.float32)
+        else:
+            # sliding_window_view puts the window axis last: (n, features, look_back) -> swap
+            self.X = sliding_window_view(self.features, look_back, axis=0)[:n].transpose(0, 2, 1)
+            self.y = sliding_window_view(self.targets[look_back:], look_ahead)[:n]
+
+    def __len__(self):
+        return len(self.X)
+
+
+class WindowSet:
+    """
+    All stations' windows behind one flat index, in the same order the old
+    list-based create_sequences produced (station by station, then by time).
+    """
+
+    def __init__(self, stations):
+        self.stations = [s for s in stations if len(s)]
+        self._offsets = np.cumsum([0] + [len(s) for s in self.stations])
+
+    @classmethod
+    def from_frame(cls, df, feature_cols, target_col, look_back=24, look_ahead=12, station_col="station_id"):
+        stations = []
+        for station in df[station_col].unique():
+            df_s = df[df[station_col] == station]
+            stations.append(StationWindows(df_s[feature_cols].values, df_s[target_col].values,
+                                           station, look_back, look_ahead))
+        return cls(stations)
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def _locate(self, indices):
+        indices = np.asarray(indices)
+        blocks = np.searchsorted(self._offsets, indices, side="right") - 1
+        return blocks, indices - self._offsets[blocks]
+
+    def batch(self, indices):
+        """Materialise (X, station_ids, y) for the given flat indices only."""
+        blocks, local = self._locate(indices)
+        X = np.empty((len(indices),) + self.stations[0].X.shape[1:], dtype=np.float32)
+        y = np.empty((len(indices),) + self.stations[0].y.shape[1:], dtype=np.float32)
+        station_ids = np.empty(len(indices), dtype=np.int32)
+        for b in np.unique(blocks):
+            mask = blocks == b
+            X[mask] = self.stations[b].X[local[mask]]
+            y[mask] = self.stations[b].y[local[mask]]
+            station_ids[mask] = self.stations[b].station_id
+        return X, station_ids, y
+
+    def iter_batches(self, batch_size=32, shuffle=False, seed=None):
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for start in range(0, len(order), batch_size):
+            yield self.batch(order[start:start + batch_size])
+
+    def targets(self):
+        """All target windows as one (samples, look_ahead) array; small next to X."""
+        return np.concatenate([s.y for s in self.stations])
+
+    def last_step(self, columns):
+        """X[:, -1, columns] without materialising X."""
+        return np.concatenate([s.X[:, -1, columns] for s in self.stations])
+
+    # --- framework adapters (imported lazily so neither path needs the other) ---
+    def as_keras(self, batch_size=32, shuffle=False, seed=None, target_axis=True):
+        """keras PyDataset yielding ((X, station_ids), y) batches."""
+        from tensorflow import keras
+
+        window_set = self
+
+        class KerasWindows(keras.utils.PyDataset):
+            def __init__(self):
+                super().__init__()
+                self.order = np.arange(len(window_set))
+                self.rng = np.random.default_rng(seed)
+                self.on_epoch_end()
+
+            def __len__(self):
+                return int(np.ceil(len(window_set) / batch_size))
+
+            def __getitem__(self, i):
+                X, station_ids, y = window_set.batch(self.order[i * batch_size:(i + 1) * batch_size])
+                if target_axis:
+                    y = y[..., np.newaxis]
+                return (X, station_ids.reshape(-1, 1)), y
+
+            def on_epoch_end(self):
+                if shuffle:
+                    self.rng.shuffle(self.order)
+
+        return KerasWindows()
+
+    def as_torch(self, with_station=False):
+        """torch Dataset returning (X, y) (or (X, station_id, y)) tensors per window."""
+        import torch
+        from torch.utils.data import Dataset
+
+        window_set = self
+
+        class TorchWindows(Dataset):
+            def __len__(self):
+                return len(window_set)
+
+            def __getitem__(self, i):
+                X, station_ids, y = window_set.batch([i])
+                X, y = torch.from_numpy(X[0]), torch.from_numpy(y[0])
+                if with_station:
+                    return X, int(station_ids[0]), y
+                return X, y
+
+            # DataLoader's automatic batching (torch >= 2.0) fetches a whole batch in one call
+            def __getitems__(self, indices):
+                X, station_ids, y = window_set.batch(indices)
+                X, y = torch.from_numpy(X), torch.from_numpy(y)
+                if with_station:
+                    return list(zip(X, station_ids.tolist(), y))
+                return list(zip(X, y))
+
+        return TorchWindows()
@@ -1,61 +1,75 @@
 import asyncio
 import logging
 import os
-from fastapi import APIRouter, HTTPException
-from python_research.schemas.schema import JavaRouteRequest, ForecastRequest, ForecastResponse, RouteRequest
-from python_research.services.aqi_engine import fetch_google_aqi_profile, get_aqi_info, get_multi_station_forecast, haversine, interpolate_pollutants, fetch_google_weather_history, fetch_google_aqi_history, weighted_average
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from python_research.schemas.schema import BatchRouteRequest, JavaRouteRequest, ForecastRequest, ForecastResponse, RouteRequest
+from python_research.services.aqi_engine import fetch_google_aqi_profile_async, get_aqi_info, inference_batcher, model_status, interpolate_jobs, krige_routes, route_profiles_from_arrays, TARGET_POLLUTANTS
+from python_research.services.cache import response_cache, upstream_flights
+from python_research.services.upstream import upstream
+from python_research.services.executor import ExecutorSaturated, cpu_pool, kriging_pool
+from python_research.services.stations import STATIONS, station_registry
+from python_research.services.polyline import simplify_route
+from python_research.services.spatial import route_hourly_idw
+from python_research.services.serialization import forecast_columns, negotiate_format, render, wants_columnar
+from python_research.services.streaming import STREAM_CHUNK_POINTS, STREAM_MEDIA_TYPES, encode_stream
+from python_research.services.station_feed import LOOK_BACK_HOURS, current_raster, fetch_station_history, get_or_refresh_snapshot, snapshot_meta
+from python_research.services.ingest import ingest_stats, stored_histories
 import numpy as np
 from datetime import datetime, timedelta
-import httpx
-http_client = httpx.AsyncClient(timeout=5)
 
 router = APIRouter()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+BATCH_MAX_JOBS = int(os.getenv("AQI_BATCH_MAX_JOBS", "50"))  # one call must not queue unbounded kriging work
 
-# Fixed Station Coordinates
-STATIONS = {
-    "station_0": {"lat": 23.51905342888936, "lon": 87.34565136450719},
-    "station_1": {"lat": 23.564018931392827, "lon": 87.31123928017463},
-    "station_2": {"lat": 23.5391718044899, "lon": 87.30401858752859},
-    "station_3": {"lat": 23.554806202241476, "lon": 87.24681601086061},
-}
+async def offload(pool, fn, *args):
+    """Run CPU-bound work off the event loop; a full pool is a retryable 503."""
+    try:
+        return await pool.run(fn, *args)
+    except ExecutorSaturated as e:
+        logging.warning(str(e))
+        raise HTTPException(status_code=503, detail="Server busy, retry shortly", headers={"Retry-After": "1"})
 
 def find_nearest_station(lat, lon):
-    min_dist = float("inf")
-    nearest_station = None
-
-    for station_id, coords in STATIONS.items():
-        d = haversine(lat, lon, coords["lat"], coords["lon"])
-        if d < min_dist:
-            min_dist = d
-            nearest_station = station_id
-
-    return nearest_station
-    
-@router.post("/analyze-routes")
-async def analyze_routes(data: JavaRouteRequest):
-    print(f"DEBUG: Processing {data.routeCount} routes", flush=True)
-    
-    # 1. Handle API Failures for Start/End points
-    try:
-        start_p = fetch_google_aqi_profile(data.start_loc[0], data.start_loc[1], GOOGLE_API_KEY)
-        end_p = fetch_google_aqi_profile(data.end_loc[0], data.end_loc[1], GOOGLE_API_KEY)
-    except Exception as e:
-        logging.error(f"Google API Error: {e}")
-        raise HTTPException(status_code=503, detail="Air Quality Service temporarily unavailable")
+    nearest, _ = station_registry.nearest([lat], [lon])
+    return nearest[0]
     
+def endpoint_key(loc):
+    # ~0.1 m: identical coordinates from different jobs share one lookup
+    return (round(loc[0], 6), round(loc[1], 6))
+
+def _average(values, weights=None):
+    if not values:
+        return 0
+    if weights is None:
+        return round(sum(values) / len(values), 2)
+    # Distance-weighted exposure along a simplified route
+    return round(float(np.dot(values, weights) / np.sum(weights)), 2)
+
+def prepare_routes(routes):
+    """
+    Evaluation points per route, plus length weights when polyline
+    simplification (ROUTE_SIMPLIFY) is enabled or the route was capped at
+    ROUTE_MAX_POINTS; weights are None otherwise.
+    """
+    prepared = [simplify_route([[c.lat, c.lng] for c in route.coordinates]) for route in routes]
+    return [points for points, _ in prepared], [weights for _, weights in prepared]
+
+def route_details(routes_points, routes_arrays):
+    return [route_profiles_from_arrays(points, values) for points, values in zip(routes_points, routes_arrays)]
+
+def summarize_routes(routes, routes_details, routes_weights=None):
+    routes_weights = routes_weights or [None] * len(routes)
     comparisons = {}
-    for i, route in enumerate(data.routes):
-        points = [[c.lat, c.lng] for c in route.coordinates]
-        path_details = interpolate_pollutants(start_p, end_p, points)
-
+    for i, (route, path_details, weights) in enumerate(zip(routes, routes_details, routes_weights)):
         pm25_vals = [p['pm25'] for p in path_details if isinstance(p.get('pm25'), (int, float))]
         pm10_vals = [p['pm10'] for p in path_details if isinstance(p.get('pm10'), (int, float))]
         co_vals   = [p['co']   for p in path_details if isinstance(p.get('co'), (int, float))]
 
-        avg_pm25 = round(sum(pm25_vals) / len(pm25_vals), 2) if pm25_vals else 0
-        avg_pm10 = round(sum(pm10_vals) / len(pm10_vals), 2) if pm10_vals else 0
-        avg_co   = round(sum(co_vals)   / len(co_vals), 2) if co_vals else 0
+        avg_pm25 = _average(pm25_vals, weights)
+        avg_pm10 = _average(pm10_vals, weights)
+        avg_co   = _average(co_vals, weights)
 
         
         # aqis = [p['aqi'] for p in path_details if isinstance(p['aqi'], (int, float))]
@@ -70,49 +84,270 @@ async def analyze_routes(data: JavaRouteRequest):
             "avg_co": avg_co,
             "details": path_details
         }
-    return {"status": "success", 
-            "ground_truth": {"start_point": start_p, "end_point": end_p},
-            "route_analysis": comparisons}
+    return comparisons
+
+def route_columns(points, values):
+    """Parallel arrays for one route's point profiles (same rounding as the row format)."""
+    columns = {"lat": [p[0] for p in points], "lng": [p[1] for p in points]}
+    for p_type in TARGET_POLLUTANTS:
+        columns[p_type] = [round(z, 2) for z in values[p_type].tolist()]
+    return columns
+
+def summarize_routes_columnar(routes, routes_points, routes_arrays, routes_weights):
+    comparisons = {}
+    for i, (route, points, values, weights) in enumerate(zip(routes, routes_points, routes_arrays, routes_weights)):
+        details = route_columns(points, values)
+        comparisons[f"Route_{i+1}"] = {
+            "distance": route.distance,
+            "duration": route.duration,
+            "avg_pm25": _average(details["pm25"], weights),
+            "avg_pm10": _average(details["pm10"], weights),
+            "avg_co": _average(details["co"], weights),
+            "details": details
+        }
+    return comparisons
+
+def _route_table(comparisons):
+    """Flatten columnar route details into one Arrow-ready table, stripping them from the summary."""
+    table = {"route": [], "lat": [], "lng": [], **{p_type: [] for p_type in TARGET_POLLUTANTS}}
+    for route_name, summary in comparisons.items():
+        details = summary.pop("details")
+        table["route"].extend([route_name] * len(details["lat"]))
+        for column, values in details.items():
+            table[column].extend(values)
+    return table
+
+def _forecast_table(station_forecasts, route_forecasts):
+    table = {"series": [], "time": [], "aqi": [], "category": [], "color": []}
+    series = list(station_forecasts.items()) + [(name, rf["forecast"]) for name, rf in route_forecasts.items()]
+    for name, columns in series:
+        table["series"].extend([name] * len(columns["time"]))
+        for column, values in columns.items():
+            table[column].extend(values)
+    return table
+
+def stream_route_events(routes, routes_points, routes_arrays, routes_weights, start_p, end_p):
+    """
+    Events for a streamed /analyze-routes response: ground truth, then per
+    route its summary followed by its point profiles in chunks. Point dicts
+    are only built chunk by chunk, so memory stays flat for long routes.
+    """
+    yield {"type": "ground_truth", "start_point": start_p, "end_point": end_p}
+
+    for i, (route, points, values, weights) in enumerate(zip(routes, routes_points, routes_arrays, routes_weights)):
+        route_name = f"Route_{i+1}"
+        yield {
+            "type": "route",
+            "route": route_name,
+            "distance": route.distance,
+            "duration": route.duration,
+            "avg_pm25": _average([round(z, 2) for z in values["pm25"].tolist()], weights),
+            "avg_pm10": _average([round(z, 2) for z in values["pm10"].tolist()], weights),
+            "avg_co": _average([round(z, 2) for z in values["co"].tolist()], weights),
+            "point_count": len(points),
+        }
+
+        for offset in range(0, len(points), STREAM_CHUNK_POINTS):
+            end = offset + STREAM_CHUNK_POINTS
+            chunk_values = {p_type: v[offset:end] for p_type, v in values.items()}
+            yield {
+                "type": "points",
+                "route": route_name,
+                "offset": offset,
+                "details": route_profiles_from_arrays(points[offset:end], chunk_values),
+            }
+
+    yield {"type": "end", "status": "success"}
+
+def forecast_routes(routes, final_forecast_data, raster=None):
+    """Hourly AQI forecast along each route from the station forecasts of one snapshot."""
+    route_forecasts = {}
+
+    # Stations x hours forecast matrix, shared by every route
+    anchors = station_registry.coords
+    station_series = np.array([[h["aqi"] for h in final_forecast_data[sid]] for sid in station_registry.ids])
+    hour_labels = [h["time"] for h in final_forecast_data["station_0"]]
+    # Precomputed grid for this snapshot: scoring is a bilinear lookup
+    forecast_layers = raster.layer_indices("forecast:") if raster is not None else []
+
+    for idx, route in enumerate(routes):
+        route_name = f"Route_{idx+1}"
+        pts = route.coordinates
+
+        # --- DIVERSIFICATION LOGIC ---
+        # Agar Google same coordinates de raha hai, toh hum 'Path Simulation' karenge
+        # Route 1: Direct (Model Default)
+        # Route 2: Industry Bias (DSP Side)
+        # Route 3: Residential Bias (Bidhannagar Side)
+        bias_lat, bias_lng = 0.0, 0.0
+
+        if idx == 1: # Route 2 ko Industrial (Station 3) ki taraf thoda pull karo
+            bias_lat = (STATIONS["station_3"]["lat"] - pts[0].lat) * 0.15
+            bias_lng = (STATIONS["station_3"]["lon"] - pts[0].lng) * 0.15
+        elif idx == 2: # Route 3 ko Green (Station 0) ki taraf pull karo
+            bias_lat = (STATIONS["station_0"]["lat"] - pts[0].lat) * 0.15
+            bias_lng = (STATIONS["station_0"]["lon"] - pts[0].lng) * 0.15
+
+        # Applying the path bias, then one weight matrix for all hours
+        adj_points = np.array([[pt.lat + bias_lat, pt.lng + bias_lng] for pt in pts])
+        if len(forecast_layers) == len(hour_labels) and raster.contains(adj_points):
+            hourly_aqi = raster.sample(adj_points, forecast_layers).mean(axis=0)
+        else:
+            hourly_aqi = route_hourly_idw(adj_points, anchors, station_series)
+
+        route_hourly = [{
+            "time": label,
+            "aqi": round(route_avg, 2),
+            "health_info": get_aqi_info(route_avg)
+        } for label, route_avg in zip(hour_labels, hourly_aqi.tolist())]
+
+        route_forecasts[route_name] = {
+            "forecast": route_hourly,
+            "avg_route_aqi": round(sum(h['aqi'] for h in route_hourly)/len(route_hourly), 2)
+        }
+
+    return route_forecasts
+
+@router.get("/cache-stats")
+async def cache_stats():
+    return {"status": "success", "cache": response_cache.stats(), "singleflight": upstream_flights.stats()}
+
+@router.get("/upstream-stats")
+async def upstream_stats():
+    return {"status": "success", "upstream": upstream.stats()}
+
+@router.get("/executor-stats")
+async def executor_stats():
+    return {"status": "success", "cpu": cpu_pool.stats(), "kriging": kriging_pool.stats()}
+
+@router.get("/ingest-stats")
+async def ingest_stats_endpoint():
+    return {"status": "success", "ingest": ingest_stats()}
+
+@router.get("/inference-stats")
+async def inference_stats():
+    return {"status": "success", "model": model_status(), "batcher": inference_batcher.stats()}
+
+@router.post("/analyze-routes")
+async def analyze_routes(data: JavaRouteRequest,
+                         stream: Optional[str] = Query(None, pattern="^(ndjson|sse)$"),
+                         format: Optional[str] = Query(None, pattern="^(rows|columnar)$"),
+                         source: Optional[str] = Query(None, pattern="^(kriging|raster)$"),
+                         accept: Optional[str] = Header(None)):
+    print(f"DEBUG: Processing {data.routeCount} routes", flush=True)
+
+    routes_points, routes_weights = prepare_routes(data.routes)
+
+    # Opt-in: read current conditions off the city raster instead of
+    # kriging between live endpoint lookups (no upstream call at all)
+    raster = current_raster() if source == "raster" else None
+    if raster is not None and raster.contains([data.start_loc, data.end_loc]) \
+            and all(raster.contains(points) for points in routes_points):
+        start_p = raster.point_profile(data.start_loc[0], data.start_loc[1], TARGET_POLLUTANTS)
+        end_p = raster.point_profile(data.end_loc[0], data.end_loc[1], TARGET_POLLUTANTS)
+        routes_arrays = raster.route_arrays(routes_points, TARGET_POLLUTANTS)
+    else:
+        # 1. Handle API Failures for Start/End points
+        try:
+            start_p, end_p = await asyncio.gather(
+                fetch_google_aqi_profile_async(data.start_loc[0], data.start_loc[1], GOOGLE_API_KEY),
+                fetch_google_aqi_profile_async(data.end_loc[0], data.end_loc[1], GOOGLE_API_KEY),
+            )
+        except Exception as e:
+            logging.error(f"Google API Error: {e}")
+            raise HTTPException(status_code=503, detail="Air Quality Service temporarily unavailable")
+
+        # Krige every point of every route in one batched pass
+        routes_arrays = await offload(kriging_pool, krige_routes, start_p, end_p, routes_points)
+
+    # Opt-in streaming: summaries first, point profiles as they are built
+    if stream:
+        events = stream_route_events(data.routes, routes_points, routes_arrays, routes_weights, start_p, end_p)
+        return StreamingResponse(encode_stream(events, stream), media_type=STREAM_MEDIA_TYPES[stream])
+
+    wire_format = negotiate_format(accept)
+    if wants_columnar(format, wire_format):
+        # Parallel arrays straight from the kriging output, no per-point dicts
+        comparisons = summarize_routes_columnar(data.routes, routes_points, routes_arrays, routes_weights)
+        content = {"status": "success",
+                   "ground_truth": {"start_point": start_p, "end_point": end_p},
+                   "route_analysis": comparisons}
+        table = _route_table(comparisons) if wire_format == "arrow" else None
+        return render(content, wire_format, table)
+
+    routes_details = await offload(cpu_pool, route_details, routes_points, routes_arrays)
+
+    return render({"status": "success", 
+                   "ground_truth": {"start_point": start_p, "end_point": end_p},
+                   "route_analysis": summarize_routes(data.routes, routes_details, routes_weights)})
+
+
+@router.post("/analyze-routes/batch")
+async def analyze_routes_batch(data: BatchRouteRequest):
+    """
+    Score many start/end jobs in one call. Endpoint lookups are deduplicated
+    across jobs and all jobs are kriged together; results keep job order.
+    """
+    if len(data.jobs) > BATCH_MAX_JOBS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_JOBS} jobs per batch, got {len(data.jobs)}")
+    logging.debug(f"Processing batch of {len(data.jobs)} route jobs")
+
+    # 1. One upstream lookup per distinct endpoint
+    endpoints = {}
+    for job in data.jobs:
+        for loc in (job.start_loc, job.end_loc):
+            endpoints.setdefault(endpoint_key(loc), loc)
+
+    try:
+        profiles = await asyncio.gather(*[
+            fetch_google_aqi_profile_async(loc[0], loc[1], GOOGLE_API_KEY)
+            for loc in endpoints.values()
+        ])
+    except Exception as e:
+        logging.error(f"Google API Error: {e}")
+        raise HTTPException(status_code=503, detail="Air Quality Service temporarily unavailable")
+    profile_by_key = dict(zip(endpoints.keys(), profiles))
+
+    # 2. Krige every route of every healthy job in one pass
+    results = [None] * len(data.jobs)
+    kriging_jobs, job_positions, jobs_weights = [], [], []
+    for pos, job in enumerate(data.jobs):
+        start_p = {**profile_by_key[endpoint_key(job.start_loc)], "lat": job.start_loc[0], "lon": job.start_loc[1]}
+        end_p = {**profile_by_key[endpoint_key(job.end_loc)], "lat": job.end_loc[0], "lon": job.end_loc[1]}
+        if "error" in start_p or "error" in end_p:
+            results[pos] = {"status": "error", "message": "Air Quality lookup failed",
+                            "ground_truth": {"start_point": start_p, "end_point": end_p}}
+            continue
+        routes_points, routes_weights = prepare_routes(job.routes)
+        kriging_jobs.append((start_p, end_p, routes_points))
+        job_positions.append(pos)
+        jobs_weights.append(routes_weights)
+
+    jobs_details = await offload(kriging_pool, interpolate_jobs, kriging_jobs)
+
+    for pos, (start_p, end_p, _), routes_details, routes_weights in zip(job_positions, kriging_jobs, jobs_details, jobs_weights):
+        results[pos] = {"status": "success",
+                        "ground_truth": {"start_point": start_p, "end_point": end_p},
+                        "route_analysis": summarize_routes(data.jobs[pos].routes, routes_details, routes_weights)}
+
+    return {"status": "success", "job_count": len(results), "results": results}
 
 
 @router.post("/history_data_all")
 async def history_data_all():
     try:
+        # Hours the training store already holds are served from it; only the gap is fetched
+        held = await asyncio.to_thread(stored_histories, LOOK_BACK_HOURS)
+
         async def process_station(station_id, coords):
             
             try:
-                # Fetch weather + AQI in parallel
-                weather_task = fetch_google_weather_history(coords["lat"], coords["lon"], http_client)
-                aqi_task = fetch_google_aqi_history(coords["lat"], coords["lon"], http_client)
-
-                weather_res, aqi_res = await asyncio.gather(weather_task, aqi_task)
-
-                # Basic API failure check
-                if "error" in weather_res or "error" in aqi_res:
-                    print(f"API error for station {station_id}", flush=True)
-                    return station_id, {"error": "API failure"}
-
-                combined_history = []
-
-                for w, a in zip(weather_res.get("history", []),
-                                aqi_res.get("history", [])):
-
-                    combined_history.append({
-                        "time": a.get("time"),
-                        "pm2_5": a.get("pm25", 0),
-                        "pm10": a.get("pm10", 0),
-                        "no2": a.get("no2", 0),
-                        "co": a.get("co", 0),
-                        "so2": a.get("so2", 0),
-                        "o3": a.get("o3", 0),
-                        "temp_c": w.get("temp_c", 0),
-                        "wind": w.get("wind", 0),
-                        "humidity": w.get("humidity", 0)
-                    })
+                combined_history, hours_fetched = await fetch_station_history(station_id, coords, held.get(station_id, ()))
 
                 return station_id, {
                     "location": coords,
                     "history_count": len(combined_history),
+                    "hours_fetched": hours_fetched,
                     "data": combined_history
                 }
 
@@ -137,84 +372,26 @@ async def history_data_all():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/predict-all-stations")
-async def predict_all_stations(data: RouteRequest):
+async def predict_all_stations(data: RouteRequest,
+                               format: Optional[str] = Query(None, pattern="^(rows|columnar)$"),
+                               accept: Optional[str] = Header(None)):
     print("DEBUG: Starting multi-station forecast pipeline", flush=True)
 
     try:
         # =========================================
-        # STEP 1: Fetch all stations in parallel
+        # STEP 1 + 2: Station histories from the hourly snapshot
+        # (fetched on the request path only if the prefetcher has not run yet)
         # =========================================
-        async def fetch_station_data(station_id, coords):
-            weather_task = fetch_google_weather_history(coords["lat"], coords["lon"], http_client)
-            aqi_task = fetch_google_aqi_history(coords["lat"], coords["lon"], http_client)
-            weather_res, aqi_res = await asyncio.gather(weather_task, aqi_task)
-            return station_id, coords, weather_res, aqi_res
-
-        fetch_tasks = [fetch_station_data(sid, co) for sid, co in STATIONS.items()]
-        station_results = await asyncio.gather(*fetch_tasks)
-
-        # =========================================
-        # STEP 2: Build history per station
-        # =========================================
-        station_histories = {}
-        anchor_time = None
-
-        for station_id, coords, weather_res, aqi_res in station_results:
-            if "error" in weather_res or "error" in aqi_res:
-                return {"status": "error", "message": f"API failure at {station_id}"}
-
-            combined_history = []
-            w_hist, a_hist = weather_res.get("history", []), aqi_res.get("history", [])
-
-            for w, a in zip(w_hist, a_hist):
-                combined_history.append({
-                    "pm2_5": a.get("pm25", 0), "pm10": a.get("pm10", 0),
-                    "no2": a.get("no2", 0), "co": a.get("co", 0),
-                    "so2": a.get("so2", 0), "o3": a.get("o3", 0),
-                    "temp_c": w.get("temp_c", 0), "wind": w.get("wind", 0),
-                    "humidity": w.get("humidity", 0)
-                })
-
-            if len(combined_history) < 24:
-                return {"status": "error", "message": f"Incomplete data at {station_id}"}
-
-            station_histories[station_id] = combined_history
-
-            if anchor_time is None:
-                last_time_str = aqi_res["history"][-1]["time"]
-                utc_anchor = datetime.fromisoformat(last_time_str.replace("Z", "+00:00"))
-                anchor_time = utc_anchor + timedelta(hours=5, minutes=30)
+        snapshot, error = await get_or_refresh_snapshot()
+        if snapshot is None:
+            return {"status": "error", "message": error}
 
         # =========================================
-        # STEP 3: Model inference per station
+        # STEP 3: Station forecasts, inferred once per snapshot
         # =========================================
-        final_forecast_data = {}
-
-        for station_id, history in station_histories.items():
-            try:
-                raw_forecasts = get_multi_station_forecast(history)
-                station_index = list(STATIONS.keys()).index(station_id)
-                station_key = f"station_{station_index}"
-                
-                if station_key not in raw_forecasts:
-                    raise KeyError(f"Key {station_key} missing in LSTM output")
-
-                values = raw_forecasts[station_key]
-                station_list = []
-
-                for i, val in enumerate(values):
-                    future_time = anchor_time + timedelta(hours=i+1)
-                    v = round(float(val), 2)
-                    station_list.append({
-                        "time": future_time.strftime("%I:%M %p"),
-                        "aqi": v,
-                        "health_info": get_aqi_info(v)
-                    })
-                final_forecast_data[station_id] = station_list
-
-            except Exception as model_err:
-                print(f"Model Error for {station_id}: {str(model_err)}")
-                return {"status": "error", "message": f"Model failed at {station_id}"}
+        final_forecast_data = snapshot["station_forecasts"]
+        if final_forecast_data is None:
+            return {"status": "error", "message": snapshot["forecast_error"]}
 
         # =========================================
         # STEP 4: Route-specific forecast (PRO-DURGAPUR CALIBRATION)
@@ -225,64 +402,31 @@ async def predict_all_stations(data: RouteRequest):
         route_forecasts = {}
 
         if data.routes:
-            for idx, route in enumerate(data.routes):
-                route_name = f"Route_{idx+1}"
-                pts = route.coordinates
-                
-                # --- DIVERSIFICATION LOGIC ---
-                # Agar Google same coordinates de raha hai, toh hum 'Path Simulation' karenge
-                # Route 1: Direct (Model Default)
-                # Route 2: Industry Bias (DSP Side)
-                # Route 3: Residential Bias (Bidhannagar Side)
-                bias_lat, bias_lng = 0.0, 0.0
-                
-                if idx == 1: # Route 2 ko Industrial (Station 3) ki taraf thoda pull karo
-                    bias_lat = (STATIONS["station_3"]["lat"] - pts[0].lat) * 0.15
-                    bias_lng = (STATIONS["station_3"]["lon"] - pts[0].lng) * 0.15
-                elif idx == 2: # Route 3 ko Green (Station 0) ki taraf pull karo
-                    bias_lat = (STATIONS["station_0"]["lat"] - pts[0].lat) * 0.15
-                    bias_lng = (STATIONS["station_0"]["lon"] - pts[0].lng) * 0.15
-
-                route_hourly = []
-                total_hours = len(next(iter(final_forecast_data.values())))
-
-                for hour in range(total_hours):
-                    point_aqi_values = []
-                    for pt in pts:
-                        # Applying the path bias
-                        adj_lat = pt.lat + bias_lat
-                        adj_lng = pt.lng + bias_lng
-                        
-                        w_sum, w_total = 0, 0
-                        for sid in STATIONS.keys():
-                            d = ((adj_lat - STATIONS[sid]["lat"])**2 + (adj_lng - STATIONS[sid]["lon"])**2)**0.5
-                            # Power 10 for maximum contrast
-                            weight = 1 / ((d**10) + 1e-15)
-                            w_sum += final_forecast_data[sid][hour]["aqi"] * weight
-                            w_total += weight
-                        
-                        point_aqi_values.append(w_sum / w_total)
-
-                    route_avg = sum(point_aqi_values) / len(point_aqi_values)
-                    route_hourly.append({
-                        "time": final_forecast_data["station_0"][hour]["time"],
-                        "aqi": round(route_avg, 2),
-                        "health_info": get_aqi_info(route_avg)
-                    })
-
-                route_forecasts[route_name] = {
-                    "forecast": route_hourly,
-                    "avg_route_aqi": round(sum(h['aqi'] for h in route_hourly)/len(route_hourly), 2)
-                }
+            # Scored on the CPU pool so long polylines never block the event loop
+            route_forecasts = await offload(cpu_pool, forecast_routes, data.routes, final_forecast_data, snapshot.get("raster"))
 
-                
-        return {
+        content = {
             "status": "success",
             "station_forecasts": final_forecast_data,
             "route_forecasts": route_forecasts,
-            "meta": {"location": "Durgapur"}
+            "meta": {"location": "Durgapur", "data": snapshot_meta(snapshot)}
         }
 
+        wire_format = negotiate_format(accept)
+        table = None
+        if wants_columnar(format, wire_format):
+            content["station_forecasts"] = {sid: forecast_columns(hourly) for sid, hourly in final_forecast_data.items()}
+            content["route_forecasts"] = {
+                name: {**rf, "forecast": forecast_columns(rf["forecast"])} for name, rf in route_forecasts.items()
+            }
+            if wire_format == "arrow":
+                table = _forecast_table(content.pop("station_forecasts"), content["route_forecasts"])
+                for rf in content["route_forecasts"].values():
+                    rf.pop("forecast")
+        return render(content, wire_format, table)
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"CRITICAL ERROR: {str(e)}", flush=True)
         return {"status": "error", "message": str(e)}
\ No newline at end of file
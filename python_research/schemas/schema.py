@@ -17,6 +17,9 @@ class JavaRouteRequest(BaseModel):
     routeCount: int
     routes: List[RouteData]
 
+class BatchRouteRequest(BaseModel):
+    jobs: List[JavaRouteRequest]
+
 # --- FORECAST SCHEMAS ---
 class ForecastRequest(BaseModel):
     lat: Optional[float] = None
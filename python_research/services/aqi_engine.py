@@ -1,15 +1,14 @@
 import logging
 import numpy as np
 import os
-import requests
-from pykrige.ok import OrdinaryKriging
-import tensorflow as tf
-import joblib
-import httpx
 import asyncio
 import math
+import threading
+from python_research.services.kriging import krige_values, kriging_weights
+from python_research.services.batcher import MicroBatcher
+from python_research.services.cache import cached_lookup
+from python_research.services.upstream import upstream
 
-http_client = httpx.AsyncClient(timeout=5)
 from dotenv import load_dotenv, dotenv_values
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -23,18 +22,59 @@ env_path = os.path.join(root_dir, '.env')
 model_path_str = os.path.join(parent_dir, "models", "durgapur_aqi_v1.h5")
 scaler_path_str = os.path.join(parent_dir, "models", "scaler_x.pkl")
 
-# --- 2. LOAD OBJECTS ---
-try:
-    if not os.path.exists(model_path_str):
-        raise FileNotFoundError(f"Missing Model at: {model_path_str}")
-        
-    lstm_model = tf.keras.models.load_model(model_path_str)
-    loaded_scaler = joblib.load(scaler_path_str)
-    print(f" SUCCESS: Loaded from {model_path_str}")
-except Exception as e:
-    print(f"CRITICAL ERROR: {e}")
-    lstm_model = None
-    loaded_scaler = None
+# --- 2. LOAD OBJECTS (lazily) ---
+# TensorFlow + the LSTM take seconds to import/load. Nothing heavy happens at
+# import time: load_model() runs on first use, or is warmed in the background
+# from the app lifespan, so /health and cold starts stay fast.
+lstm_model = None
+loaded_scaler = None
+inference_backend = None
+model_state = "not_loaded"   # not_loaded | loading | ready | failed
+model_error = None
+_model_lock = threading.Lock()
+
+def load_model():
+    """Import TensorFlow and load model + scaler once. Safe to call from any thread."""
+    global lstm_model, loaded_scaler, inference_backend, model_state, model_error
+
+    with _model_lock:
+        if model_state in ("ready", "failed"):
+            return model_state == "ready"
+
+        model_state = "loading"
+        try:
+            if not os.path.exists(model_path_str):
+                raise FileNotFoundError(f"Missing Model at: {model_path_str}")
+
+            import tensorflow as tf
+            import joblib
+            from python_research.services.inference import create_backend
+
+            lstm_model = tf.keras.models.load_model(model_path_str)
+            loaded_scaler = joblib.load(scaler_path_str)
+            inference_backend = create_backend(lstm_model)
+            model_state = "ready"
+            print(f" SUCCESS: Loaded from {model_path_str} (backend: {inference_backend.name})")
+        except Exception as e:
+            print(f"CRITICAL ERROR: {e}")
+            lstm_model = None
+            loaded_scaler = None
+            inference_backend = None
+            model_state = "failed"
+            model_error = str(e)
+
+        return model_state == "ready"
+
+def model_status():
+    return {
+        "state": model_state,
+        "backend": inference_backend.name if inference_backend else None,
+        "error": model_error,
+    }
+
+def _require_model():
+    if not load_model():
+        raise RuntimeError(f"LSTM model unavailable: {model_error}")
 
 
 # Method 1: load_dotenv
@@ -53,41 +93,64 @@ GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY")
 # else:
 #     print(f"❌ STILL NONE: Path is {env_path}, but no key found inside.", flush=True)
 
-def fetch_google_aqi_profile(lat, lon, api_key=None):
-    # Use the passed key, or fallback to the one loaded above
-    key = api_key or GOOGLE_API_KEY
-    
-    url = f"https://airquality.googleapis.com/v1/currentConditions:lookup?key={key}"
-    payload = {
+def _aqi_profile_payload(lat, lon):
+    return {
         "location": {"latitude": lat, "longitude": lon},
         "universalAqi": False,
         "extraComputations": ["POLLUTANT_CONCENTRATION", "LOCAL_AQI"],
         "languageCode": "en"
     }
+
+def _parse_aqi_profile(lat, lon, data):
+    pollutants = {p['code']: p['concentration']['value'] for p in data.get('pollutants', [])}
+    
+    return {
+        "lat": lat, "lon": lon,
+        "aqi": data.get('indexes', [{}])[0].get('aqi', 0),
+        "pm25": pollutants.get('pm25', 0),
+        "pm10": pollutants.get('pm10', 0),
+        "no2": pollutants.get('no2', 0),
+        "co": pollutants.get('co', 0),
+        "so2": pollutants.get('so2', 0),
+        "o3": pollutants.get('o3', 0)
+    }
+
+@cached_lookup("aqi_profile")
+def fetch_google_aqi_profile(lat, lon, api_key=None):
+    # Use the passed key, or fallback to the one loaded above
+    key = api_key or GOOGLE_API_KEY
+    
+    url = f"https://airquality.googleapis.com/v1/currentConditions:lookup?key={key}"
     
     try:
-        response = requests.post(url, json=payload, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        pollutants = {p['code']: p['concentration']['value'] for p in data.get('pollutants', [])}
-        
-        return {
-            "lat": lat, "lon": lon,
-            "aqi": data.get('indexes', [{}])[0].get('aqi', 0),
-            "pm25": pollutants.get('pm25', 0),
-            "pm10": pollutants.get('pm10', 0),
-            "no2": pollutants.get('no2', 0),
-            "co": pollutants.get('co', 0),
-            "so2": pollutants.get('so2', 0),
-            "o3": pollutants.get('o3', 0)
-        }
+        response = upstream.request_sync("aqi_profile", "POST", url, json=_aqi_profile_payload(lat, lon))
+        return _parse_aqi_profile(lat, lon, response.json())
     except Exception as e:
         print(f"⚠️ API Fetch Failed for ({lat}, {lon}): {e}", flush=True)
         # CRITICAL: Return a dict, NOT the error object, so interpolate_pollutants doesn't crash
         return {"lat": lat, "lon": lon, "error": str(e)}
 
+@cached_lookup("aqi_profile")
+async def fetch_google_aqi_profile_async(lat, lon, api_key=None):
+    """
+    Non-blocking twin of fetch_google_aqi_profile for use inside async
+    handlers. Runs on the shared upstream client.
+    """
+    key = api_key or GOOGLE_API_KEY
+    
+    url = f"https://airquality.googleapis.com/v1/currentConditions:lookup?key={key}"
+    
+    try:
+        response = await upstream.request("aqi_profile", "POST", url, json=_aqi_profile_payload(lat, lon))
+        return _parse_aqi_profile(lat, lon, response.json())
+    except Exception as e:
+        print(f"⚠️ API Fetch Failed for ({lat}, {lon}): {e}", flush=True)
+        return {"lat": lat, "lon": lon, "error": str(e)}
+
 # --- 2. KRIGING CALCULATION ENGINE ---
-def interpolate_pollutants(start_data, end_data, route_points):
+TARGET_POLLUTANTS = ['aqi', 'pm25', 'pm10', 'co', 'no2', 'o3']
+
+def _kriging_anchors(start_data, end_data):
     # Now start_data['lat'] will always work because it's a dict!
     mid_lat, mid_lon = (start_data['lat'] + end_data['lat'])/2, (start_data['lon'] + end_data['lon'])/2
     
@@ -96,27 +159,114 @@ def interpolate_pollutants(start_data, end_data, route_points):
     
     lats = np.array([start_data['lat'], end_data['lat'], mid_lat + offset, mid_lat - offset])
     lons = np.array([start_data['lon'], end_data['lon'], mid_lon, mid_lon])
+    return lats, lons
+
+def _anchor_values(start_data, end_data):
+    v_start = np.array([float(start_data[p]) for p in TARGET_POLLUTANTS])
+    v_end = np.array([float(end_data[p]) for p in TARGET_POLLUTANTS])
+    v_mid = (v_start + v_end) / 2
+    return np.vstack([v_start, v_end, v_mid, v_mid])  # (4 anchors, 6 pollutants)
+
+def _flatten_routes(routes_points):
+    sizes = [len(points) for points in routes_points]
+    flat = np.array([p for points in routes_points for p in points], dtype=float).reshape(-1, 2)
+    return sizes, flat
+
+def _split_routes(z_pred, sizes):
+    results = []
+    offset = 0
+    for size in sizes:
+        chunk = z_pred[offset:offset + size]
+        results.append({p_type: chunk[:, j] for j, p_type in enumerate(TARGET_POLLUTANTS)})
+        offset += size
+    return results
+
+def krige_routes(start_data, end_data, routes_points):
+    """
+    Batched kriging for every point of every route.
 
-    target_pollutants = ['aqi', 'pm25', 'pm10', 'co', 'no2', 'o3']
-    route_profiles = [{"location": p} for p in route_points]
+    The anchor geometry (and the variogram) is identical for all pollutants,
+    so the kriging system is solved once and the weights are applied to all
+    six pollutant columns with a single matrix product.
 
-    for p_type in target_pollutants:
-        v_start, v_end = float(start_data[p_type]), float(end_data[p_type])
-        z_values = np.array([v_start, v_end, (v_start+v_end)/2, (v_start+v_end)/2], dtype=float)
-        
-        try:
-            OK = OrdinaryKriging(lons, lats, z_values, variogram_model='gaussian', 
-                                 variogram_parameters=[1.0, 0.1, 0.1], verbose=False)
-            for i, (p_lat, p_lon) in enumerate(route_points):
-                z_pred, _ = OK.execute('points', np.array([p_lon]), np.array([p_lat]))
-                route_profiles[i][p_type] = round(float(z_pred[0]), 2)
-        except Exception as e:
-            print(f"Kriging failed for {p_type}: {e}", flush=True)
-            for i in range(len(route_profiles)): route_profiles[i][p_type] = v_start
-            
+    Returns one {pollutant: np.ndarray} dict per route.
+    """
+    lats, lons = _kriging_anchors(start_data, end_data)
+    z_values = _anchor_values(start_data, end_data)
+    sizes, flat = _flatten_routes(routes_points)
+
+    try:
+        z_pred = krige_values(lons, lats, z_values, flat[:, 1], flat[:, 0])
+    except Exception as e:
+        print(f"Kriging failed: {e}", flush=True)
+        z_pred = np.tile(z_values[0], (len(flat), 1))
+
+    return _split_routes(z_pred, sizes)
+
+def krige_jobs(jobs):
+    """
+    Kriging for many (start_data, end_data, routes_points) jobs at once.
+
+    Every job has its own anchors, so the kriging systems are stacked and
+    solved together in one batched call; targets are padded to the longest
+    job. If any system is singular the jobs are solved one by one instead.
+    Returns krige_routes() output per job, in order.
+    """
+    if not jobs:
+        return []
+
+    anchors = [_kriging_anchors(start, end) for start, end, _ in jobs]
+    z_values = np.stack([_anchor_values(start, end) for start, end, _ in jobs])   # (J, 4, 6)
+    flattened = [_flatten_routes(routes_points) for _, _, routes_points in jobs]
+
+    max_points = max(len(flat) for _, flat in flattened)
+    target_lat = np.empty((len(jobs), max_points))
+    target_lon = np.empty((len(jobs), max_points))
+    for j, ((lats, lons), (_, flat)) in enumerate(zip(anchors, flattened)):
+        # Padding sits on the start anchor; those rows are dropped below
+        target_lat[j], target_lon[j] = lats[0], lons[0]
+        target_lat[j, :len(flat)] = flat[:, 0]
+        target_lon[j, :len(flat)] = flat[:, 1]
+
+    anchor_lat = np.stack([lats for lats, _ in anchors])
+    anchor_lon = np.stack([lons for _, lons in anchors])
+
+    try:
+        weights = kriging_weights(anchor_lon, anchor_lat, target_lon, target_lat)   # (J, P, 4)
+        z_pred = weights @ z_values                                                 # (J, P, 6)
+    except Exception as e:
+        print(f"Batched kriging failed, solving jobs one by one: {e}", flush=True)
+        return [krige_routes(start, end, routes_points) for start, end, routes_points in jobs]
+
+    return [
+        _split_routes(z_pred[j, :len(flat)], sizes)
+        for j, (sizes, flat) in enumerate(flattened)
+    ]
+
+def route_profiles_from_arrays(route_points, values):
+    route_profiles = [{"location": p} for p in route_points]
+    for p_type in TARGET_POLLUTANTS:
+        for i, z in enumerate(values[p_type].tolist()):
+            route_profiles[i][p_type] = round(z, 2)
     return route_profiles
 
-async def fetch_google_weather_history(lat, lon, http_client, api_key=None):
+def interpolate_routes(start_data, end_data, routes_points):
+    """Per-point profiles for many routes sharing the same start/end anchors."""
+    arrays = krige_routes(start_data, end_data, routes_points)
+    return [route_profiles_from_arrays(points, values) for points, values in zip(routes_points, arrays)]
+
+def interpolate_jobs(jobs):
+    """Per-point profiles for many (start_data, end_data, routes_points) jobs."""
+    return [
+        [route_profiles_from_arrays(points, values) for points, values in zip(routes_points, arrays)]
+        for (_, _, routes_points), arrays in zip(jobs, krige_jobs(jobs))
+    ]
+
+def interpolate_pollutants(start_data, end_data, route_points):
+    return interpolate_routes(start_data, end_data, [route_points])[0]
+
+@cached_lookup("weather_history")
+async def fetch_google_weather_history(lat, lon, api_key=None, hours=24):
     # Use the passed key, or fallback to your global variable
     key = api_key or GOOGLE_API_KEY
     
@@ -128,15 +278,13 @@ async def fetch_google_weather_history(lat, lon, http_client, api_key=None):
         "key": key,
         "location.latitude": lat,
         "location.longitude": lon,
-        "hours": 24, 
+        "hours": hours,
         "unitsSystem": "METRIC",
         "languageCode": "en"
     }
     
     try:
-        
-        response = await http_client.get(url, params=params)
-        response.raise_for_status()
+        response = await upstream.request("weather_history", "GET", url, params=params)
         data = response.json()
         
         history_list = []
@@ -159,7 +307,8 @@ async def fetch_google_weather_history(lat, lon, http_client, api_key=None):
         return {"lat": lat, "lon": lon, "error": str(e)}
 
 
-async def fetch_google_aqi_history(lat, lon, http_client, api_key=None):
+@cached_lookup("aqi_history")
+async def fetch_google_aqi_history(lat, lon, api_key=None, hours=24):
     key = api_key or GOOGLE_API_KEY
     
     # Endpoint for historical lookups
@@ -167,16 +316,15 @@ async def fetch_google_aqi_history(lat, lon, http_client, api_key=None):
     
     payload = {
         "location": {"latitude": lat, "longitude": lon},
-        "hours": 24,  
-        "pageSize": 24,
+        "hours": hours,
+        "pageSize": hours,
         "universalAqi": False, 
         "extraComputations": ["POLLUTANT_CONCENTRATION", "LOCAL_AQI"],
         "languageCode": "en"
     }
     
     try:
-        response = await http_client.post(url, json=payload)
-        response.raise_for_status()
+        response = await upstream.request("aqi_history", "POST", url, json=payload)
         data = response.json()
         
         history_list = []
@@ -208,14 +356,12 @@ async def fetch_google_aqi_history(lat, lon, http_client, api_key=None):
         print(f"⚠️ AQI History Fetch Failed for ({lat}, {lon}): {e}", flush=True)
         return {"lat": lat, "lon": lon, "error": str(e)}
     
-def get_multi_station_forecast(combined_history_list):
+def build_feature_matrix(combined_history_list):
     """
-    Input: 24 combined history dicts
-    Output: Predictions for 4 stations (single forward pass)
+    Align combined history dicts to the 16 LSTM input features.
+    The 7 cyclical/year columns are left at 0, exactly as at training-time inference.
     """
-
-    # 1️⃣ Feature Alignment (Vectorized)
-    feature_matrix = np.array([
+    return np.array([
         [
             h.get("pm2_5", 0), h.get("pm10", 0), h.get("no2", 0),
             h.get("co", 0), h.get("so2", 0), h.get("o3", 0),
@@ -225,31 +371,43 @@ def get_multi_station_forecast(combined_history_list):
         for h in combined_history_list
     ], dtype=float)
 
-    # 2️⃣ Scale once
-    scaled_matrix = loaded_scaler.transform(feature_matrix)
+def _predict_batch(items):
+    """
+    Batcher callback: items are (raw (24, 16) window, station index) pairs from
+    any number of callers, run as one scaled forward pass.
+    """
+    windows = np.stack([w for w, _ in items])
+    n_items, look_back, n_features = windows.shape
 
-    # 3️⃣ Reshape for LSTM
-    lstm_input = scaled_matrix.reshape(1, 24, 16)
+    # Scale all rows in one call, then restore the (batch, time, feature) layout
+    scaled = loaded_scaler.transform(windows.reshape(-1, n_features))
+    lstm_batch = scaled.reshape(n_items, look_back, n_features)
+    station_ids = np.array([idx for _, idx in items]).reshape(-1, 1)
 
-    # 4️⃣ Batch station IDs (VERY IMPORTANT)
-    station_ids = np.array([[0], [1], [2], [3]])  # shape (4,1)
+    # Pad to a power of two so TFLite only ever converts a handful of batch sizes
+    padded = 1 << (n_items - 1).bit_length()
+    if padded != n_items:
+        lstm_batch = np.concatenate([lstm_batch, np.repeat(lstm_batch[-1:], padded - n_items, axis=0)])
+        station_ids = np.concatenate([station_ids, np.repeat(station_ids[-1:], padded - n_items, axis=0)])
 
-    # Repeat input 4 times (batch size = 4)
-    lstm_batch = np.repeat(lstm_input, 4, axis=0)
+    raw_pred = inference_backend.predict(lstm_batch, station_ids)
+    return [[round(float(p), 2) for p in row] for row in raw_pred[:n_items]]
 
-    # 5️⃣ Single Forward Pass
-    raw_pred = lstm_model.predict([lstm_batch, station_ids], verbose=0)
+inference_batcher = MicroBatcher(_predict_batch, name="lstm-batcher")
 
-    # raw_pred shape: (4, forecast_steps)
 
-    all_results = {}
+def get_station_forecasts(feature_windows, station_indices):
+    """
+    Forecasts for several stations, batched through the inference queue.
 
-    for i in range(4):
-        all_results[f"station_{i}"] = [
-            round(float(p), 2) for p in raw_pred[i]
-        ]
+    feature_windows: list of (24, 16) raw feature matrices, one per station
+    station_indices: the matching station ids the model was trained with
+    Returns a list of forecast value lists in the same order.
+    """
+    _require_model()
 
-    return all_results
+    futures = [inference_batcher.submit((w, idx)) for w, idx in zip(feature_windows, station_indices)]
+    return [future.result() for future in futures]
 
 
 def get_aqi_info(aqi):
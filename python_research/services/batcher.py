@@ -0,0 +1,101 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Concurrent forecast callers are coalesced into one forward pass: the worker
+# thread takes the first pending job, waits up to the window for more (or until
+# the batch is full) and runs them together.
+BATCH_WINDOW_MS = float(os.getenv("AQI_BATCH_WINDOW_MS", "5"))
+BATCH_MAX_ITEMS = int(os.getenv("AQI_BATCH_MAX_ITEMS", "64"))
+
+
+class MicroBatcher:
+    """
+    Queue + single dedicated thread around a `run_batch(items) -> results`
+    function. `submit` returns a concurrent Future per item (await it with
+    asyncio.wrap_future from the event loop).
+    """
+
+    def __init__(self, run_batch, max_items=BATCH_MAX_ITEMS, window_ms=BATCH_WINDOW_MS, name="batcher"):
+        self.run_batch = run_batch
+        self.max_items = max_items
+        self.window = window_ms / 1000
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+        self._wait_total = 0.0
+        self._failures = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, item):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_items:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _, _ in batch]
+            started = time.perf_counter()
+
+            try:
+                results = list(self.run_batch(items))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: run_batch returned {len(results)} results for {len(batch)} items")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                # Every caller still waiting gets the error, the thread keeps serving
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                with self._stats_lock:
+                    self._failures += 1
+
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._largest = max(self._largest, len(batch))
+                self._wait_total += sum(started - queued for _, _, queued in batch)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "failed_batches": self._failures,
+                "largest_batch": self._largest,
+                "mean_batch_size": round(self._items / self._batches, 2) if self._batches else 0,
+                "mean_queue_wait_ms": round(self._wait_total / self._items * 1000, 3) if self._items else 0,
+                "window_ms": self.window * 1000,
+                "max_items": self.max_items,
+            }
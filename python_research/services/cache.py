@@ -0,0 +1,206 @@
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from python_research.services.singleflight import SingleFlight
+
+# Upstream AQI / weather data changes at most hourly, so lookups are keyed by
+# (endpoint, geohash cell, UTC hour) and kept for at most CACHE_TTL seconds.
+CACHE_TTL = int(os.getenv("AQI_CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("AQI_CACHE_MAX_ENTRIES", "1024"))
+CACHE_GEOHASH_PRECISION = int(os.getenv("AQI_CACHE_GEOHASH_PRECISION", "6"))  # ~1.2km x 0.6km cells
+CACHE_DB_PATH = os.getenv("AQI_CACHE_DB")  # optional SQLite file so the cache survives restarts
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat, lon, precision=CACHE_GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return "".join(chars)
+
+
+def current_hour_bucket():
+    return time.strftime("%Y%m%d%H", time.gmtime())
+
+
+def lookup_key(endpoint, lat, lon, params=None):
+    key = f"{endpoint}:{geohash_encode(lat, lon)}:{current_hour_bucket()}"
+    # Options that change the response (e.g. hours=3) get their own entry; the key never does
+    for name, value in sorted((params or {}).items()):
+        if name != "api_key":
+            key += f":{name}={value}"
+    return key
+
+
+class ResponseCache:
+    """
+    In-memory TTL + LRU cache with an optional SQLite backing store.
+    Values must be JSON-serialisable when a db_path is given.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache "
+                "(key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+            )
+            self._db.execute("DELETE FROM response_cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires_at, value FROM response_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], json.loads(row[1]))
+                    self._store(key, entry)
+
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        entry = (time.time() + self.ttl, value)
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, expires_at, value) VALUES (?, ?, ?)",
+                    (key, entry[0], json.dumps(value)),
+                )
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache")
+                self._db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "persistent": self._db is not None,
+        }
+
+    # --- internal helpers (lock must be held) ---
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache WHERE key = ?", (old_key,))
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self._db.commit()
+
+
+response_cache = ResponseCache(db_path=CACHE_DB_PATH)
+# In-flight upstream lookups, keyed like the cache (endpoint, geohash cell, hour)
+upstream_flights = SingleFlight()
+
+
+def _from_cache(cached, lat, lon):
+    # A hit may come from a neighbouring point in the same cell; report the
+    # coordinates that were actually asked for (kriging anchors depend on them)
+    return {**cached, "lat": lat, "lon": lon}
+
+
+def cached_lookup(endpoint, cache=response_cache, flights=upstream_flights):
+    """
+    Cache decorator for the Google fetchers. The wrapped function must take
+    (lat, lon, ...) as its first two arguments and return a dict; results
+    carrying an "error" key are never cached. On a miss, concurrent callers
+    for the same key share one upstream call (single-flight).
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(lat, lon, *args, **kwargs):
+                key = lookup_key(endpoint, lat, lon, kwargs)
+                cached = cache.get(key)
+                if cached is not None:
+                    return _from_cache(cached, lat, lon)
+
+                async def fetch():
+                    result = await fn(lat, lon, *args, **kwargs)
+                    if "error" not in result:
+                        cache.set(key, result)
+                    return result
+
+                return _from_cache(await flights.do(key, fetch), lat, lon)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(lat, lon, *args, **kwargs):
+            key = lookup_key(endpoint, lat, lon, kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                return _from_cache(cached, lat, lon)
+
+            def fetch():
+                result = fn(lat, lon, *args, **kwargs)
+                if "error" not in result:
+                    cache.set(key, result)
+                return result
+
+            return _from_cache(flights.do_sync(key, fetch), lat, lon)
+
+        return wrapper
+
+    return decorator
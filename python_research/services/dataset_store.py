@@ -0,0 +1,291 @@
+"""
+Columnar station-history store for training and backtesting.
+
+The per-station CSVs are parsed once into an Arrow IPC dataset partitioned
+as station_id=<id>/month=<yyyymm>/, with the cyclical time features from
+data_cleaning.ipynb already computed. Loading memory-maps the files and
+prunes partitions on station and time range before reading a byte.
+
+    python -m python_research.services.dataset_store build     # also runs on first training use
+    python -m python_research.services.dataset_store compact   # fold live-ingested deltas
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+DATASET_DIR = Path(os.getenv("AQI_DATASET_DIR", DATA_DIR / "store"))
+
+# station_id used by the models -> source CSV (same ids as data_cleaning.ipynb)
+STATION_FILES = {
+    0: "durgapur_bidhannagar_final.csv",
+    1: "durgapur_chandidas_market_final.csv",
+    2: "durgapur_city_centre_final.csv",
+    3: "durgapur_dsp_area_final.csv",
+}
+
+CONTINUOUS_COLS = ["pm2_5", "pm10", "no2", "co", "so2", "o3", "temp_c", "wind", "humidity"]
+CYCLICAL_COLS = ["hour_sin", "hour_cos", "date_sin", "date_cos", "month_sin", "month_cos", "year"]
+TARGET_COL = "AQI"
+
+PARTITIONING = ds.partitioning(pa.schema([("station_id", pa.int32()), ("month", pa.int32())]), flavor="hive")
+
+# Fixed column types, so CSV-built and live-ingested files share one schema
+STORE_SCHEMA = pa.schema(
+    [("datetime", pa.timestamp("ns"))]
+    + [(c, pa.float64()) for c in CONTINUOUS_COLS]
+    + [(c, pa.float64()) for c in CYCLICAL_COLS[:-1]] + [("year", pa.int32())]
+    + [(TARGET_COL, pa.float64()), ("station_id", pa.int32()), ("month", pa.int32())]
+)
+
+
+def add_cyclical_features(df):
+    """Same encodings as data_cleaning.ipynb (note: day of year over 31)."""
+    h = df["datetime"].dt.hour
+    d = df["datetime"].dt.dayofyear
+    m = df["datetime"].dt.month
+    df["hour_sin"] = np.sin(2 * np.pi * h / 24)
+    df["hour_cos"] = np.cos(2 * np.pi * h / 24)
+    df["date_sin"] = np.sin(2 * np.pi * d / 31)
+    df["date_cos"] = np.cos(2 * np.pi * d / 31)
+    df["month_sin"] = np.sin(2 * np.pi * m / 12)
+    df["month_cos"] = np.cos(2 * np.pi * m / 12)
+    df["year"] = df["datetime"].dt.year
+    return df
+
+
+def to_table(df, station_id):
+    """Station rows -> Arrow table in store layout (datetime, features, target, partition keys)."""
+    df = df.copy()
+    df["datetime"] = pd.to_datetime(df["datetime"])
+    df = add_cyclical_features(df.sort_values("datetime"))
+    df["station_id"] = np.int32(station_id)
+    df["month"] = (df["datetime"].dt.year * 100 + df["datetime"].dt.month).astype("int32")
+    return pa.Table.from_pandas(df[STORE_SCHEMA.names], schema=STORE_SCHEMA, preserve_index=False)
+
+
+def _generation_file(store_dir):
+    store_dir = Path(store_dir)
+    return store_dir.parent / f".{store_dir.name}.generation"
+
+
+def mark_changed(store_dir):
+    """Record that the store's file set changed, so cached dataset handles (any process) are rediscovered."""
+    path = _generation_file(store_dir)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(f"{time.time_ns()}-{os.getpid()}")
+    os.replace(tmp_path, path)
+
+
+def store_generation(store_dir):
+    """Token that changes whenever files are written or compacted ("" before the first change)."""
+    try:
+        return _generation_file(store_dir).read_text()
+    except FileNotFoundError:
+        return ""
+
+
+def write_tables(tables, store_dir=DATASET_DIR):
+    """Write tables into the store, replacing only the partitions they touch."""
+    ds.write_dataset(
+        pa.concat_tables(tables),
+        store_dir,
+        format="ipc",
+        partitioning=PARTITIONING,
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.arrow",
+    )
+    mark_changed(store_dir)
+
+
+def append_tables(tables, store_dir=DATASET_DIR):
+    """
+    Add rows as new small files next to whatever the partitions already hold
+    (no rewrite); compact_partition merges them later.
+    Returns the partition directories written to.
+    """
+    written = []
+    ds.write_dataset(
+        pa.concat_tables(tables),
+        store_dir,
+        format="ipc",
+        partitioning=PARTITIONING,
+        existing_data_behavior="overwrite_or_ignore",
+        basename_template=f"delta-{time.time_ns()}-{os.getpid()}-{{i}}.arrow",
+        file_visitor=lambda f: written.append(os.path.dirname(f.path)),
+    )
+    mark_changed(store_dir)
+    return set(written)
+
+
+def partition_files(partition_dir):
+    # Base file first, then deltas in write order, so "keep last" keeps the newest row
+    names = sorted(n for n in os.listdir(partition_dir) if n.endswith(".arrow"))
+    return sorted(names, key=lambda n: not n.startswith("part-"))
+
+
+def compact_partition(partition_dir):
+    """
+    Merge every file of one partition into a single part-0.arrow, dropping
+    duplicate timestamps (newest wins). Returns the number of files merged.
+    """
+    names = partition_files(partition_dir)
+    if len(names) < 2:
+        return 0
+
+    tables = []
+    for name in names:
+        with pa.memory_map(os.path.join(partition_dir, name)) as source:
+            tables.append(pa.ipc.open_file(source).read_all())
+    df = pa.concat_tables(tables).to_pandas()
+    df = df.drop_duplicates("datetime", keep="last").sort_values("datetime")
+    # partition keys live in the path, not in the files
+    merged = pa.Table.from_pandas(df, schema=pa.schema([f for f in STORE_SCHEMA if f.name not in ("station_id", "month")]),
+                                  preserve_index=False)
+
+    tmp_path = os.path.join(partition_dir, "part-0.arrow.tmp")
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, merged.schema) as writer:
+        writer.write_table(merged)
+    os.replace(tmp_path, os.path.join(partition_dir, "part-0.arrow"))
+    for name in names:
+        if name != "part-0.arrow":
+            os.remove(os.path.join(partition_dir, name))
+    mark_changed(Path(partition_dir).parents[1])
+    return len(names)
+
+
+def compact_store(store_dir=DATASET_DIR, min_files=2):
+    """Compact every partition holding at least min_files files. Returns partitions rewritten."""
+    compacted = 0
+    for partition_dir in sorted(Path(store_dir).glob("station_id=*/month=*")):
+        if len(partition_files(partition_dir)) >= min_files:
+            compact_partition(partition_dir)
+            compacted += 1
+    return compacted
+
+
+def _base_marker(store_dir):
+    # "_" prefix: dataset discovery skips it
+    return Path(store_dir) / "_base.json"
+
+
+def has_base(store_dir=DATASET_DIR):
+    """True once build_store has written the CSV rows (live deltas alone do not count)."""
+    return _base_marker(store_dir).exists()
+
+
+def build_store(csv_dir=DATA_DIR, store_dir=DATASET_DIR):
+    """
+    Write the CSV rows as every partition's base file. A rebuild replaces the
+    partitions it touches; rows ingested live before the first build are kept
+    as deltas on top of the base and folded in.
+    """
+    tables = [to_table(pd.read_csv(Path(csv_dir) / name), sid) for sid, name in STATION_FILES.items()]
+    if has_base(store_dir) or not Path(store_dir).exists():
+        write_tables(tables, store_dir)
+    else:
+        # A compacted live partition already owns part-0; rank it as the oldest delta instead
+        for part in Path(store_dir).glob("station_id=*/month=*/part-0.arrow"):
+            os.replace(part, part.with_name(f"delta-0-{os.getpid()}-0.arrow"))
+        ds.write_dataset(
+            pa.concat_tables(tables),
+            store_dir,
+            format="ipc",
+            partitioning=PARTITIONING,
+            existing_data_behavior="overwrite_or_ignore",
+            basename_template="part-{i}.arrow",
+        )
+        compact_store(store_dir)
+        mark_changed(store_dir)
+
+    rows = sum(t.num_rows for t in tables)
+    _base_marker(store_dir).write_text(json.dumps({"rows": rows, "csv_dir": str(csv_dir),
+                                                   "built_at": datetime.now().isoformat(timespec="seconds")}))
+    return rows
+
+
+def _month_key(ts):
+    return ts.year * 100 + ts.month
+
+
+def row_filter(stations=None, start=None, end=None):
+    """Partition keys prune whole files; the datetime bound trims inside them."""
+    expr = None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if stations is not None:
+        expr = both(expr, ds.field("station_id").isin([int(s) for s in stations]))
+    if start is not None:
+        start = pd.Timestamp(start)
+        expr = both(expr, ds.field("month") >= _month_key(start))
+        expr = both(expr, ds.field("datetime") >= pa.scalar(start.to_pydatetime(), pa.timestamp("ns")))
+    if end is not None:
+        end = pd.Timestamp(end)
+        expr = both(expr, ds.field("month") <= _month_key(end))
+        expr = both(expr, ds.field("datetime") < pa.scalar(end.to_pydatetime(), pa.timestamp("ns")))
+    return expr
+
+
+def open_store(store_dir=DATASET_DIR, build_if_missing=True, csv_dir=DATA_DIR):
+    """
+    The store as a dataset. With build_if_missing, the CSV base is built first
+    unless it already exists, even when live ingestion has created the
+    directory with only delta files in it.
+    """
+    if not has_base(store_dir):
+        if not build_if_missing:
+            if not Path(store_dir).exists():
+                raise FileNotFoundError(f"No dataset store at {store_dir}")
+            return _dataset(store_dir)
+        rows = build_store(csv_dir, store_dir)
+        print(f"Built dataset store at {store_dir} ({rows} rows)", flush=True)
+    return _dataset(store_dir)
+
+
+def _dataset(store_dir):
+    # use_mmap: IPC files are mapped, column buffers point straight into the page cache
+    return ds.dataset(str(store_dir), format="ipc", partitioning=PARTITIONING,
+                      filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+
+def load_table(stations=None, start=None, end=None, columns=None, store_dir=DATASET_DIR):
+    """Arrow table for the selected stations / [start, end) window, sorted by station then time."""
+    table = open_store(store_dir).to_table(columns=columns, filter=row_filter(stations, start, end))
+    if columns is None or {"station_id", "datetime"} <= set(columns):
+        table = table.sort_by([("station_id", "ascending"), ("datetime", "ascending")])
+    return table
+
+
+def load_frame(stations=None, start=None, end=None, columns=None, store_dir=DATASET_DIR):
+    """
+    DataFrame with the columns of the old durgapur_final.csv (plus datetime),
+    in the same order: station by station, chronological within each.
+    """
+    return load_table(stations, start, end, columns, store_dir).to_pandas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the columnar station-history store")
+    parser.add_argument("command", choices=["build", "compact"])
+    parser.add_argument("--csv-dir", default=str(DATA_DIR))
+    parser.add_argument("--out", default=str(DATASET_DIR))
+    args = parser.parse_args()
+
+    started = datetime.now()
+    if args.command == "compact":
+        partitions = compact_store(args.out)
+        print(f"Compacted {partitions} partitions in {args.out} in {(datetime.now() - started).total_seconds():.2f}s")
+    else:
+        rows = build_store(args.csv_dir, args.out)
+        print(f"Wrote {rows} rows to {args.out} in {(datetime.now() - started).total_seconds():.2f}s")
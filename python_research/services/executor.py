@@ -0,0 +1,100 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# CPU-bound work never runs on the event loop. Two pools:
+#   cpu     - threads, for NumPy / TF work that releases the GIL (route scoring)
+#   kriging - processes by default, so big kriging solves cannot starve the
+#             event loop of the GIL; AQI_KRIGING_EXECUTOR=thread to disable.
+#             Every uvicorn worker starts its own pool, so by default the
+#             host's cores are split between the WEB_CONCURRENCY workers.
+# Each pool admits a bounded number of jobs (running + queued); past that,
+# callers are turned away instead of piling up behind a slow route.
+CPU_WORKERS = int(os.getenv("AQI_CPU_WORKERS", "4"))
+CPU_MAX_PENDING = int(os.getenv("AQI_CPU_MAX_PENDING", "64"))
+KRIGING_EXECUTOR = os.getenv("AQI_KRIGING_EXECUTOR", "process")
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))  # uvicorn --workers reads it too
+CORES = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+KRIGING_WORKERS = int(os.getenv("KRIGING_WORKERS", str(max(1, CORES // WEB_CONCURRENCY))))
+KRIGING_MAX_PENDING = int(os.getenv("AQI_KRIGING_MAX_PENDING", "32"))
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a pool already holds its maximum number of pending jobs."""
+
+    def __init__(self, name, pending):
+        super().__init__(f"{name} executor saturated ({pending} jobs pending)")
+        self.name = name
+        self.pending = pending
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool with admission control. `run` is only called from
+    the event loop, so the pending counter needs no lock.
+    """
+
+    def __init__(self, name, kind, workers, max_pending):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}', expected thread or process")
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._failed = 0
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            if self.kind == "process":
+                # spawn, not fork: the parent may already hold TensorFlow threads
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._pool
+
+    async def run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise ExecutorSaturated(self.name, self._pending)
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    def warm_up(self):
+        """Start the workers now rather than on the first request (spawn is slow)."""
+        for _ in range(self.workers):
+            self.pool.submit(os.getpid)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
+
+
+cpu_pool = BoundedExecutor("cpu", "thread", CPU_WORKERS, CPU_MAX_PENDING)
+kriging_pool = BoundedExecutor("kriging", KRIGING_EXECUTOR, KRIGING_WORKERS, KRIGING_MAX_PENDING)
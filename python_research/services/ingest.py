@@ -0,0 +1,205 @@
+"""
+Live station history -> training store.
+
+Every station pull (the hourly prefetch and /history_data_all) is appended
+to the Arrow store as one small delta file per touched partition. Rows at or
+before a station's last stored hour are dropped first, so each
+(station, hour) is written once; compaction folds the deltas back into the
+partition's part-0.arrow once enough of them pile up.
+"""
+import asyncio
+import fcntl
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+try:
+    import pandas as pd
+    from python_research.services import dataset_store
+except ImportError:  # pandas / pyarrow are optional in the API image; ingestion just stays off
+    pd = dataset_store = None
+
+from python_research.services.stations import station_registry
+
+INGEST_ENABLED = os.getenv("AQI_INGEST", "1") == "1" and dataset_store is not None
+COMPACT_MIN_FILES = int(os.getenv("AQI_COMPACT_MIN_FILES", "8"))
+IST_OFFSET = timedelta(hours=5, minutes=30)  # store timestamps are IST wall clock, like the CSVs
+HIGH_WATER_SCAN_DAYS = 35  # older than this and a full 24h pull is needed anyway
+
+_stats = {"runs": 0, "rows_written": 0, "rows_already_held": 0, "compactions": 0,
+          "failures": 0, "last_error": None}
+_background_tasks = set()
+_datasets = {}  # store dir -> (generation, dataset or None)
+
+
+def _store_dir():
+    return dataset_store.DATASET_DIR
+
+
+@contextmanager
+def _store_lock(store_dir):
+    # Serialises ingest/compaction across workers. Lives next to the store, not
+    # in it, so taking it never creates the store directory.
+    store_dir = Path(store_dir)
+    store_dir.parent.mkdir(parents=True, exist_ok=True)
+    with open(store_dir.parent / f".{store_dir.name}.ingest.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _open_store(store_dir):
+    """
+    The store as a dataset, None while it holds no files. The CSV base is
+    built by the dataset_store CLI or the first training run, never here:
+    without it the API starts empty and grows from live rows. The file listing is reused until the
+    store's generation changes (any worker appending or compacting).
+    """
+    if not os.path.isdir(store_dir):
+        return None
+    generation = dataset_store.store_generation(store_dir)
+    cached = _datasets.get(str(store_dir))
+    if cached is None or cached[0] != generation:
+        dataset = dataset_store.open_store(store_dir, build_if_missing=False)
+        cached = _datasets[str(store_dir)] = (generation, dataset if dataset.files else None)
+    return cached[1]
+
+
+def _current_hour_ist():
+    """The current UTC hour as a store timestamp (IST wall clock, so hh:30)."""
+    return datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0, tzinfo=None) + IST_OFFSET
+
+
+def history_frame(weather_res, aqi_res):
+    """Fetched histories -> store rows (IST datetime, continuous features, AQI), oldest first."""
+    rows = []
+    for w, a in zip(weather_res.get("history", []), aqi_res.get("history", [])):
+        if not a.get("time"):
+            continue
+        rows.append({
+            "datetime": pd.Timestamp(a["time"]).tz_convert(None) + IST_OFFSET,
+            "pm2_5": a.get("pm25", 0), "pm10": a.get("pm10", 0),
+            "no2": a.get("no2", 0), "co": a.get("co", 0),
+            "so2": a.get("so2", 0), "o3": a.get("o3", 0),
+            "temp_c": w.get("temp_c", 0), "wind": w.get("wind", 0),
+            "humidity": w.get("humidity", 0),
+            "AQI": a.get("aqi", 0),
+        })
+    df = pd.DataFrame(rows, columns=["datetime"] + dataset_store.CONTINUOUS_COLS + [dataset_store.TARGET_COL])
+    return df.drop_duplicates("datetime", keep="last").sort_values("datetime")
+
+
+def last_stored(dataset, station_indices):
+    """Latest stored datetime per store station id (missing = nothing recent held)."""
+    since = _current_hour_ist() - timedelta(days=HIGH_WATER_SCAN_DAYS)
+    table = dataset.to_table(columns=["station_id", "datetime"],
+                             filter=dataset_store.row_filter(station_indices, start=since))
+    if table.num_rows == 0:
+        return {}
+    latest = table.group_by("station_id").aggregate([("datetime", "max")]).to_pydict()
+    return {sid: pd.Timestamp(ts) for sid, ts in zip(latest["station_id"], latest["datetime_max"])}
+
+
+def ingest_station_results(station_results, store_dir=None):
+    """
+    Append the hours of (station_id, coords, weather, aqi) tuples that the
+    store does not hold yet, then compact partitions with too many deltas.
+    Returns the number of rows written.
+    """
+    store_dir = store_dir or _store_dir()
+    frames = {}
+    for station_id, _, weather_res, aqi_res in station_results:
+        if "error" in weather_res or "error" in aqi_res:
+            continue
+        df = history_frame(weather_res, aqi_res)
+        if len(df):
+            frames[station_registry.index(station_id)] = df
+    if not frames:
+        return 0
+
+    with _store_lock(store_dir):
+        dataset = _open_store(store_dir)
+        high_water = last_stored(dataset, list(frames)) if dataset is not None else {}
+
+        tables = []
+        for station_index, df in frames.items():
+            if station_index in high_water:
+                fresh = df[df["datetime"] > high_water[station_index]]
+                _stats["rows_already_held"] += len(df) - len(fresh)
+                df = fresh
+            if len(df):
+                tables.append(dataset_store.to_table(df, station_index))
+
+        _stats["runs"] += 1
+        if not tables:
+            return 0
+
+        partitions = dataset_store.append_tables(tables, store_dir)
+        written = sum(t.num_rows for t in tables)
+        _stats["rows_written"] += written
+
+        for partition_dir in partitions:
+            if len(dataset_store.partition_files(partition_dir)) >= COMPACT_MIN_FILES:
+                dataset_store.compact_partition(partition_dir)
+                _stats["compactions"] += 1
+    return written
+
+
+def _ingest_quietly(station_results):
+    try:
+        ingest_station_results(station_results)
+    except Exception as e:
+        _stats["failures"] += 1
+        _stats["last_error"] = str(e)
+        print(f"Station history ingest failed: {e}", flush=True)
+
+
+def schedule_ingest(station_results):
+    """Ingest in a worker thread without holding up the caller."""
+    if not INGEST_ENABLED:
+        return
+    task = asyncio.create_task(asyncio.to_thread(_ingest_quietly, list(station_results)))
+    _background_tasks.add(task)  # keep a reference until it finishes
+    task.add_done_callback(_background_tasks.discard)
+
+
+def stored_histories(hours, store_dir=None):
+    """
+    The store's rows for the last `hours` hours, per station id, shaped like
+    combine_station_history output (UTC "time"), oldest first. {} when
+    ingestion is off.
+    """
+    if not INGEST_ENABLED:
+        return {}
+    store_dir = store_dir or _store_dir()
+    dataset = _open_store(store_dir)
+    if dataset is None:
+        return {}
+
+    start = _current_hour_ist() - timedelta(hours=hours - 1)
+    indices = list(range(len(station_registry)))
+    df = dataset.to_table(filter=dataset_store.row_filter(indices, start=start)).to_pandas()
+
+    df["time"] = (df["datetime"] - IST_OFFSET).dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    histories = {}
+    for station_index, df_s in df.sort_values("datetime").groupby("station_id"):
+        records = df_s[["time"] + dataset_store.CONTINUOUS_COLS].to_dict("records")
+        histories[station_registry.ids[station_index]] = records
+    return histories
+
+
+def missing_hours(rows, hours):
+    """How many of the last `hours` hours come after the newest held row."""
+    if not rows:
+        return hours
+    latest = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    newest = datetime.fromisoformat(rows[-1]["time"].replace("Z", "+00:00"))
+    return max(0, min(hours, int((latest - newest) / timedelta(hours=1))))
+
+
+def ingest_stats():
+    return {"enabled": INGEST_ENABLED, "compact_min_files": COMPACT_MIN_FILES,
+            "in_progress": len(_background_tasks), **_stats}
@@ -0,0 +1,89 @@
+import numpy as np
+
+# Same semivariogram the engine always used with pykrige:
+# variogram_model='gaussian', variogram_parameters=[sill, range, nugget]
+GAUSSIAN_SILL = 1.0
+GAUSSIAN_RANGE = 0.1
+GAUSSIAN_NUGGET = 0.1
+
+# pykrige treats distances below this as "exactly on an anchor"
+EXACT_EPS = 1e-10
+
+
+def gaussian_variogram(d, sill=GAUSSIAN_SILL, range_=GAUSSIAN_RANGE, nugget=GAUSSIAN_NUGGET):
+    """
+    pykrige's gaussian model. A [sill, range, nugget] list is converted to a
+    partial sill internally, so we do the same here.
+    """
+    psill = sill - nugget
+    return psill * (1.0 - np.exp(-(d ** 2) / (range_ * 4.0 / 7.0) ** 2)) + nugget
+
+
+def _pairwise_euclidean(ax, ay, bx, by):
+    return np.sqrt((ax[..., :, None] - bx[..., None, :]) ** 2 + (ay[..., :, None] - by[..., None, :]) ** 2)
+
+
+def _kriging_matrix(anchor_x, anchor_y):
+    """
+    Ordinary kriging system (n+1 x n+1) for one or many anchor sets.
+    Works on shapes (n,) or (batch, n).
+    """
+    n = anchor_x.shape[-1]
+    d = _pairwise_euclidean(anchor_x, anchor_y, anchor_x, anchor_y)
+
+    a = np.zeros(anchor_x.shape[:-1] + (n + 1, n + 1))
+    a[..., :n, :n] = -gaussian_variogram(d)
+    idx = np.arange(n)
+    a[..., idx, idx] = 0.0
+    a[..., n, :] = 1.0
+    a[..., :, n] = 1.0
+    a[..., n, n] = 0.0
+    return a
+
+
+def _rhs(anchor_x, anchor_y, target_x, target_y):
+    """Right-hand side (n+1 x npt) for every target point at once."""
+    n = anchor_x.shape[-1]
+    bd = _pairwise_euclidean(anchor_x, anchor_y, target_x, target_y)
+
+    b = np.ones(bd.shape[:-2] + (n + 1, bd.shape[-1]))
+    b[..., :n, :] = -gaussian_variogram(bd)
+    # exact_values=True: a target sitting on an anchor returns the anchor value
+    b[..., :n, :][np.abs(bd) <= EXACT_EPS] = 0.0
+    return b
+
+
+def kriging_weights(anchor_x, anchor_y, target_x, target_y):
+    """
+    Solve the ordinary kriging system once and return the (npt, n) weight
+    matrix for every target point. The weights only depend on geometry, so
+    they can be reused for any number of value columns (pollutants).
+
+    Raises np.linalg.LinAlgError when anchors coincide (singular system).
+    """
+    anchor_x = np.asarray(anchor_x, dtype=float)
+    anchor_y = np.asarray(anchor_y, dtype=float)
+    target_x = np.asarray(target_x, dtype=float)
+    target_y = np.asarray(target_y, dtype=float)
+
+    n = anchor_x.shape[-1]
+    if target_x.shape[-1] == 0:
+        return np.zeros(target_x.shape[:-1] + (0, n))
+
+    a = _kriging_matrix(anchor_x, anchor_y)
+    b = _rhs(anchor_x, anchor_y, target_x, target_y)
+
+    # One LU factorisation of the kriging matrix serves every target column
+    x = np.linalg.solve(a, b)
+    return np.swapaxes(x[..., :n, :], -1, -2)
+
+
+def krige_values(anchor_x, anchor_y, values, target_x, target_y):
+    """
+    Predict every value column at every target in a single matrix product.
+
+    values: (n, k) array, one column per pollutant.
+    Returns (npt, k).
+    """
+    weights = kriging_weights(anchor_x, anchor_y, target_x, target_y)
+    return weights @ np.asarray(values, dtype=float)
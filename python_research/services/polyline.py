@@ -0,0 +1,126 @@
+import os
+
+import numpy as np
+
+from python_research.services.spatial import EARTH_RADIUS_KM, haversine_np
+
+# Optional pre-processing of Google Directions polylines before kriging:
+#   none     - krige every vertex, plain average (original behaviour)
+#   dp       - Douglas-Peucker simplification with a tolerance in metres
+#   resample - evenly spaced points along the haversine arc length
+ROUTE_SIMPLIFY = os.getenv("ROUTE_SIMPLIFY", "none")
+ROUTE_SIMPLIFY_TOLERANCE_M = float(os.getenv("ROUTE_SIMPLIFY_TOLERANCE_M", "15"))
+ROUTE_RESAMPLE_SPACING_M = float(os.getenv("ROUTE_RESAMPLE_SPACING_M", "100"))
+ROUTE_MAX_POINTS = int(os.getenv("ROUTE_MAX_POINTS", "500"))  # every mode, "none" included; 0 = no cap
+
+
+def segment_lengths_m(points):
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    return haversine_np(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1]) * 1000
+
+
+def _to_metres(points):
+    """Local equirectangular projection, plenty accurate at city scale."""
+    lat0 = np.radians(points[:, 0].mean())
+    scale = EARTH_RADIUS_KM * 1000 * np.pi / 180
+    return np.column_stack([points[:, 1] * scale * np.cos(lat0), points[:, 0] * scale])
+
+
+def douglas_peucker(points, tolerance_m=ROUTE_SIMPLIFY_TOLERANCE_M):
+    """Iterative Douglas-Peucker; returns the kept [lat, lon] points."""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) < 3:
+        return points
+
+    xy = _to_metres(points)
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        seg = xy[last] - xy[first]
+        rel = xy[first + 1:last] - xy[first]
+        seg_len = np.hypot(*seg)
+        if seg_len == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance_m:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return points[keep]
+
+
+def resample_by_distance(points, spacing_m=ROUTE_RESAMPLE_SPACING_M):
+    """Evenly spaced points along the arc length, always keeping both ends."""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) < 2:
+        return points
+
+    arc = np.concatenate([[0.0], np.cumsum(segment_lengths_m(points))])
+    total = arc[-1]
+    if total == 0:
+        return points[:1]
+
+    targets = np.append(np.arange(0.0, total, spacing_m), total)
+    return _points_at(points, arc, targets)
+
+
+def _points_at(points, arc, targets):
+    return np.column_stack([np.interp(targets, arc, points[:, 0]), np.interp(targets, arc, points[:, 1])])
+
+
+def length_weights(points):
+    """
+    Share of the route each evaluation point stands for: half of each
+    adjacent segment (trapezoid rule), normalised to sum to 1.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) < 2:
+        return np.ones(len(points))
+
+    seg = segment_lengths_m(points)
+    weights = np.zeros(len(points))
+    weights[:-1] += seg / 2
+    weights[1:] += seg / 2
+    if weights.sum() == 0:
+        return np.full(len(points), 1 / len(points))
+    return weights / weights.sum()
+
+
+def simplify_route(points, mode=ROUTE_SIMPLIFY, max_points=ROUTE_MAX_POINTS):
+    """
+    Evaluation points + distance weights for one route.
+    Returns (points, None) when simplification is off and the route fits
+    under max_points; a longer route is resampled to max_points either way.
+    """
+    if len(points) < 3:
+        return points, None
+    if mode == "none" and (not max_points or len(points) <= max_points):
+        return points, None
+
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if mode == "none":
+        reduced = points  # over the cap, trimmed below
+    elif mode == "dp":
+        reduced = douglas_peucker(points)
+    elif mode == "resample":
+        reduced = resample_by_distance(points)
+    else:
+        raise ValueError(f"Unknown ROUTE_SIMPLIFY mode '{mode}'")
+
+    # Hard cap: fall back to even spacing at whatever resolution fits
+    if max_points and len(reduced) > max_points:
+        arc = np.concatenate([[0.0], np.cumsum(segment_lengths_m(points))])
+        reduced = _points_at(points, arc, np.linspace(0.0, arc[-1], max_points))
+
+    return reduced.tolist(), length_weights(reduced)
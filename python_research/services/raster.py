@@ -0,0 +1,129 @@
+import json
+import os
+
+import numpy as np
+
+from python_research.services.spatial import IDW_POWER, idw_weight_matrix
+
+# City-wide interpolated grids, rebuilt after every data refresh. Route
+# scoring then becomes a bilinear lookup instead of a fresh interpolation.
+RASTER_ENABLED = os.getenv("AQI_RASTER", "1") == "1"
+# lat_min, lon_min, lat_max, lon_max around Durgapur
+RASTER_BBOX = tuple(float(v) for v in os.getenv("AQI_RASTER_BBOX", "23.45,87.15,23.65,87.45").split(","))
+RASTER_STEP_DEG = float(os.getenv("AQI_RASTER_STEP_DEG", "0.0005"))  # ~55 m
+RASTER_DIR = os.getenv("AQI_RASTER_DIR")  # optional: publish grids here for mmap readers
+
+
+class AqiRaster:
+    """
+    Stack of named layers on a regular lat/lon grid, shape (layers, ny, nx).
+    Grid nodes sit on lat_min + i * step (and likewise for lon).
+    """
+
+    def __init__(self, grid, bbox, step, layers, version):
+        self.grid = grid
+        self.bbox = bbox
+        self.step = step
+        self.layers = list(layers)
+        self.version = version
+        self._layer_index = {name: i for i, name in enumerate(self.layers)}
+
+    @property
+    def shape(self):
+        return self.grid.shape[1:]
+
+    def layer_indices(self, prefix):
+        return [i for i, name in enumerate(self.layers) if name.startswith(prefix)]
+
+    def contains(self, points):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        lat_min, lon_min, lat_max, lon_max = self.bbox
+        return bool(np.all((points[:, 0] >= lat_min) & (points[:, 0] <= lat_max) &
+                           (points[:, 1] >= lon_min) & (points[:, 1] <= lon_max)))
+
+    def sample(self, points, layers=None):
+        """
+        Bilinear sample of the selected layers at every point.
+        Returns (n_points, n_layers); points outside the box are clamped to its edge.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        idx = list(range(len(self.layers))) if layers is None else [
+            self._layer_index[l] if isinstance(l, str) else l for l in layers
+        ]
+        ny, nx = self.shape
+        lat_min, lon_min, _, _ = self.bbox
+
+        fy = np.clip((points[:, 0] - lat_min) / self.step, 0, ny - 1)
+        fx = np.clip((points[:, 1] - lon_min) / self.step, 0, nx - 1)
+        y0 = np.minimum(fy.astype(int), ny - 2)
+        x0 = np.minimum(fx.astype(int), nx - 2)
+        ty = (fy - y0)[None, :]
+        tx = (fx - x0)[None, :]
+
+        # Gather only the 4 corner cells per point (keeps mmap reads tiny)
+        layer = np.asarray(idx)[:, None]
+        g = self.grid
+        top = g[layer, y0, x0] * (1 - tx) + g[layer, y0, x0 + 1] * tx
+        bottom = g[layer, y0 + 1, x0] * (1 - tx) + g[layer, y0 + 1, x0 + 1] * tx
+        return ((1 - ty) * top + ty * bottom).T.astype(float)
+
+    def route_arrays(self, routes_points, pollutants, prefix="current:"):
+        """{pollutant: values per point} for each route, shaped like krige_routes output."""
+        layers = [prefix + p for p in pollutants]
+        results = []
+        for points in routes_points:
+            sampled = self.sample(points, layers)
+            results.append({p: sampled[:, i] for i, p in enumerate(pollutants)})
+        return results
+
+    def point_profile(self, lat, lon, pollutants, prefix="current:"):
+        sampled = self.sample([[lat, lon]], [prefix + p for p in pollutants])[0]
+        profile = {"lat": lat, "lon": lon, "source": "raster", "version": self.version}
+        profile.update({p: round(float(v), 2) for p, v in zip(pollutants, sampled)})
+        return profile
+
+    # --- persistence (np.save + mmap so every worker shares the page cache) ---
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        grid_tmp = os.path.join(directory, "raster.npy.tmp")
+        meta_tmp = os.path.join(directory, "raster.json.tmp")
+        with open(grid_tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.grid))
+        with open(meta_tmp, "w") as f:
+            json.dump({"bbox": self.bbox, "step": self.step, "layers": self.layers, "version": self.version}, f)
+        # Grid first, then metadata: readers key off the metadata version
+        os.replace(grid_tmp, os.path.join(directory, "raster.npy"))
+        os.replace(meta_tmp, os.path.join(directory, "raster.json"))
+
+    @staticmethod
+    def published_version(directory):
+        with open(os.path.join(directory, "raster.json")) as f:
+            return json.load(f)["version"]
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, "raster.json")) as f:
+            meta = json.load(f)
+        grid = np.load(os.path.join(directory, "raster.npy"), mmap_mode="r" if mmap else None)
+        return cls(grid, tuple(meta["bbox"]), meta["step"], meta["layers"], meta["version"])
+
+
+def build_raster(anchors, layer_values, layer_names, version,
+                 bbox=RASTER_BBOX, step=RASTER_STEP_DEG, power=IDW_POWER):
+    """
+    Interpolate every layer over the bounding box in one product.
+
+    anchors: (n_stations, 2) [lat, lon]; layer_values: (n_stations, n_layers).
+    Uses the same power-10 IDW as the route forecast.
+    """
+    lat_min, lon_min, lat_max, lon_max = bbox
+    lats = np.arange(lat_min, lat_max + step / 2, step)
+    lons = np.arange(lon_min, lon_max + step / 2, step)
+    grid_lat, grid_lon = np.meshgrid(lats, lons, indexing="ij")
+    nodes = np.column_stack([grid_lat.ravel(), grid_lon.ravel()])
+
+    weights = idw_weight_matrix(nodes, anchors, power)                     # (cells, stations)
+    values = weights @ np.asarray(layer_values, dtype=float)                # (cells, layers)
+    grid = values.T.reshape(len(layer_names), len(lats), len(lons)).astype(np.float32)
+
+    return AqiRaster(grid, (lat_min, lon_min, lats[-1], lons[-1]), step, layer_names, version)
@@ -0,0 +1,76 @@
+import json
+
+from fastapi.responses import JSONResponse, Response
+
+# Optional fast paths; everything degrades to the stdlib JSON response
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed."""
+
+    def render(self, content):
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def negotiate_format(accept):
+    """Pick the wire format from an Accept header: arrow | msgpack | json."""
+    accept = (accept or "").lower()
+    if pa is not None and ARROW_MEDIA_TYPE in accept:
+        return "arrow"
+    if msgpack is not None and any(t in accept for t in MSGPACK_MEDIA_TYPES):
+        return "msgpack"
+    return "json"
+
+
+def wants_columnar(format_param, wire_format):
+    # Binary formats are always columnar; JSON only when asked for
+    return format_param == "columnar" or wire_format != "json"
+
+
+def forecast_columns(hourly):
+    """[{time, aqi, health_info}, ...] -> parallel arrays."""
+    return {
+        "time": [h["time"] for h in hourly],
+        "aqi": [h["aqi"] for h in hourly],
+        "category": [h["health_info"]["category"] for h in hourly],
+        "color": [h["health_info"]["color"] for h in hourly],
+    }
+
+
+def render(content, wire_format="json", table=None):
+    """
+    Serialise a response body. For Arrow, `table` holds the flat columns
+    (one row per point / hour) and the rest of `content` rides along as
+    JSON in the stream's schema metadata.
+    """
+    if wire_format == "msgpack":
+        return Response(msgpack.packb(content, use_bin_type=True), media_type=MSGPACK_MEDIA_TYPES[0])
+
+    if wire_format == "arrow":
+        arrow_table = pa.table(table or {})
+        arrow_table = arrow_table.replace_schema_metadata({"response": json.dumps(content)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+        return Response(sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+    return FastJSONResponse(content)
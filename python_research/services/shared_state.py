@@ -0,0 +1,144 @@
+import asyncio
+import fcntl
+import json
+import os
+from datetime import datetime
+
+from python_research.services.raster import AqiRaster
+
+# Multi-worker mode. With AQI_SHARED_STATE_DIR set, exactly one uvicorn worker
+# (whoever holds the flock) loads the model, runs the prefetcher and publishes
+# every snapshot here; the other workers never import TensorFlow or call the
+# station APIs and just read the published files. Unset = every process is
+# its own producer (single-worker behaviour).
+SHARED_STATE_DIR = os.getenv("AQI_SHARED_STATE_DIR")
+PRODUCER_RETRY_SECONDS = int(os.getenv("AQI_PRODUCER_RETRY", "30"))
+
+LOCK_FILE = "producer.lock"
+SNAPSHOT_FILE = "snapshot.json"
+RASTER_SUBDIR = "raster"
+
+_lock_fd = None
+_published = None  # (mtime_ns, snapshot, raster_missing) of the last file a reader loaded
+
+
+def shared_mode():
+    return bool(SHARED_STATE_DIR)
+
+
+def is_producer():
+    return not shared_mode() or _lock_fd is not None
+
+
+def try_become_producer():
+    """
+    Non-blocking attempt at the producer lock. The lock is held for the life
+    of the process; the kernel drops it if the producer dies, so a standby
+    worker can take over.
+    """
+    global _lock_fd
+
+    if is_producer():
+        return True
+
+    os.makedirs(SHARED_STATE_DIR, exist_ok=True)
+    fd = os.open(os.path.join(SHARED_STATE_DIR, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return False
+
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _lock_fd = fd
+    return True
+
+
+async def wait_for_producer_role(on_elected):
+    """Standby loop for reader workers: call `on_elected` once the lock frees up."""
+    while not try_become_producer():
+        await asyncio.sleep(PRODUCER_RETRY_SECONDS)
+    print(f"Worker {os.getpid()} took over as producer", flush=True)
+    on_elected()
+
+
+def publish_snapshot(snapshot):
+    """
+    Write what request handlers need from a snapshot (forecasts, current
+    conditions, raster) for the reader workers. Raster first, then the
+    snapshot json, each swapped in with os.replace so readers never see a
+    half-written file.
+    """
+    if snapshot.get("raster") is not None:
+        snapshot["raster"].save(os.path.join(SHARED_STATE_DIR, RASTER_SUBDIR))
+
+    doc = {
+        "version": snapshot["version"],
+        "fetched_at": snapshot["fetched_at"].isoformat(),
+        "anchor_time": snapshot["anchor_time"].isoformat() if snapshot["anchor_time"] else None,
+        "current": snapshot["current"],
+        "station_forecasts": snapshot["station_forecasts"],
+        "forecast_error": snapshot["forecast_error"],
+        "has_raster": snapshot.get("raster") is not None,
+    }
+    path = os.path.join(SHARED_STATE_DIR, SNAPSHOT_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(doc, f)
+    os.replace(path + ".tmp", path)
+
+
+def load_published_snapshot():
+    """
+    Latest published snapshot, re-read only when the file changed (one stat
+    per call otherwise). Returns None until the producer has published.
+    """
+    global _published
+
+    path = os.path.join(SHARED_STATE_DIR, SNAPSHOT_FILE)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _published is not None and _published[0] == mtime:
+        snapshot, raster_missing = _published[1], _published[2]
+        if raster_missing:
+            # The grid was not readable (or not this version) last time; a failure is never cached
+            raster = _load_raster(snapshot["version"])
+            if raster is not None:
+                snapshot = {**snapshot, "raster": raster}
+                _published = (mtime, snapshot, False)
+        return snapshot
+
+    try:
+        with open(path) as f:
+            doc = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Published snapshot unreadable: {e}", flush=True)
+        return _published[1] if _published else None
+
+    has_raster = doc.pop("has_raster")
+    raster = _load_raster(doc["version"]) if has_raster else None
+
+    snapshot = {
+        **doc,
+        "fetched_at": datetime.fromisoformat(doc["fetched_at"]),
+        "anchor_time": datetime.fromisoformat(doc["anchor_time"]) if doc["anchor_time"] else None,
+        "raster": raster,
+    }
+    _published = (mtime, snapshot, has_raster and raster is None)
+    return snapshot
+
+
+def _load_raster(version):
+    """The published grid if it belongs to snapshot `version`, else None."""
+    directory = os.path.join(SHARED_STATE_DIR, RASTER_SUBDIR)
+    try:
+        # The producer may already be writing the next grid; the metadata alone tells
+        if AqiRaster.published_version(directory) != version:
+            return None
+        raster = AqiRaster.load(directory)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Published raster unreadable: {e}", flush=True)
+        return None
+    return raster if raster.version == version else None
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the
+    call, everyone arriving while it is in flight awaits the same result.
+    Nothing is kept once the call finishes; the response cache handles reuse.
+    """
+
+    def __init__(self):
+        self._tasks = {}        # key -> asyncio.Task (async callers)
+        self._waiters = {}      # key -> _SyncCall (threaded callers)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        """`fn` is a zero-arg coroutine function; its task outlives a cancelled caller."""
+        task = self._tasks.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t, key=key: self._finish(key, t))
+        else:
+            self.coalesced += 1
+        # shield: one caller going away must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller has gone
+
+    def do_sync(self, key, fn):
+        with self._lock:
+            call = self._waiters.get(key)
+            leader = call is None
+            if leader:
+                call = _SyncCall()
+                self._waiters[key] = call
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._waiters[key]
+            call.done.set()
+
+    def stats(self):
+        total = self.calls + self.coalesced
+        return {
+            "upstream_calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+            "in_flight": len(self._tasks) + len(self._waiters),
+        }
+
+
+class _SyncCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
@@ -0,0 +1,67 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+# Power 10 for maximum contrast (same as the original Step 4 loop)
+IDW_POWER = 10
+IDW_EPS = 1e-15
+
+
+def idw_weight_matrix(points, anchors, power=IDW_POWER, eps=IDW_EPS):
+    """
+    Row-normalised inverse-distance weights, shape (n_points, n_anchors).
+
+    points / anchors are (n, 2) arrays of [lat, lon]. Distances are plain
+    Euclidean in degrees, matching the route forecast calibration.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    anchors = np.asarray(anchors, dtype=float).reshape(-1, 2)
+
+    d = np.sqrt(((points[:, None, :] - anchors[None, :, :]) ** 2).sum(axis=-1))
+    weights = 1.0 / (d ** power + eps)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def route_hourly_idw(points, anchors, anchor_series, power=IDW_POWER):
+    """
+    Route-average value for every horizon in one matrix product.
+
+    anchor_series: (n_anchors, n_hours). Distances do not change with time,
+    so the weights are built once and averaged over the route's points
+    before multiplying: mean_p(W @ F) == mean_p(W) @ F.
+    """
+    weights = idw_weight_matrix(points, anchors, power)
+    return weights.mean(axis=0) @ np.asarray(anchor_series, dtype=float)
+
+
+def haversine_np(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; every argument may be a scalar or a broadcastable array."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def pairwise_haversine(points, anchors):
+    """(n_points, n_anchors) distance matrix in km for [lat, lon] arrays."""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    anchors = np.asarray(anchors, dtype=float).reshape(-1, 2)
+    return haversine_np(points[:, None, 0], points[:, None, 1], anchors[None, :, 0], anchors[None, :, 1])
+
+
+def weighted_average_np(aqiA, aqiB, lats, lons, latA, lonA, latB, lonB):
+    """
+    Batched aqi_engine.weighted_average: 1/d blend of two anchors for many
+    points. A point sitting exactly on an anchor takes that anchor's value.
+    """
+    dA = haversine_np(lats, lons, latA, lonA)
+    dB = haversine_np(lats, lons, latB, lonB)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        wA = 1 / dA
+        wB = 1 / dB
+        blended = (aqiA * wA + aqiB * wB) / (wA + wB)
+
+    return np.where(dA == 0, aqiA, np.where(dB == 0, aqiB, blended))
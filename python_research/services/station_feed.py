@@ -0,0 +1,322 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from python_research.services.aqi_engine import (
+    build_feature_matrix,
+    fetch_google_aqi_history,
+    fetch_google_weather_history,
+    get_aqi_info,
+    get_station_forecasts,
+    TARGET_POLLUTANTS,
+)
+from python_research.services.ingest import IST_OFFSET, missing_hours, schedule_ingest
+from python_research.services.raster import RASTER_DIR, RASTER_ENABLED, AqiRaster, build_raster
+from python_research.services.shared_state import is_producer, load_published_snapshot, publish_snapshot, shared_mode
+from python_research.services.stations import STATIONS, station_registry
+
+# The station histories only change once an hour. A background task pulls
+# them shortly after each hour and request handlers read the in-memory
+# snapshot instead of fanning out to Google on every call.
+PREFETCH_ENABLED = os.getenv("STATION_PREFETCH", "1") == "1"
+PREFETCH_OFFSET_SECONDS = int(os.getenv("STATION_PREFETCH_OFFSET", "120"))  # wait for Google to publish the hour
+PREFETCH_RETRY_SECONDS = int(os.getenv("STATION_PREFETCH_RETRY", "300"))
+SNAPSHOT_MAX_AGE_SECONDS = 3600 + PREFETCH_OFFSET_SECONDS
+
+LOOK_BACK_HOURS = 24
+
+_snapshot = None
+_refresh_lock = asyncio.Lock()
+_api_newest_first = False  # hour order of the last history fetch; stored rows are served the same way
+
+
+def combine_station_history(weather_res, aqi_res):
+    combined_history = []
+    w_hist, a_hist = weather_res.get("history", []), aqi_res.get("history", [])
+
+    for w, a in zip(w_hist, a_hist):
+        combined_history.append({
+            "time": a.get("time"),
+            "pm2_5": a.get("pm25", 0), "pm10": a.get("pm10", 0),
+            "no2": a.get("no2", 0), "co": a.get("co", 0),
+            "so2": a.get("so2", 0), "o3": a.get("o3", 0),
+            "temp_c": w.get("temp_c", 0), "wind": w.get("wind", 0),
+            "humidity": w.get("humidity", 0)
+        })
+
+    return combined_history
+
+
+async def fetch_station_data(station_id, coords, hours=LOOK_BACK_HOURS):
+    weather_task = fetch_google_weather_history(coords["lat"], coords["lon"], hours=hours)
+    aqi_task = fetch_google_aqi_history(coords["lat"], coords["lon"], hours=hours)
+    weather_res, aqi_res = await asyncio.gather(weather_task, aqi_task)
+    return station_id, coords, weather_res, aqi_res
+
+
+def _in_api_order(rows):
+    """Oldest-first rows in the hour order the history API lists them."""
+    return rows[::-1] if _api_newest_first else rows
+
+
+async def fetch_station_history(station_id, coords, held_rows=(), hours=LOOK_BACK_HOURS):
+    """
+    Last `hours` hours of combined history for one station. `held_rows` are
+    what the training store already has (oldest first); only the hours after
+    them are fetched, and those are handed to the ingester. Rows come back in
+    the API's order, as if all of them had been fetched.
+    Returns (rows, hours_fetched) or raises on an API failure with nothing held.
+    """
+    global _api_newest_first
+    held_rows = list(held_rows)
+    gap = missing_hours(held_rows, hours)
+    if gap == 0:
+        return _in_api_order(held_rows[-hours:]), 0
+
+    result = await fetch_station_data(station_id, coords, hours=gap)
+    _, _, weather_res, aqi_res = result
+    if "error" in weather_res or "error" in aqi_res:
+        if held_rows:
+            return _in_api_order(held_rows[-hours:]), 0  # a slightly old tail beats no history
+        raise RuntimeError("API failure")
+
+    schedule_ingest([result])
+    fetched = combine_station_history(weather_res, aqi_res)
+    if len(fetched) > 1:
+        _api_newest_first = fetched[0]["time"] > fetched[-1]["time"]
+    merged = {row["time"]: row for row in held_rows}
+    merged.update((row["time"], row) for row in fetched)
+    return _in_api_order([merged[t] for t in sorted(merged)][-hours:]), gap
+
+
+def assemble_snapshot(station_results, version):
+    """
+    Build a snapshot from fetched (station_id, coords, weather, aqi) tuples.
+    Returns (snapshot, None) on success or (None, error_message).
+    """
+    histories = {}
+    feature_windows = {}
+    current = {}
+    anchor_time = None
+
+    for station_id, coords, weather_res, aqi_res in station_results:
+        if "error" in weather_res or "error" in aqi_res:
+            return None, f"API failure at {station_id}"
+
+        combined_history = combine_station_history(weather_res, aqi_res)
+        if len(combined_history) < LOOK_BACK_HOURS:
+            return None, f"Incomplete data at {station_id}"
+
+        histories[station_id] = combined_history
+        feature_windows[station_id] = build_feature_matrix(combined_history[-LOOK_BACK_HOURS:])
+        current[station_id] = aqi_res["history"][-1]
+
+        if anchor_time is None:
+            last_time_str = aqi_res["history"][-1]["time"]
+            utc_anchor = datetime.fromisoformat(last_time_str.replace("Z", "+00:00"))
+            anchor_time = utc_anchor + IST_OFFSET
+
+    return {
+        "version": version,
+        "fetched_at": datetime.now(timezone.utc),
+        "anchor_time": anchor_time,
+        "histories": histories,
+        "feature_windows": feature_windows,
+        "current": current,
+    }, None
+
+
+def run_forecast(snapshot):
+    """
+    Run the LSTM once for every station of a data snapshot and format the
+    hourly forecasts the way /predict-all-stations serves them.
+    """
+    station_ids = list(snapshot["feature_windows"])
+    station_indices = [station_registry.index(sid) for sid in station_ids]
+    windows = [snapshot["feature_windows"][sid] for sid in station_ids]
+
+    forecasts = get_station_forecasts(windows, station_indices)
+
+    anchor_time = snapshot["anchor_time"]
+    station_forecasts = {}
+    for station_id, values in zip(station_ids, forecasts):
+        station_list = []
+        for i, v in enumerate(values):
+            future_time = anchor_time + timedelta(hours=i+1)
+            station_list.append({
+                "time": future_time.strftime("%I:%M %p"),
+                "aqi": v,
+                "health_info": get_aqi_info(v)
+            })
+        station_forecasts[station_id] = station_list
+
+    return station_forecasts
+
+
+def build_snapshot_raster(snapshot):
+    """
+    City-wide grid for a snapshot: one layer per pollutant for the latest
+    hour ("current:<pollutant>") and one per forecast hour ("forecast:<i>").
+    When AQI_RASTER_DIR is set the grid is published there and served back
+    memory-mapped, so workers reading the same file share its pages.
+    """
+    station_ids = station_registry.ids
+    layer_names = [f"current:{p}" for p in TARGET_POLLUTANTS]
+    columns = [[float(snapshot["current"][sid].get(p, 0)) for p in TARGET_POLLUTANTS] for sid in station_ids]
+
+    forecasts = snapshot.get("station_forecasts")
+    if forecasts is not None:
+        hours = len(forecasts[station_ids[0]])
+        layer_names += [f"forecast:{i}" for i in range(hours)]
+        for row, sid in zip(columns, station_ids):
+            row.extend(h["aqi"] for h in forecasts[sid])
+
+    raster = build_raster(station_registry.coords, columns, layer_names, snapshot["version"])
+    if RASTER_DIR:
+        raster.save(RASTER_DIR)
+        raster = AqiRaster.load(RASTER_DIR)
+    return raster
+
+
+def _is_stale(snapshot):
+    age = (datetime.now(timezone.utc) - snapshot["fetched_at"]).total_seconds()
+    return age > SNAPSHOT_MAX_AGE_SECONDS
+
+
+async def refresh_station_snapshot(only_if_stale=False):
+    """
+    Pull history for every station and swap in a new snapshot.
+    Returns (snapshot, error_message); the previous snapshot is kept on failure.
+    """
+    global _snapshot
+
+    async with _refresh_lock:
+        # Another caller may have refreshed while we waited for the lock
+        if only_if_stale and _snapshot is not None and not _is_stale(_snapshot):
+            return _snapshot, None
+
+        fetch_tasks = [fetch_station_data(sid, co) for sid, co in STATIONS.items()]
+        station_results = await asyncio.gather(*fetch_tasks)
+
+        version = (_snapshot["version"] + 1) if _snapshot else 1
+        snapshot, error = assemble_snapshot(station_results, version)
+        if snapshot is None:
+            print(f"Station refresh failed: {error}", flush=True)
+            return None, error
+
+        # Grow the training store with the hours we just pulled (off the request path)
+        schedule_ingest(station_results)
+
+        # Inference happens once per data refresh; every request reuses the result
+        try:
+            snapshot["station_forecasts"] = await asyncio.to_thread(run_forecast, snapshot)
+            snapshot["forecast_error"] = None
+        except Exception as model_err:
+            print(f"Model Error for snapshot v{version}: {model_err}", flush=True)
+            snapshot["station_forecasts"] = None
+            snapshot["forecast_error"] = f"Model failed: {model_err}"
+
+        # Interpolated grids for route scoring; exact IDW is used without one
+        snapshot["raster"] = None
+        if RASTER_ENABLED:
+            try:
+                snapshot["raster"] = await asyncio.to_thread(build_snapshot_raster, snapshot)
+            except Exception as raster_err:
+                print(f"Raster build failed for snapshot v{version}: {raster_err}", flush=True)
+
+        _snapshot = snapshot
+        print(f"Station snapshot v{version} ready (anchor {snapshot['anchor_time']})", flush=True)
+
+        if shared_mode():
+            try:
+                await asyncio.to_thread(publish_snapshot, snapshot)
+            except Exception as e:
+                print(f"Publishing snapshot v{version} failed: {e}", flush=True)
+        return snapshot, None
+
+
+def get_station_snapshot():
+    return _snapshot
+
+
+_published_raster = None
+
+
+def current_raster():
+    """
+    Raster of the in-memory snapshot, or the one published to AQI_RASTER_DIR
+    by another worker (memory-mapped, reloaded when its version changes).
+    """
+    global _published_raster
+
+    if not is_producer():
+        published = load_published_snapshot()
+        return published["raster"] if published else None
+    if _snapshot is not None and _snapshot.get("raster") is not None:
+        return _snapshot["raster"]
+    if not RASTER_DIR:
+        return None
+
+    try:
+        version = AqiRaster.published_version(RASTER_DIR)
+        if _published_raster is None or version != _published_raster.version:
+            _published_raster = AqiRaster.load(RASTER_DIR)
+    except (OSError, ValueError) as e:
+        print(f"Published raster unavailable: {e}", flush=True)
+    return _published_raster
+
+
+async def get_or_refresh_snapshot():
+    """
+    Serve the in-memory snapshot. Falls back to fetching on the request path
+    when there is none yet or it has gone stale (prefetcher disabled/failing);
+    if that fetch fails too, stale data is still better than an error.
+    """
+    # Reader workers never fetch or infer; they serve what the producer published
+    if not is_producer():
+        published = load_published_snapshot()
+        if published is None:
+            return None, "Forecast data not published yet, producer is warming up"
+        return published, None
+
+    snapshot = _snapshot
+    if snapshot is not None and not _is_stale(snapshot):
+        return snapshot, None
+
+    fresh, error = await refresh_station_snapshot(only_if_stale=True)
+    if fresh is None and snapshot is not None:
+        return snapshot, None
+    return fresh, error
+
+
+def snapshot_meta(snapshot):
+    age = (datetime.now(timezone.utc) - snapshot["fetched_at"]).total_seconds()
+    return {
+        "version": snapshot["version"],
+        "forecast_ready": snapshot.get("station_forecasts") is not None,
+        "fetched_at": snapshot["fetched_at"].isoformat(),
+        "anchor_time": snapshot["anchor_time"].isoformat() if snapshot["anchor_time"] else None,
+        "age_seconds": round(age, 1),
+        "stale": age > SNAPSHOT_MAX_AGE_SECONDS,
+    }
+
+
+def _seconds_until_next_refresh():
+    now = datetime.now(timezone.utc)
+    next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return (next_hour - now).total_seconds() + PREFETCH_OFFSET_SECONDS
+
+
+async def run_station_prefetcher():
+    """Refresh immediately, then just after every hour. Retries sooner on failure."""
+    while True:
+        try:
+            snapshot, _ = await refresh_station_snapshot()
+        except Exception as e:
+            print(f"Station prefetcher error: {e}", flush=True)
+            snapshot = None
+
+        delay = _seconds_until_next_refresh()
+        if snapshot is None:
+            delay = min(delay, PREFETCH_RETRY_SECONDS)
+        await asyncio.sleep(delay)
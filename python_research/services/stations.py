@@ -0,0 +1,69 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from python_research.services.spatial import EARTH_RADIUS_KM, haversine_np
+
+# Fixed Station Coordinates
+# Order matters: the index is the station id the LSTM was trained with
+STATIONS = {
+    "station_0": {"lat": 23.51905342888936, "lon": 87.34565136450719},
+    "station_1": {"lat": 23.564018931392827, "lon": 87.31123928017463},
+    "station_2": {"lat": 23.5391718044899, "lon": 87.30401858752859},
+    "station_3": {"lat": 23.554806202241476, "lon": 87.24681601086061},
+}
+
+def unit_sphere(lats, lons):
+    """[lat, lon] degrees -> (n, 3) unit vectors, so chord distance is monotonic in great-circle distance."""
+    lat = np.radians(np.asarray(lats, dtype=float)).reshape(-1)
+    lon = np.radians(np.asarray(lons, dtype=float)).reshape(-1)
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def km_to_chord(km):
+    return 2 * np.sin(np.asarray(km, dtype=float) / (2 * EARTH_RADIUS_KM))
+
+
+class StationRegistry:
+    """
+    Station ids + coordinates backed by a KD-tree on the unit sphere.
+    Every query takes arrays of lats/lons and answers them in one call,
+    so lookup cost stays logarithmic in the number of stations.
+    """
+
+    def __init__(self, stations):
+        self.ids = list(stations.keys())
+        self.coords = np.array([[s["lat"], s["lon"]] for s in stations.values()], dtype=float)
+        self._index = {sid: i for i, sid in enumerate(self.ids)}
+        self._tree = cKDTree(unit_sphere(self.coords[:, 0], self.coords[:, 1]))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index(self, station_id):
+        return self._index[station_id]
+
+    def k_nearest(self, lats, lons, k=1):
+        """(indices, distances_km), both shaped (n_points, k)."""
+        k = min(k, len(self.ids))
+        _, idx = self._tree.query(unit_sphere(lats, lons), k=k)
+        idx = np.asarray(idx).reshape(-1, k)
+
+        # Exact haversine to the selected stations only
+        lats = np.asarray(lats, dtype=float).reshape(-1, 1)
+        lons = np.asarray(lons, dtype=float).reshape(-1, 1)
+        dist = haversine_np(lats, lons, self.coords[idx, 0], self.coords[idx, 1])
+        return idx, dist
+
+    def nearest(self, lats, lons):
+        """(station ids, distances_km) of the closest station for every point."""
+        idx, dist = self.k_nearest(lats, lons, k=1)
+        return [self.ids[i] for i in idx[:, 0]], dist[:, 0]
+
+    def within_radius(self, lats, lons, radius_km):
+        """One array of station indices per point, for stations within radius_km."""
+        hits = self._tree.query_ball_point(unit_sphere(lats, lons), r=float(km_to_chord(radius_km)))
+        return [np.array(sorted(h), dtype=int) for h in hits]
+
+
+station_registry = StationRegistry(STATIONS)
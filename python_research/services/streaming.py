@@ -0,0 +1,23 @@
+import json
+import os
+
+# Route points per streamed "points" event
+STREAM_CHUNK_POINTS = int(os.getenv("STREAM_CHUNK_POINTS", "200"))
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def encode_event(event, mode):
+    """One event dict -> bytes for an NDJSON line or a Server-Sent Event."""
+    payload = json.dumps(event, separators=(",", ":"))
+    if mode == "sse":
+        return f"event: {event['type']}\ndata: {payload}\n\n".encode()
+    return f"{payload}\n".encode()
+
+
+def encode_stream(events, mode):
+    for event in events:
+        yield encode_event(event, mode)
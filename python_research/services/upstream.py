@@ -0,0 +1,226 @@
+import asyncio
+import importlib.util
+import os
+import random
+import threading
+import time
+
+import httpx
+
+# One pooled client for every Google call (Air Quality + Weather). Created and
+# closed by the app lifespan; scripts get one lazily on first use.
+UPSTREAM_HTTP2 = os.getenv("AQI_UPSTREAM_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("AQI_UPSTREAM_MAX_CONNECTIONS", "20"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("AQI_UPSTREAM_MAX_KEEPALIVE", "10"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("AQI_UPSTREAM_KEEPALIVE_EXPIRY", "60"))
+UPSTREAM_RETRIES = int(os.getenv("AQI_UPSTREAM_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("AQI_UPSTREAM_BACKOFF_BASE", "0.2"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("AQI_UPSTREAM_BACKOFF_MAX", "2.0"))
+BREAKER_FAILURES = int(os.getenv("AQI_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("AQI_BREAKER_RESET_SECONDS", "30"))
+
+# Current conditions sit on the request path, history/forecast calls do not
+ENDPOINT_TIMEOUTS = {
+    "aqi_profile": httpx.Timeout(5.0, connect=2.0),
+    "aqi_history": httpx.Timeout(10.0, connect=2.0),
+    "weather_history": httpx.Timeout(10.0, connect=2.0),
+    "aqi_forecast": httpx.Timeout(10.0, connect=2.0),
+}
+DEFAULT_TIMEOUT = httpx.Timeout(5.0, connect=2.0)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an endpoint whose breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after BREAKER_FAILURES consecutive failed calls; after
+    BREAKER_RESET_SECONDS one trial call is let through (half-open) and its
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.max_failures = failures
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def acquire(self):
+        """(allowed, is_trial): a half-open breaker lets exactly one trial call through."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True, False
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True, True
+            return False, False
+
+    def release_trial(self):
+        # The trial ended without a verdict (cancelled, non-HTTP error): let the next call try
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.max_failures or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+def _backoff(attempt):
+    # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+    return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** attempt))
+
+
+class UpstreamClient:
+    """
+    Pooled keep-alive (HTTP/2 when h2 is installed) clients with per-endpoint
+    timeouts, jittered exponential retry on transport errors / 429 / 5xx and a
+    circuit breaker per endpoint. `request` for async code, `request_sync`
+    for the blocking helpers and scripts.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._sync_client = None
+        self._breakers = {}
+        self._calls = 0
+        self._retries = 0
+        self._failures = 0
+        self._short_circuited = 0
+
+    def _client_kwargs(self):
+        return {
+            "http2": UPSTREAM_HTTP2,
+            "timeout": DEFAULT_TIMEOUT,
+            "limits": httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+        }
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(**self._client_kwargs())
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+    def breaker(self, endpoint):
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker()
+        return self._breakers[endpoint]
+
+    def _admit(self, endpoint):
+        """Returns True when this call is the breaker's half-open trial."""
+        self._calls += 1
+        allowed, trial = self.breaker(endpoint).acquire()
+        if not allowed:
+            self._short_circuited += 1
+            raise CircuitOpen(f"Upstream '{endpoint}' circuit open, skipping call")
+        return trial
+
+    def _should_retry(self, error, attempt):
+        if attempt >= UPSTREAM_RETRIES:
+            return False
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS
+        return isinstance(error, httpx.TransportError)
+
+    def _record(self, endpoint, error):
+        # 4xx other than 429 is our request being wrong, not the upstream being down
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code not in RETRYABLE_STATUS:
+            self.breaker(endpoint).record_success()
+            return
+        self._failures += 1
+        self.breaker(endpoint).record_failure()
+
+    async def request(self, endpoint, method, url, **kwargs):
+        trial = self._admit(endpoint)
+        try:
+            if self._client is None:
+                await self.start()
+
+            timeout = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+            attempt = 0
+            while True:
+                try:
+                    response = await self._client.request(method, url, timeout=timeout, **kwargs)
+                    response.raise_for_status()
+                    self.breaker(endpoint).record_success()
+                    return response
+                except httpx.HTTPError as e:
+                    if not self._should_retry(e, attempt):
+                        self._record(endpoint, e)
+                        raise
+                    self._retries += 1
+                    await asyncio.sleep(_backoff(attempt))
+                    attempt += 1
+        finally:
+            if trial:
+                self.breaker(endpoint).release_trial()
+
+    def request_sync(self, endpoint, method, url, **kwargs):
+        trial = self._admit(endpoint)
+        try:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(**self._client_kwargs())
+
+            timeout = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+            attempt = 0
+            while True:
+                try:
+                    response = self._sync_client.request(method, url, timeout=timeout, **kwargs)
+                    response.raise_for_status()
+                    self.breaker(endpoint).record_success()
+                    return response
+                except httpx.HTTPError as e:
+                    if not self._should_retry(e, attempt):
+                        self._record(endpoint, e)
+                        raise
+                    self._retries += 1
+                    time.sleep(_backoff(attempt))
+                    attempt += 1
+        finally:
+            if trial:
+                self.breaker(endpoint).release_trial()
+
+    def stats(self):
+        return {
+            "http2": UPSTREAM_HTTP2,
+            "calls": self._calls,
+            "retries": self._retries,
+            "failures": self._failures,
+            "short_circuited": self._short_circuited,
+            "breakers": {name: {"state": b.state, "failures": b.failures} for name, b in self._breakers.items()},
+        }
+
+
+upstream = UpstreamClient()
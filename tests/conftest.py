@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from python_research.services import dataset_store
+
+
+def station_frame(hours=300, start="2025-01-30 05:30", seed=0):
+    """Hourly rows in the CSV layout (IST datetime, continuous features, AQI)."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.uniform(1, 200, size=(hours, len(dataset_store.CONTINUOUS_COLS) + 1)),
+                      columns=dataset_store.CONTINUOUS_COLS + [dataset_store.TARGET_COL])
+    df.insert(0, "datetime", pd.date_range(start, periods=hours, freq="h"))
+    return df
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    """Small per-station CSVs under the names build_store reads, spanning a month boundary."""
+    path = tmp_path / "csv"
+    path.mkdir()
+    for station_id, name in dataset_store.STATION_FILES.items():
+        station_frame(seed=station_id).to_csv(path / name, index=False)
+    return path
+
+
+@pytest.fixture
+def store_dir(tmp_path, csv_dir):
+    path = tmp_path / "store"
+    dataset_store.build_store(csv_dir, path)
+    return path
+
+
+@pytest.fixture
+def api_client(monkeypatch):
+    """TestClient on the API router without the lifespan (no model load, prefetcher or Google calls)."""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from python_research.routes import aqi_route
+    from python_research.services.executor import BoundedExecutor
+
+    # Kriging in threads: spawning processes per test is slow and proves nothing extra
+    monkeypatch.setattr(aqi_route, "kriging_pool", BoundedExecutor("kriging", "thread", 2, 8))
+    app = FastAPI()
+    app.include_router(aqi_route.router)
+    with TestClient(app) as client:
+        yield client
+    aqi_route.kriging_pool.shutdown()
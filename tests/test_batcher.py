@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from python_research.services.batcher import MicroBatcher
+
+
+def test_concurrent_submits_share_a_batch():
+    release = threading.Event()
+    sizes = []
+
+    def run_batch(items):
+        release.wait(1)
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(run_batch, max_items=8, window_ms=50)
+    futures = [batcher.submit(i) for i in range(5)]
+    release.set()
+    assert [f.result(timeout=2) for f in futures] == [0, 2, 4, 6, 8]
+    assert sum(sizes) == 5 and batcher.stats()["items"] == 5
+
+
+def test_short_result_list_fails_every_caller():
+    batcher = MicroBatcher(lambda items: items[:-1], max_items=4, window_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="results for"):
+            future.result(timeout=2)
+    assert batcher.stats()["failed_batches"] >= 1
+
+
+def test_lazy_failure_partway_keeps_the_worker_alive():
+    def run_batch(items):
+        for item in items:
+            if item == "boom":
+                raise ValueError("bad item")
+            yield item
+
+    batcher = MicroBatcher(run_batch, max_items=4, window_ms=50)
+    futures = [batcher.submit(i) for i in ("a", "boom", "c")]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=2)
+
+    # the worker thread survived and serves the next batch
+    assert batcher.submit("d").result(timeout=2) == "d"
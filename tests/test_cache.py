@@ -0,0 +1,58 @@
+import asyncio
+
+from python_research.services.cache import ResponseCache, cached_lookup, geohash_encode, lookup_key
+from python_research.services.singleflight import SingleFlight
+
+
+def test_geohash_matches_reference_values():
+    assert geohash_encode(57.64911, 10.40744, precision=11) == "u4pruydqqvj"
+    assert geohash_encode(23.5190, 87.3456, precision=6) == geohash_encode(23.5192, 87.3458, precision=6)
+
+
+def test_lookup_key_keeps_options_but_not_the_api_key():
+    plain = lookup_key("aqi_history", 23.5, 87.3)
+    assert lookup_key("aqi_history", 23.5, 87.3, {"api_key": "secret"}) == plain
+    assert lookup_key("aqi_history", 23.5, 87.3, {"hours": 3}) == plain + ":hours=3"
+
+
+def test_entries_expire_and_evict_least_recently_used(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("python_research.services.cache.time.time", lambda: clock[0])
+    cache = ResponseCache(max_entries=2, ttl=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1    # a is now the most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.evictions == 1
+
+    clock[0] += 61
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_sqlite_backing_survives_a_restart(tmp_path):
+    db_path = tmp_path / "cache.db"
+    ResponseCache(db_path=db_path).set("k", {"aqi": 42})
+    assert ResponseCache(db_path=db_path).get("k") == {"aqi": 42}
+
+
+def test_cached_lookup_shares_hits_within_a_cell_and_skips_errors():
+    calls = []
+
+    @cached_lookup("profile", cache=ResponseCache(), flights=SingleFlight())
+    async def fetch(lat, lon, fail=False):
+        calls.append((lat, lon))
+        return {"error": "upstream"} if fail else {"aqi": 90, "lat": lat, "lon": lon}
+
+    async def main():
+        first = await fetch(23.51901, 87.34561)
+        neighbour = await fetch(23.51902, 87.34562)
+        await fetch(23.51901, 87.34561, fail=True)
+        await fetch(23.51901, 87.34561, fail=True)
+        return first, neighbour
+
+    first, neighbour = asyncio.run(main())
+    assert first["aqi"] == neighbour["aqi"] == 90
+    assert (neighbour["lat"], neighbour["lon"]) == (23.51902, 87.34562)  # the asked-for point, not the cached one
+    assert len(calls) == 3  # one success, then both error results refetched
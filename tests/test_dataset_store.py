@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from python_research.services import dataset_store
+
+from conftest import station_frame
+
+STATIONS = sorted(dataset_store.STATION_FILES)
+
+
+def partitions(store_dir):
+    return sorted(str(p.relative_to(store_dir)) for p in Path(store_dir).glob("station_id=*/month=*"))
+
+
+def test_store_is_partitioned_by_station_and_month(store_dir):
+    # station_frame's 300 hours start on 2025-01-30 and run into February
+    assert partitions(store_dir) == [f"station_id={s}/month={m}" for s in STATIONS for m in (202501, 202502)]
+
+
+def test_load_round_trips_rows_in_station_then_time_order(store_dir):
+    df = dataset_store.load_frame(store_dir=store_dir)
+    assert list(df["station_id"].unique()) == STATIONS
+    assert df.groupby("station_id")["datetime"].apply(lambda s: s.is_monotonic_increasing).all()
+
+    source = station_frame(seed=1)
+    station = df[df["station_id"] == 1].reset_index(drop=True)
+    np.testing.assert_allclose(station[dataset_store.CONTINUOUS_COLS], source[dataset_store.CONTINUOUS_COLS])
+    np.testing.assert_allclose(station["hour_sin"], np.sin(2 * np.pi * source["datetime"].dt.hour / 24))
+
+
+def test_station_and_time_filters(store_dir):
+    start, end = pd.Timestamp("2025-01-31 23:30"), pd.Timestamp("2025-02-01 02:30")
+    table = dataset_store.load_table(stations=[1], start=start, end=end, columns=["station_id", "datetime"],
+                                     store_dir=store_dir)
+    assert table.column("station_id").to_pylist() == [1, 1, 1]
+    assert [pd.Timestamp(t) for t in table.column("datetime").to_pylist()] == list(
+        pd.date_range(start, periods=3, freq="h"))
+
+
+def test_compaction_folds_deltas_and_keeps_the_newest_row(store_dir):
+    partition = Path(store_dir) / "station_id=0" / "month=202502"
+    rows_before = dataset_store.load_table(stations=[0], store_dir=store_dir).num_rows
+
+    # Re-send one stored hour with a corrected value, plus one new hour at the end
+    revised = station_frame(hours=300, seed=0).iloc[[-1]].assign(AQI=-1.0)
+    new = revised.assign(datetime=revised["datetime"] + pd.Timedelta(hours=1), AQI=-2.0)
+    written = dataset_store.append_tables([dataset_store.to_table(pd.concat([revised, new]), 0)], store_dir)
+    assert written == {str(partition)}
+    assert len(dataset_store.partition_files(partition)) == 2
+
+    assert dataset_store.compact_store(store_dir) == 1
+    assert dataset_store.partition_files(partition) == ["part-0.arrow"]
+
+    df = dataset_store.load_frame(stations=[0], store_dir=store_dir)
+    assert len(df) == rows_before + 1
+    assert df["AQI"].iloc[-2:].tolist() == [-1.0, -2.0]
+    assert df["datetime"].is_unique
+
+
+def test_every_change_bumps_the_store_generation(store_dir):
+    before = dataset_store.store_generation(store_dir)
+    dataset_store.append_tables([dataset_store.to_table(station_frame(hours=2, start="2025-02-20 00:30"), 0)],
+                                store_dir)
+    appended = dataset_store.store_generation(store_dir)
+    assert dataset_store.compact_store(store_dir) == 1
+    assert len({before, appended, dataset_store.store_generation(store_dir)}) == 3
+
+
+def test_base_is_built_under_rows_ingested_before_it(tmp_path, csv_dir):
+    store = tmp_path / "store"
+    # Live rows land first, one of them on an hour the CSV also has; a compaction makes them a part-0
+    live = station_frame(hours=3, start="2025-01-31 10:30", seed=9).assign(AQI=-5.0)
+    dataset_store.append_tables([dataset_store.to_table(live, 2)], store)
+    dataset_store.append_tables([dataset_store.to_table(live.iloc[[0]], 2)], store)
+    dataset_store.compact_store(store)
+    assert not dataset_store.has_base(store)
+
+    # The training path builds the base even though the directory already exists
+    dataset_store.open_store(store, csv_dir=csv_dir)
+    assert dataset_store.has_base(store)
+    table = dataset_store.load_table(store_dir=store)
+    assert table.num_rows == 300 * len(STATIONS)  # the live hours overlap the CSV ones
+
+    df = dataset_store.load_frame(stations=[2], start=live["datetime"].iloc[0], end=live["datetime"].iloc[-1],
+                                  store_dir=store)
+    assert df["AQI"].tolist() == [-5.0, -5.0]  # live rows are newer than the base and win
+    assert all(len(dataset_store.partition_files(p)) == 1 for p in Path(store).glob("station_id=*/month=*"))
@@ -0,0 +1,38 @@
+import asyncio
+import importlib
+import threading
+
+import pytest
+
+from python_research.services import executor
+
+
+def test_saturated_pool_turns_callers_away():
+    pool = executor.BoundedExecutor("test", "thread", workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def main():
+        jobs = [asyncio.create_task(pool.run(release.wait, 2)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(executor.ExecutorSaturated):
+            await pool.run(release.wait, 2)
+        release.set()
+        return await asyncio.gather(*jobs)
+
+    try:
+        assert asyncio.run(main()) == [True, True]
+        assert pool.stats()["rejected"] == 1 and pool.stats()["completed"] == 2
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.parametrize("web_concurrency, expected", [("1", 8), ("4", 2), ("16", 1)])
+def test_kriging_workers_split_the_cores_between_web_workers(monkeypatch, web_concurrency, expected):
+    monkeypatch.delenv("KRIGING_WORKERS", raising=False)
+    monkeypatch.setenv("WEB_CONCURRENCY", web_concurrency)
+    monkeypatch.setattr("os.sched_getaffinity", lambda pid: set(range(8)))
+    try:
+        assert importlib.reload(executor).KRIGING_WORKERS == expected
+    finally:
+        monkeypatch.undo()
+        importlib.reload(executor)
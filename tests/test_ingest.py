@@ -0,0 +1,88 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from python_research.services import dataset_store, ingest, station_feed
+
+
+def api_results(station_id, hours, newest_first=False):
+    """(station_id, coords, weather, aqi) shaped like the Google history fetchers return."""
+    now = ingest._current_hour_ist() - ingest.IST_OFFSET
+    times = [now - timedelta(hours=h) for h in range(hours - 1, -1, -1)]
+    if newest_first:
+        times.reverse()
+    aqi = {"history": [{"time": t.strftime("%Y-%m-%dT%H:%M:%SZ"), "pm25": 10 + i, "aqi": 50 + i}
+                       for i, t in enumerate(times)]}
+    weather = {"history": [{"temp_c": 25, "wind": 3, "humidity": 60} for _ in times]}
+    return station_id, {"lat": 0, "lon": 0}, weather, aqi
+
+
+@pytest.fixture
+def live_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_ENABLED", True)
+    monkeypatch.setattr(ingest, "_datasets", {})
+    return tmp_path / "store"
+
+
+def test_first_ingest_does_not_hide_the_csv_base_from_training(live_store, csv_dir):
+    assert ingest.stored_histories(24, store_dir=live_store) == {}
+    assert not live_store.exists()  # no CSV build on the request path
+
+    assert ingest.ingest_station_results([api_results("station_0", 6)], store_dir=live_store) == 6
+    assert len(ingest.stored_histories(24, store_dir=live_store)["station_0"]) == 6
+
+    # The live deltas created the directory; training still builds the base under them
+    dataset_store.open_store(live_store, csv_dir=csv_dir)
+    assert dataset_store.has_base(live_store)
+    assert dataset_store.load_table(store_dir=live_store).num_rows == 300 * len(dataset_store.STATION_FILES) + 6
+    assert len(ingest.stored_histories(24, store_dir=live_store)["station_0"]) == 6
+
+
+def test_reingest_writes_only_new_hours(live_store):
+    assert ingest.ingest_station_results([api_results("station_0", 6)], store_dir=live_store) == 6
+    assert ingest.ingest_station_results([api_results("station_0", 6)], store_dir=live_store) == 0
+
+    rows = ingest.stored_histories(24, store_dir=live_store)["station_0"]
+    assert len(rows) == len({r["time"] for r in rows}) == 6
+    assert [r["time"] for r in rows] == sorted(r["time"] for r in rows)
+
+
+def test_cached_dataset_sees_appends_and_compaction(live_store):
+    ingest.ingest_station_results([api_results("station_1", 3)], store_dir=live_store)
+    first = ingest._open_store(live_store)
+    assert ingest._open_store(live_store) is first  # reused while nothing changes
+
+    # A newer hour appended by another worker is picked up, and still after compaction
+    dataset_store.append_tables([dataset_store.to_table(
+        ingest.history_frame(*api_results("station_1", 1)[2:]).assign(
+            datetime=lambda df: df["datetime"] + timedelta(hours=1)), 1)], live_store)
+    assert ingest._open_store(live_store) is not first
+    assert len(ingest.stored_histories(24, store_dir=live_store)["station_1"]) == 4
+
+    dataset_store.compact_store(live_store)
+    assert all(f.endswith("part-0.arrow") for f in ingest._open_store(live_store).files)
+    assert len(ingest.stored_histories(24, store_dir=live_store)["station_1"]) == 4
+
+
+@pytest.mark.parametrize("newest_first", [False, True])
+def test_history_keeps_the_api_row_order(monkeypatch, newest_first):
+    full = api_results("station_0", 24, newest_first=newest_first)
+    ascending = station_feed.combine_station_history(*api_results("station_0", 24)[2:])
+    held = ascending[:20]  # the store already has all but the last 4 hours
+
+    async def fake_fetch(station_id, coords, hours):
+        _, _, weather, aqi = api_results(station_id, hours, newest_first=newest_first)
+        return station_id, coords, weather, aqi
+
+    monkeypatch.setattr(station_feed, "_api_newest_first", False)
+    monkeypatch.setattr(station_feed, "fetch_station_data", fake_fetch)
+    monkeypatch.setattr(station_feed, "schedule_ingest", lambda results: None)
+
+    rows, fetched = asyncio.run(station_feed.fetch_station_history("station_0", {}, held))
+    assert fetched == 4
+    assert [r["time"] for r in rows] == [r["time"] for r in station_feed.combine_station_history(*full[2:])]
+
+    # Served straight from the store, the order matches the last fetch
+    rows, fetched = asyncio.run(station_feed.fetch_station_history("station_0", {}, ascending))
+    assert fetched == 0 and rows == (ascending[::-1] if newest_first else ascending)
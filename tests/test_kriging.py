@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from python_research.services.aqi_engine import TARGET_POLLUTANTS, _anchor_values, _kriging_anchors, krige_jobs, krige_routes
+from python_research.services.kriging import krige_values
+
+OrdinaryKriging = pytest.importorskip("pykrige.ok").OrdinaryKriging
+
+START = {"lat": 23.52, "lon": 87.31, "aqi": 120, "pm25": 60, "pm10": 90, "co": 400, "no2": 20, "o3": 35}
+END = {"lat": 23.56, "lon": 87.25, "aqi": 80, "pm25": 40, "pm10": 70, "co": 300, "no2": 15, "o3": 50}
+
+
+def route(start, end, n=25, wiggle=0.004):
+    t = np.linspace(0, 1, n)
+    lats = start["lat"] + t * (end["lat"] - start["lat"]) + wiggle * np.sin(6 * t)
+    lons = start["lon"] + t * (end["lon"] - start["lon"])
+    return [[lat, lon] for lat, lon in zip(lats, lons)]
+
+
+def pykrige_reference(start, end, points):
+    """The per-pollutant, per-point pykrige loop the engine used to run."""
+    lats, lons = _kriging_anchors(start, end)
+    z_values = _anchor_values(start, end)
+    points = np.asarray(points)
+    out = {}
+    for j, p_type in enumerate(TARGET_POLLUTANTS):
+        ok = OrdinaryKriging(lons, lats, z_values[:, j], variogram_model="gaussian",
+                             variogram_parameters=[1.0, 0.1, 0.1], verbose=False)
+        z, _ = ok.execute("points", points[:, 1], points[:, 0])
+        out[p_type] = np.asarray(z)
+    return out
+
+
+def test_krige_routes_matches_pykrige():
+    routes = [route(START, END), route(START, END, n=7, wiggle=-0.01)]
+    for points, values in zip(routes, krige_routes(START, END, routes)):
+        expected = pykrige_reference(START, END, points)
+        for p_type in TARGET_POLLUTANTS:
+            np.testing.assert_allclose(values[p_type], expected[p_type], rtol=1e-9, atol=1e-9)
+
+
+def test_targets_on_an_anchor_return_the_anchor_value():
+    lats, lons = _kriging_anchors(START, END)
+    z = _anchor_values(START, END)
+    np.testing.assert_allclose(krige_values(lons, lats, z, lons, lats), z, atol=1e-9)
+
+
+def test_batched_jobs_match_one_by_one():
+    other_end = {**END, "lat": 23.60, "lon": 87.40, "aqi": 200}
+    jobs = [(START, END, [route(START, END)]), (START, other_end, [route(START, other_end, n=40), route(START, other_end, n=3)])]
+    for (start, end, routes_points), batched in zip(jobs, krige_jobs(jobs)):
+        for single, together in zip(krige_routes(start, end, routes_points), batched):
+            for p_type in TARGET_POLLUTANTS:
+                np.testing.assert_allclose(together[p_type], single[p_type], rtol=1e-12)
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+import textwrap
+
+
+def test_api_loads_without_the_training_packages():
+    # requirements-docker.txt ships neither pandas nor pyarrow
+    code = textwrap.dedent("""
+        import builtins
+        real_import = builtins.__import__
+
+        def blocked(name, *args, **kwargs):
+            if name.split(".")[0] in ("pandas", "pyarrow"):
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+
+        builtins.__import__ = blocked
+        import main
+        from python_research.services import ingest
+        assert not ingest.INGEST_ENABLED and ingest.stored_histories(24) == {}
+    """)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from python_research.services.polyline import (
+    douglas_peucker,
+    length_weights,
+    resample_by_distance,
+    segment_lengths_m,
+    simplify_route,
+)
+
+
+def straight(n=50, jitter_deg=0.0):
+    rng = np.random.default_rng(0)
+    lats = np.linspace(23.50, 23.52, n) + rng.uniform(-jitter_deg, jitter_deg, n)
+    return np.column_stack([lats, np.full(n, 87.30)])
+
+
+def test_douglas_peucker_drops_points_within_tolerance():
+    # ~1 m of jitter around a straight 2 km line collapses to its two ends
+    kept = douglas_peucker(straight(jitter_deg=1e-5), tolerance_m=15)
+    assert len(kept) == 2
+
+
+def test_douglas_peucker_keeps_corners():
+    leg_a = np.column_stack([np.linspace(23.50, 23.51, 20), np.full(20, 87.30)])
+    leg_b = np.column_stack([np.full(20, 23.51), np.linspace(87.30, 87.31, 20)])
+    kept = douglas_peucker(np.vstack([leg_a, leg_b[1:]]), tolerance_m=15)
+    np.testing.assert_allclose(kept, [[23.50, 87.30], [23.51, 87.30], [23.51, 87.31]])
+
+
+def test_resample_spacing_and_ends():
+    points = straight(n=5)
+    resampled = resample_by_distance(points, spacing_m=100)
+    spacing = segment_lengths_m(resampled)
+    np.testing.assert_allclose(spacing[:-1], 100, rtol=1e-3)
+    assert spacing[-1] <= 100 + 1e-6
+    np.testing.assert_allclose(resampled[[0, -1]], points[[0, -1]])
+
+
+def test_length_weights_follow_segment_lengths():
+    np.testing.assert_allclose(length_weights(straight(n=5)), [1 / 8, 1 / 4, 1 / 4, 1 / 4, 1 / 8])
+    np.testing.assert_allclose(length_weights([[23.5, 87.3], [23.5, 87.3]]), [0.5, 0.5])
+
+
+def test_simplify_route_modes():
+    points = straight(n=200).tolist()
+    assert simplify_route(points, mode="none") == (points, None)
+
+    reduced, weights = simplify_route(points, mode="resample", max_points=10)
+    assert len(reduced) == 10 and weights.sum() == pytest.approx(1)
+    assert reduced[0] == pytest.approx(points[0]) and reduced[-1] == pytest.approx(points[-1])
+
+    with pytest.raises(ValueError):
+        simplify_route(points, mode="spline")
+
+
+def test_max_points_caps_every_mode():
+    points = straight(n=2000).tolist()
+    for mode in ("none", "dp", "resample"):
+        reduced, weights = simplify_route(points, mode=mode, max_points=100)
+        assert len(reduced) <= 100 and weights.sum() == pytest.approx(1)
+        assert reduced[0] == pytest.approx(points[0]) and reduced[-1] == pytest.approx(points[-1])
+
+    # Under the cap, "none" still kriges every vertex with a plain average
+    assert simplify_route(points[:100], mode="none", max_points=100) == (points[:100], None)
+    assert simplify_route(points, mode="none", max_points=0) == (points, None)
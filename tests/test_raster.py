@@ -0,0 +1,59 @@
+import numpy as np
+
+from python_research.services.raster import AqiRaster, build_raster
+from python_research.services.spatial import idw_weight_matrix
+
+BBOX = (23.45, 87.15, 23.65, 87.45)
+STEP = 0.01
+
+
+def linear_raster():
+    """Two layers that are linear in lat/lon, which bilinear sampling reproduces exactly."""
+    lats = np.arange(BBOX[0], BBOX[2] + STEP / 2, STEP)
+    lons = np.arange(BBOX[1], BBOX[3] + STEP / 2, STEP)
+    grid_lat, grid_lon = np.meshgrid(lats, lons, indexing="ij")
+    grid = np.stack([100 * (grid_lat - 23) + 10 * (grid_lon - 87), 5 * (grid_lon - 87)])
+    return AqiRaster(grid, (BBOX[0], BBOX[1], lats[-1], lons[-1]), STEP, ["current:aqi", "current:pm25"], 1)
+
+
+def test_bilinear_sample_is_exact_on_a_linear_field():
+    raster = linear_raster()
+    rng = np.random.default_rng(0)
+    points = np.column_stack([rng.uniform(23.45, 23.65, 100), rng.uniform(87.15, 87.45, 100)])
+    expected = np.column_stack([100 * (points[:, 0] - 23) + 10 * (points[:, 1] - 87), 5 * (points[:, 1] - 87)])
+    np.testing.assert_allclose(raster.sample(points), expected, atol=1e-9)
+    np.testing.assert_allclose(raster.sample(points, ["current:pm25"])[:, 0], expected[:, 1], atol=1e-9)
+
+
+def test_points_outside_the_box_are_clamped_to_its_edge():
+    raster = linear_raster()
+    inside = raster.sample([[23.65, 87.45]])
+    assert not raster.contains([[23.9, 87.6]])
+    np.testing.assert_allclose(raster.sample([[23.9, 87.6]]), inside)
+
+
+def test_route_arrays_and_point_profile():
+    raster = linear_raster()
+    routes = [[[23.5, 87.2], [23.55, 87.3]], [[23.6, 87.4]]]
+    arrays = raster.route_arrays(routes, ["aqi", "pm25"])
+    assert [len(a["aqi"]) for a in arrays] == [2, 1]
+    profile = raster.point_profile(23.5, 87.2, ["aqi"])
+    assert profile["aqi"] == round(float(arrays[0]["aqi"][0]), 2) and profile["source"] == "raster"
+
+
+def test_save_and_mmap_load_round_trip(tmp_path):
+    raster = linear_raster()
+    raster.save(tmp_path)
+    assert AqiRaster.published_version(tmp_path) == 1
+    loaded = AqiRaster.load(tmp_path)
+    assert isinstance(loaded.grid, np.memmap) and loaded.layers == raster.layers
+    np.testing.assert_array_equal(loaded.sample([[23.51, 87.22]]), raster.sample([[23.51, 87.22]]))
+
+
+def test_build_raster_nodes_hold_the_idw_values():
+    anchors = np.array([[23.52, 87.35], [23.56, 87.31], [23.54, 87.30], [23.55, 87.25]])
+    values = np.array([[120.0, 60.0], [80.0, 40.0], [100.0, 55.0], [150.0, 70.0]])
+    raster = build_raster(anchors, values, ["current:aqi", "current:pm25"], version=3, bbox=BBOX, step=STEP)
+
+    nodes = np.array([[23.45, 87.15], [23.55, 87.30], [23.65, 87.45]])
+    np.testing.assert_allclose(raster.sample(nodes), idw_weight_matrix(nodes, anchors) @ values, rtol=1e-5)
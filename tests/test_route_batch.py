@@ -0,0 +1,61 @@
+import pytest
+
+from python_research.routes import aqi_route
+
+A, B, C, BAD = [23.52, 87.31], [23.56, 87.25], [23.60, 87.40], [23.70, 87.50]
+
+
+def profile(lat, lon):
+    aqi = round(100 + 1000 * (lat - 23.5), 2)
+    return {"lat": lat, "lon": lon, "aqi": aqi, "pm25": aqi / 2, "pm10": aqi * 0.8, "co": 300, "no2": 20, "o3": 30}
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+
+    async def fake_profile(lat, lon, api_key=None):
+        calls.append((lat, lon))
+        if [lat, lon] == BAD:
+            return {"lat": lat, "lon": lon, "error": "quota exceeded"}
+        return profile(lat, lon)
+
+    monkeypatch.setattr(aqi_route, "fetch_google_aqi_profile_async", fake_profile)
+    return calls
+
+
+def job(start, end, n_routes=1):
+    route = {"distance": "5 km", "duration": "12 mins",
+             "coordinates": [{"lat": start[0] + (end[0] - start[0]) * t / 4,
+                              "lng": start[1] + (end[1] - start[1]) * t / 4} for t in range(5)]}
+    return {"start_loc": start, "end_loc": end, "routeCount": n_routes, "routes": [route] * n_routes}
+
+
+def test_batch_merges_duplicate_endpoints_and_keeps_job_order(api_client, lookups):
+    jobs = [job(A, B), job(B, C, n_routes=2), job(A, B)]
+    body = api_client.post("/analyze-routes/batch", json={"jobs": jobs}).json()
+
+    assert sorted(lookups) == sorted([tuple(A), tuple(B), tuple(C)])  # A and B are looked up once
+    assert body["job_count"] == 3
+    assert [r["ground_truth"]["start_point"]["lat"] for r in body["results"]] == [A[0], B[0], A[0]]
+    assert [len(r["route_analysis"]) for r in body["results"]] == [1, 2, 1]
+    assert body["results"][0]["route_analysis"] == body["results"][2]["route_analysis"]
+
+
+def test_batch_results_match_single_job_calls(api_client, lookups):
+    single = api_client.post("/analyze-routes", json=job(B, C)).json()
+    batched = api_client.post("/analyze-routes/batch", json={"jobs": [job(A, B), job(B, C)]}).json()
+    assert batched["results"][1]["route_analysis"] == single["route_analysis"]
+
+
+def test_one_failing_job_does_not_fail_the_batch(api_client, lookups):
+    body = api_client.post("/analyze-routes/batch", json={"jobs": [job(A, B), job(A, BAD), job(B, C)]}).json()
+    assert [r["status"] for r in body["results"]] == ["success", "error", "success"]
+    assert body["results"][1]["ground_truth"]["end_point"]["error"] == "quota exceeded"
+
+
+def test_too_many_jobs_are_rejected_before_any_lookup(api_client, lookups, monkeypatch):
+    monkeypatch.setattr(aqi_route, "BATCH_MAX_JOBS", 2)
+    response = api_client.post("/analyze-routes/batch", json={"jobs": [job(A, B)] * 3})
+    assert response.status_code == 413
+    assert lookups == []
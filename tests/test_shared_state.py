@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import textwrap
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from python_research.services import shared_state
+from python_research.services.raster import AqiRaster
+
+
+@pytest.fixture
+def shared_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_state, "SHARED_STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(shared_state, "_published", None)
+    monkeypatch.setattr(shared_state, "_lock_fd", None)
+    yield tmp_path
+    if shared_state._lock_fd is not None:
+        os.close(shared_state._lock_fd)
+
+
+def raster(version):
+    grid = np.full((1, 3, 3), float(version), dtype=np.float32)
+    return AqiRaster(grid, (23.0, 87.0, 23.02, 87.02), 0.01, ["current:aqi"], version)
+
+
+def snapshot(version, with_raster=True):
+    return {
+        "version": version,
+        "fetched_at": datetime(2026, 10, 17, 6, 2, tzinfo=timezone.utc),
+        "anchor_time": datetime(2026, 10, 17, 11, 30),
+        "current": {"station_0": {"aqi": 90}},
+        "station_forecasts": {"station_0": [{"time": "12:30 PM", "aqi": 91.5}]},
+        "forecast_error": None,
+        "raster": raster(version) if with_raster else None,
+    }
+
+
+def other_process_becomes_producer(shared_dir):
+    code = textwrap.dedent(f"""
+        from python_research.services import shared_state
+        shared_state.SHARED_STATE_DIR = {str(shared_dir)!r}
+        print(shared_state.try_become_producer())
+    """)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip() == "True"
+
+
+def test_exactly_one_process_holds_the_producer_lock(shared_dir):
+    assert shared_state.try_become_producer() and shared_state.is_producer()
+    assert (shared_dir / shared_state.LOCK_FILE).read_text() == str(os.getpid())
+    assert not other_process_becomes_producer(shared_dir)
+
+    # The kernel drops the lock with the holder; a standby worker then takes over
+    os.close(shared_state._lock_fd)
+    shared_state._lock_fd = None
+    assert other_process_becomes_producer(shared_dir)
+
+
+def test_publish_then_load_round_trip(shared_dir):
+    assert shared_state.load_published_snapshot() is None
+    published = snapshot(3)
+    shared_state.publish_snapshot(published)
+
+    loaded = shared_state.load_published_snapshot()
+    for key in ("version", "fetched_at", "anchor_time", "current", "station_forecasts", "forecast_error"):
+        assert loaded[key] == published[key]
+    assert loaded["raster"].version == 3 and isinstance(loaded["raster"].grid, np.memmap)
+
+
+def test_reload_only_when_the_file_changes(shared_dir):
+    shared_state.publish_snapshot(snapshot(1, with_raster=False))
+    first = shared_state.load_published_snapshot()
+    assert shared_state.load_published_snapshot() is first
+
+    shared_state.publish_snapshot(snapshot(2, with_raster=False))
+    os.utime(shared_dir / shared_state.SNAPSHOT_FILE, ns=(1, 1))  # a new mtime even on coarse clocks
+    assert shared_state.load_published_snapshot()["version"] == 2
+
+
+def test_raster_version_mismatch_is_not_cached(shared_dir):
+    shared_state.publish_snapshot(snapshot(5))
+    raster(4).save(shared_dir / shared_state.RASTER_SUBDIR)  # e.g. an older grid left behind
+
+    assert shared_state.load_published_snapshot()["raster"] is None
+
+    # Once the matching grid is in place the same snapshot file serves it
+    raster(5).save(shared_dir / shared_state.RASTER_SUBDIR)
+    loaded = shared_state.load_published_snapshot()
+    assert loaded["raster"].version == 5 and loaded["version"] == 5
+    assert shared_state.load_published_snapshot() is loaded
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from python_research.services.singleflight import SingleFlight
+
+
+def test_concurrent_async_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"aqi": 1}
+
+    async def main():
+        return await asyncio.gather(*(flights.do("k", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == [{"aqi": 1}] * 5
+    assert len(calls) == 1
+    assert flights.stats()["coalesced"] == 4 and flights.stats()["in_flight"] == 0
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.create_task(flights.do("k", fetch))
+        follower = asyncio.create_task(flights.do("k", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_errors_reach_every_async_caller():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(flights.do("k", fetch) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
+
+
+def test_threaded_callers_share_one_call():
+    flights = SingleFlight()
+    calls, results = [], []
+    start = threading.Barrier(4)
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return 7
+
+    def caller():
+        start.wait()
+        results.append(flights.do_sync("k", fetch))
+
+    threads = [threading.Thread(target=caller) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [7] * 4 and len(calls) == 1
+
+    # Once finished nothing is kept: the next call runs again
+    assert flights.do_sync("k", fetch) == 7 and len(calls) == 2
+
+
+def test_threaded_error_reaches_the_waiters():
+    flights = SingleFlight()
+    started = threading.Event()
+
+    def fetch():
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def follower():
+        started.wait()
+        try:
+            flights.do_sync("k", fetch)
+        except RuntimeError as e:
+            errors.append(e)
+
+    t = threading.Thread(target=follower)
+    t.start()
+    with pytest.raises(RuntimeError):
+        flights.do_sync("k", fetch)
+    t.join()
+    assert len(errors) == 1
@@ -0,0 +1,59 @@
+import numpy as np
+
+from python_research.services.aqi_engine import haversine, weighted_average
+from python_research.services.spatial import (
+    haversine_np,
+    idw_weight_matrix,
+    pairwise_haversine,
+    route_hourly_idw,
+    weighted_average_np,
+)
+from python_research.services.stations import STATIONS, station_registry
+
+rng = np.random.default_rng(0)
+POINTS = np.column_stack([rng.uniform(23.45, 23.65, 50), rng.uniform(87.15, 87.45, 50)])
+ANCHORS = np.array([[s["lat"], s["lon"]] for s in STATIONS.values()])
+
+
+def test_haversine_np_matches_the_scalar_formula():
+    expected = [[haversine(p[0], p[1], a[0], a[1]) for a in ANCHORS] for p in POINTS]
+    np.testing.assert_allclose(pairwise_haversine(POINTS, ANCHORS), expected, rtol=1e-12)
+    assert haversine_np(23.5, 87.3, 23.5, 87.3) == 0
+
+
+def test_nearest_station_matches_brute_force():
+    ids, dist = station_registry.nearest(POINTS[:, 0], POINTS[:, 1])
+    d = pairwise_haversine(POINTS, ANCHORS)
+    assert ids == [station_registry.ids[i] for i in d.argmin(axis=1)]
+    np.testing.assert_allclose(dist, d.min(axis=1))
+
+
+def test_route_hourly_idw_is_the_mean_of_per_point_blends():
+    series = rng.uniform(0, 300, size=(len(ANCHORS), 12))
+    weights = idw_weight_matrix(POINTS, ANCHORS)
+    np.testing.assert_allclose(weights.sum(axis=1), 1)
+    np.testing.assert_allclose(route_hourly_idw(POINTS, ANCHORS, series), (weights @ series).mean(axis=0))
+
+
+def test_within_radius_matches_brute_force():
+    d = pairwise_haversine(POINTS, ANCHORS)
+    for radius_km in (0.5, 3.0, 8.0):
+        hits = station_registry.within_radius(POINTS[:, 0], POINTS[:, 1], radius_km)
+        assert len(hits) == len(POINTS)
+        for got, row in zip(hits, d):
+            np.testing.assert_array_equal(got, np.flatnonzero(row <= radius_km))
+    # A point on a station finds it at radius 0
+    lat, lon = ANCHORS[2]
+    np.testing.assert_array_equal(station_registry.within_radius([lat], [lon], 0.0)[0], [2])
+
+
+def test_weighted_average_np_matches_the_scalar_blend():
+    (lat_a, lon_a), (lat_b, lon_b) = ANCHORS[0], ANCHORS[1]
+    # Random points plus one exactly on each anchor
+    lats = np.append(POINTS[:, 0], [lat_a, lat_b])
+    lons = np.append(POINTS[:, 1], [lon_a, lon_b])
+
+    got = weighted_average_np(120.0, 80.0, lats, lons, lat_a, lon_a, lat_b, lon_b)
+    expected = [weighted_average(120.0, 80.0, lat, lon, lat_a, lon_a, lat_b, lon_b) for lat, lon in zip(lats, lons)]
+    np.testing.assert_allclose(got, expected, rtol=1e-12)
+    assert got[-2:].tolist() == [120.0, 80.0]
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from python_research.models.streaming import ShardPlan, StreamingWindows, fit_scalers, worker_shards
+from python_research.models.windowing import WindowSet
+from python_research.services import dataset_store
+
+FEATURES = dataset_store.CONTINUOUS_COLS
+
+
+@pytest.fixture
+def plan(store_dir):
+    return ShardPlan.from_store({"train": 0.8, "test": 0.2}, look_back=24, look_ahead=12,
+                                shard_windows=50, store_dir=store_dir)
+
+
+def test_streamed_windows_match_in_memory_windows(store_dir, plan):
+    data = dataset_store.load_frame(store_dir=store_dir)
+    parts = [df.iloc[:int(len(df) * 0.8)] for _, df in data.groupby("station_id", sort=False)]
+    train = pd.concat(parts)
+
+    scaler = StandardScaler()
+    fit_scalers(plan, "train", [(scaler, FEATURES)])
+    reference = StandardScaler().fit(train[FEATURES])
+    np.testing.assert_allclose(scaler.mean_, reference.mean_, rtol=1e-6)
+    np.testing.assert_allclose(scaler.scale_, reference.scale_, rtol=1e-5)
+
+    train[FEATURES] = reference.transform(train[FEATURES])
+    expected = WindowSet.from_frame(train, FEATURES, "AQI", 24, 12)
+    streamed = StreamingWindows(plan, "train", FEATURES, "AQI", [(scaler, FEATURES)])
+
+    X, ids, y = map(np.concatenate, zip(*streamed.iter_batches(32)))
+    X_ref, ids_ref, y_ref = expected.batch(np.arange(len(expected)))
+    assert len(streamed) == len(expected)
+    np.testing.assert_allclose(X, X_ref, atol=1e-4)
+    np.testing.assert_array_equal(ids, ids_ref)
+    np.testing.assert_array_equal(y, y_ref)
+
+
+@pytest.mark.parametrize("seed", [None, 7])
+def test_workers_cover_every_shard_once(plan, seed):
+    shards = plan.shards("train")
+    base_seed = 123 if seed is None else seed  # what as_torch draws once per dataset
+    for epoch_key in (1, 2):
+        seen = worker_shards(shards, 0, 2, base_seed, epoch_key) + worker_shards(shards, 1, 2, base_seed, epoch_key)
+        assert sorted(seen) == sorted(shards)
+
+
+def test_torch_loader_covers_every_window_across_two_workers(plan):
+    torch = pytest.importorskip("torch")
+    from torch.utils.data import DataLoader
+
+    streamed = StreamingWindows(plan, "train", FEATURES, "AQI")
+    loader = DataLoader(streamed.as_torch(batch_size=16, shuffle=True, with_station=True),
+                        batch_size=None, num_workers=2)
+    for _ in range(2):
+        windows = torch.cat([X[:, 0, 0] for X, _, _ in loader]).numpy()
+        assert len(windows) == len(streamed)
+        expected = np.concatenate([streamed.shard_windows(s).X[:, 0, 0] for s in streamed.shards])
+        np.testing.assert_array_equal(np.sort(windows), np.sort(expected))
@@ -0,0 +1,48 @@
+import math
+
+import pytest
+
+from python_research.models import sweep
+
+
+def test_expand_grid_is_stable_and_overrides_defaults():
+    configs = sweep.expand_grid("lstm", {"units": [64, 128], "dropout": [0.1]})
+    assert [(c["dropout"], c["units"]) for c in configs] == [(0.1, 64), (0.1, 128)]
+    assert configs[0]["epochs"] == sweep.DEFAULTS["lstm"]["epochs"]
+    assert sweep.trial_id("lstm", configs[0]) != sweep.trial_id("lstm", configs[1])
+
+
+@pytest.mark.parametrize("model", ["lstm", "ttm"])
+@pytest.mark.parametrize("param", ["epochs", "patience"])
+def test_expand_grid_rejects_untrainable_configs(model, param):
+    with pytest.raises(ValueError, match=param):
+        sweep.expand_grid(model, {param: [5, 0]})
+
+
+def test_should_prune_waits_for_grace_and_reference():
+    reference = [[1.0, 0.8, 0.6, 0.5], [1.0, 0.9, 0.7, 0.6], [1.2, 1.0, 0.9, 0.8]]
+    assert not sweep.should_prune([5.0, 5.0], reference)             # still in the grace epochs
+    assert not sweep.should_prune([5.0, 5.0, 5.0], reference[:2])    # too few finished trials
+    assert sweep.should_prune([5.0, 5.0, 5.0], reference)            # worse than median 0.7 by epoch 3
+    assert not sweep.should_prune([1.0, 0.7, 0.65], reference)       # better than the median
+
+
+def test_should_prune_stops_non_finite_losses_at_once():
+    assert sweep.should_prune([math.nan], [])
+    assert sweep.should_prune([1.0, math.inf], [])
+
+
+def test_trial_without_a_usable_epoch_is_recorded_failed(tmp_path, monkeypatch):
+    def no_epochs(config, trial_dir, threads, reference):
+        raise RuntimeError("no epoch finished with a validation loss (0 epochs)")
+
+    monkeypatch.setitem(sweep.TRIALS, "lstm", no_epochs)
+    config = sweep.DEFAULTS["lstm"]
+    result = sweep.run_trial("lstm", "t1", config, tmp_path / "t1", slot=0, threads=1, reference=[])
+    assert result["status"] == "failed" and "no epoch" in result["error"]
+    assert (tmp_path / "t1" / "error.txt").exists()
+
+    db = sweep.open_results(tmp_path)
+    db.execute("INSERT INTO trials (trial_id, model, config, status) VALUES ('t1', 'lstm', '{}', 'running')")
+    sweep._record(db, result)
+    assert db.execute("SELECT status, best_val_loss FROM trials").fetchone() == ("failed", None)
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from python_research.services import upstream as upstream_module
+from python_research.services.upstream import CircuitBreaker, CircuitOpen, UpstreamClient
+
+URL = "https://example.test/v1/lookup"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(upstream_module, "_backoff", lambda attempt: 0)
+
+
+def make_client(handler, failures=2, reset_seconds=0.05):
+    client = UpstreamClient()
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client._sync_client = httpx.Client(transport=httpx.MockTransport(handler))
+    client._breakers["aqi_profile"] = CircuitBreaker(failures=failures, reset_seconds=reset_seconds)
+    return client
+
+
+def test_breaker_opens_then_recovers_through_half_open_trial():
+    healthy = {"up": False}
+
+    def handler(request):
+        return httpx.Response(200 if healthy["up"] else 503, json={})
+
+    client = make_client(handler)
+    breaker = client.breaker("aqi_profile")
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.request("aqi_profile", "POST", URL)
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpen):
+            await client.request("aqi_profile", "POST", URL)
+
+        await asyncio.sleep(0.06)
+        assert breaker.state == "half_open"
+        healthy["up"] = True
+        response = await client.request("aqi_profile", "POST", URL)
+        assert response.status_code == 200
+        assert breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_failed_trial_reopens_breaker():
+    client = make_client(lambda request: httpx.Response(503))
+    breaker = client.breaker("aqi_profile")
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            client.request_sync("aqi_profile", "POST", URL)
+    time.sleep(0.06)
+    with pytest.raises(httpx.HTTPStatusError):
+        client.request_sync("aqi_profile", "POST", URL)
+    assert breaker.state == "open"
+
+
+def _open_breaker(client):
+    breaker = client.breaker("aqi_profile")
+    for _ in range(2):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_cancelled_trial_releases_the_half_open_slot():
+    async def slow(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    client = UpstreamClient()
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(slow))
+    client._breakers["aqi_profile"] = CircuitBreaker(failures=2, reset_seconds=0.05)
+    breaker = _open_breaker(client)
+
+    async def scenario():
+        trial = asyncio.create_task(client.request("aqi_profile", "POST", URL))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+    asyncio.run(scenario())
+    # Still half-open and the next call gets to be the trial
+    assert breaker.acquire() == (True, True)
+
+
+def test_trial_ending_in_non_http_error_releases_the_slot():
+    def broken(request):
+        raise ValueError("bad handler")
+
+    client = make_client(broken)
+    breaker = _open_breaker(client)
+    with pytest.raises(ValueError):
+        client.request_sync("aqi_profile", "POST", URL)
+    assert breaker.acquire() == (True, True)
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    client = make_client(lambda request: httpx.Response(400))
+    for _ in range(5):
+        with pytest.raises(httpx.HTTPStatusError):
+            client.request_sync("aqi_profile", "POST", URL)
+    assert client.breaker("aqi_profile").state == "closed"
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from python_research.models.windowing import StationWindows, WindowSet
+
+
+def create_sequences(df, feature_cols, target_col, look_back, look_ahead):
+    """The list-based loop the training scripts used before the strided views."""
+    X, ids, y = [], [], []
+    for station in df["station_id"].unique():
+        df_s = df[df["station_id"] == station]
+        features, targets = df_s[feature_cols].values, df_s[target_col].values
+        for i in range(len(df_s) - look_back - look_ahead + 1):
+            X.append(features[i:i + look_back])
+            ids.append(station)
+            y.append(targets[i + look_back:i + look_back + look_ahead])
+    return np.array(X, dtype=np.float32), np.array(ids), np.array(y, dtype=np.float32)
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    rows = [(station, *rng.normal(size=3)) for station, n in ((2, 60), (0, 45), (5, 30)) for _ in range(n)]
+    return pd.DataFrame(rows, columns=["station_id", "a", "b", "AQI"])
+
+
+def test_windows_match_the_list_based_sequences(frame):
+    windows = WindowSet.from_frame(frame, ["a", "b"], "AQI", look_back=24, look_ahead=12)
+    X_ref, ids_ref, y_ref = create_sequences(frame, ["a", "b"], "AQI", 24, 12)
+
+    X, ids, y = windows.batch(np.arange(len(windows)))
+    assert len(windows) == len(X_ref) == 25 + 10  # station 5 is too short for a window
+    np.testing.assert_array_equal(X, X_ref)
+    np.testing.assert_array_equal(ids, ids_ref)
+    np.testing.assert_array_equal(y, y_ref)
+    np.testing.assert_array_equal(windows.targets(), y_ref)
+    np.testing.assert_array_equal(windows.last_step([0]), X_ref[:, -1, [0]])
+
+
+def test_station_windows_are_views_not_copies():
+    features = np.arange(40, dtype=np.float32).reshape(20, 2)
+    windows = StationWindows(features, np.arange(20, dtype=np.float32), station_id=1, look_back=4, look_ahead=2)
+    assert len(windows) == 15
+    assert np.shares_memory(windows.X, windows.features) and not windows.X.flags.writeable
+    np.testing.assert_array_equal(windows.y[0], [4, 5])
+
+
+def test_shuffled_batches_cover_every_window_once(frame):
+    windows = WindowSet.from_frame(frame, ["a", "b"], "AQI", look_back=24, look_ahead=12)
+    batches = list(windows.iter_batches(batch_size=8, shuffle=True, seed=1))
+    assert [len(b[0]) for b in batches] == [8, 8, 8, 8, 3]
+
+    y = np.concatenate([b[2] for b in batches])
+    order = np.lexsort(y.T[::-1])
+    np.testing.assert_array_equal(y[order], windows.targets()[np.lexsort(windows.targets().T[::-1])])